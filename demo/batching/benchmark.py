@@ -0,0 +1,96 @@
+"""Measure the throughput of a batched @remote method against an unbatched one.
+
+Both routes project the vector sent by the client with the same weights,
+through a remote method called once per request or with batches of up to
+``--batch-max-size`` requests. Each route is loaded by 1, 8 and 64 clients.
+
+    python demo/batching/benchmark.py --duration 10
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import ray
+from ray import serve
+
+from raycraft import App, RayCraftAPI
+from raycraft.bench import generate_load
+
+HOST = "127.0.0.1"
+PORT = 8000
+APP_NAME = "batching"
+CONCURRENCIES = (1, 8, 64)
+DIMENSION = 1024
+
+
+def build_app(batch_max_size: int) -> RayCraftAPI:
+    service = RayCraftAPI(num_replicas=1)
+
+    @service.init
+    def weights() -> np.ndarray:
+        return np.random.default_rng(0).random((DIMENSION, DIMENSION), np.float32)
+
+    @service.remote
+    def project(app: App, vector: List[float]) -> float:
+        return float(np.linalg.norm(np.asarray(vector, np.float32) @ app.weights))
+
+    @service.remote(batch_max_size=batch_max_size, batch_wait_timeout_s=0.005)
+    def project_batch(app: App, vectors: List[List[float]]) -> List[float]:
+        projected = np.asarray(vectors, np.float32) @ app.weights
+        return np.linalg.norm(projected, axis=1).tolist()  # type: ignore
+
+    @service.post("/unbatched")
+    async def unbatched(app: App, vector: List[float]) -> float:
+        return await app.project(vector)  # type: ignore [no-any-return]
+
+    @service.post("/batched")
+    async def batched(app: App, vector: List[float]) -> float:
+        return await app.project_batch(vector)  # type: ignore [no-any-return]
+
+    return service
+
+
+def measure(duration_s: float) -> Dict[str, Dict[int, float]]:
+    body = json.dumps(np.ones(DIMENSION).tolist()).encode()
+    headers = {"Content-Type": "application/json"}
+    throughputs: Dict[str, Dict[int, float]] = {}
+    for route in ("/unbatched", "/batched"):
+        url = f"http://{HOST}:{PORT}{route}"
+        asyncio.run(generate_load(url, "POST", body, headers, 1, None, 1.0))
+        throughputs[route] = {}
+        for concurrency in CONCURRENCIES:
+            result = asyncio.run(
+                generate_load(url, "POST", body, headers, concurrency, None, duration_s)
+            )
+            if result.errors:
+                raise RuntimeError(f"{url} answered with errors: {result.status_codes}")
+            throughputs[route][concurrency] = result.throughput
+    return throughputs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-max-size", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    ray.init()
+    try:
+        serve.start(http_options={"host": HOST, "port": PORT})
+        serve.run(build_app(args.batch_max_size)(), name=APP_NAME, route_prefix="/")
+        throughputs = measure(args.duration)
+    finally:
+        serve.shutdown()
+        ray.shutdown()
+
+    print(f"{'requests/s':14}" + "".join(f"{c:>10} clients" for c in CONCURRENCIES))
+    for route, by_concurrency in throughputs.items():
+        cells = "".join(f"{by_concurrency[c]:>18.1f}" for c in CONCURRENCIES)
+        print(f"{route:14}{cells}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
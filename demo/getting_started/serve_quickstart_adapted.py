@@ -32,4 +32,4 @@ class EnglishText(BaseModel):
 @translator_service.post("/test/")
 async def ingress(app: App, english_text: EnglishText) -> str:
     """Translate English text to French."""
-    return app.translate(english_text.english_text)  # type: ignore
+    return await app.translate(english_text.english_text)  # type: ignore
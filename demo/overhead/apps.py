@@ -0,0 +1,125 @@
+"""The same two endpoints served by plain FastAPI, Ray Serve and RayCraftAPI.
+
+``POST /echo`` answers from the ingress, ``POST /remote`` goes through a
+method running as its own deployment, except with plain FastAPI where there
+is no deployment to call.
+
+RayCraftAPI also serves both over gRPC, as the ``Echo`` and ``RemoteEcho``
+methods, and over WebSockets, on ``/ws/echo`` and ``/ws/remote`` with one
+reply per message, to compare with its HTTP routes.
+"""
+from typing import Any
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+from ray import serve
+
+from raycraft import App, RayCraftAPI
+
+
+class Text(BaseModel):
+    text: str
+
+
+class Echoed(BaseModel):
+    text: str
+
+
+def echo(text: str) -> str:
+    return text
+
+
+# plain FastAPI, served with uvicorn
+
+fastapi_app = FastAPI()
+
+
+@fastapi_app.post("/echo")
+async def fastapi_echo(body: Text) -> str:
+    return echo(body.text)
+
+
+@fastapi_app.post("/remote")
+async def fastapi_remote(body: Text) -> str:
+    return echo(body.text)
+
+
+# hand-written Ray Serve
+
+serve_app = FastAPI()
+
+
+@serve.deployment(num_replicas=1)
+class ServeEcho:
+    def __call__(self, text: str) -> str:
+        return echo(text)
+
+
+@serve.deployment(num_replicas=1)
+@serve.ingress(serve_app)
+class ServeIngress:
+    def __init__(self, echo_handle: Any) -> None:
+        self._echo_handle = echo_handle.options(use_new_handle_api=True)
+
+    @serve_app.post("/echo")
+    async def serve_echo(self, body: Text) -> str:
+        return echo(body.text)
+
+    @serve_app.post("/remote")
+    async def serve_remote(self, body: Text) -> str:
+        return await self._echo_handle.remote(body.text)  # type: ignore
+
+
+serve_deployment = ServeIngress.bind(ServeEcho.bind())
+
+
+# RayCraftAPI
+
+raycraft_api = RayCraftAPI(num_replicas=1)
+
+
+@raycraft_api.remote(num_replicas=1)
+def remote_echo(app: App, text: str) -> str:
+    return echo(text)
+
+
+@raycraft_api.post("/echo")
+async def raycraft_echo(app: App, body: Text) -> str:
+    return echo(body.text)
+
+
+@raycraft_api.post("/remote")
+async def raycraft_remote(app: App, body: Text) -> str:
+    return await app.remote_echo(body.text)  # type: ignore
+
+
+@raycraft_api.grpc(name="Echo")
+async def echo_text(app: App, body: Text) -> Echoed:
+    return Echoed(text=echo(body.text))
+
+
+@raycraft_api.grpc(name="RemoteEcho")
+async def remote_echo_text(app: App, body: Text) -> Echoed:
+    return Echoed(text=await app.remote_echo(body.text))  # type: ignore
+
+
+@raycraft_api.websocket("/ws/echo")
+async def websocket_echo(app: App, websocket: WebSocket) -> None:
+    await websocket.accept()
+    try:
+        while True:
+            body = Text.parse_raw(await websocket.receive_text())
+            await websocket.send_text(echo(body.text))
+    except WebSocketDisconnect:
+        pass
+
+
+@raycraft_api.websocket("/ws/remote")
+async def websocket_remote(app: App, websocket: WebSocket) -> None:
+    await websocket.accept()
+    try:
+        while True:
+            body = Text.parse_raw(await websocket.receive_text())
+            await websocket.send_text(await app.remote_echo(body.text))
+    except WebSocketDisconnect:
+        pass
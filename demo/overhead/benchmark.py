@@ -0,0 +1,339 @@
+"""Measure what RayCraftAPI costs over plain FastAPI and hand-written Ray Serve.
+
+The endpoints of ``apps.py`` are served one stack at a time and each gets:
+
+- its latency with one client, the per-request overhead,
+- its throughput with ``--concurrency`` clients,
+- the time to build and deploy the app, and the memory of its processes.
+
+RayCraftAPI also serves the endpoints over gRPC and WebSockets, measured
+the same way and compared with its HTTP routes.
+
+The ratios of RayCraftAPI to hand-written Serve, measured in the same run,
+are compared with the stored baseline, a ratio growing more than
+``--threshold`` is reported as a regression and fails the run, and so does
+a missing baseline. p99 latencies vary too much between runs to be gated on
+and are only reported. With ``--update-baseline``, the ratios are stored
+instead.
+
+    python demo/overhead/benchmark.py --duration 10
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+import ray
+from ray import serve
+from ray.serve.config import gRPCOptions
+from ray.util.state import list_actors
+
+from raycraft.bench import generate_grpc_load, generate_load, generate_websocket_load
+from raycraft.grpc_ingress import (
+    APPLICATION_METADATA_KEY,
+    build_message_classes,
+    grpc_method_path,
+    model_to_message,
+)
+
+HERE = pathlib.Path(__file__).parent
+DEFAULT_BASELINE = HERE / "baseline.json"
+ENDPOINTS = ["/echo", "/remote"]
+# the gRPC methods serving the same as ENDPOINTS
+GRPC_METHODS = {"/echo": "Echo", "/remote": "RemoteEcho"}
+WEBSOCKET_ROUTES = {"/echo": "/ws/echo", "/remote": "/ws/remote"}
+HOST = "127.0.0.1"
+SERVE_PORT = 8000
+FASTAPI_PORT = 8001
+GRPC_PORT = 9000
+APP_NAME = "overhead"
+BODY = json.dumps({"text": "Hello world!"}).encode()
+
+
+def wait_until_up(url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout_s
+    while True:
+        request = urllib.request.Request(
+            url, data=BODY, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def measure_endpoints(
+    base_url: str, duration_s: float, concurrency: int
+) -> Dict[str, float]:
+    metrics = {}
+    for endpoint in ENDPOINTS:
+        url = base_url + endpoint
+        headers = {"Content-Type": "application/json"}
+        # warm up connections and code paths before measuring
+        asyncio.run(generate_load(url, "POST", BODY, headers, 1, None, 1.0))
+
+        single = asyncio.run(
+            generate_load(url, "POST", BODY, headers, 1, None, duration_s)
+        )
+        loaded = asyncio.run(
+            generate_load(url, "POST", BODY, headers, concurrency, None, duration_s)
+        )
+        if single.errors or loaded.errors:
+            raise RuntimeError(f"{url} answered with errors: {loaded.status_codes}")
+
+        assert single.p50_latency_s is not None and single.p99_latency_s is not None
+        metrics[f"{endpoint}.p50_latency_ms"] = 1000 * single.p50_latency_s
+        metrics[f"{endpoint}.p99_latency_ms"] = 1000 * single.p99_latency_s
+        metrics[f"{endpoint}.throughput"] = loaded.throughput
+    return metrics
+
+
+def measure_grpc_methods(
+    service_name: str, body: bytes, duration_s: float, concurrency: int
+) -> Dict[str, float]:
+    metrics = {}
+    target = f"{HOST}:{GRPC_PORT}"
+    metadata = [(APPLICATION_METADATA_KEY, APP_NAME)]
+    for endpoint, method_name in GRPC_METHODS.items():
+        method_path = grpc_method_path(service_name, method_name)
+        asyncio.run(
+            generate_grpc_load(target, method_path, body, metadata, 1, None, 1.0)
+        )
+
+        single = asyncio.run(
+            generate_grpc_load(target, method_path, body, metadata, 1, None, duration_s)
+        )
+        loaded = asyncio.run(
+            generate_grpc_load(
+                target, method_path, body, metadata, concurrency, None, duration_s
+            )
+        )
+        if single.errors or loaded.errors:
+            raise RuntimeError(f"{method_path} failed: {loaded.status_codes}")
+
+        assert single.p50_latency_s is not None and single.p99_latency_s is not None
+        metrics[f"{endpoint}.p50_latency_ms"] = 1000 * single.p50_latency_s
+        metrics[f"{endpoint}.p99_latency_ms"] = 1000 * single.p99_latency_s
+        metrics[f"{endpoint}.throughput"] = loaded.throughput
+    return metrics
+
+
+def measure_websocket_routes(duration_s: float, concurrency: int) -> Dict[str, float]:
+    metrics = {}
+    message = BODY.decode()
+    for endpoint, path in WEBSOCKET_ROUTES.items():
+        url = f"ws://{HOST}:{SERVE_PORT}{path}"
+        asyncio.run(generate_websocket_load(url, message, 1, None, 1.0))
+
+        single = asyncio.run(generate_websocket_load(url, message, 1, None, duration_s))
+        loaded = asyncio.run(
+            generate_websocket_load(url, message, concurrency, None, duration_s)
+        )
+        if single.errors or loaded.errors:
+            raise RuntimeError(f"{url} failed: {loaded.status_codes}")
+
+        assert single.p50_latency_s is not None and single.p99_latency_s is not None
+        metrics[f"{endpoint}.p50_latency_ms"] = 1000 * single.p50_latency_s
+        metrics[f"{endpoint}.p99_latency_ms"] = 1000 * single.p99_latency_s
+        metrics[f"{endpoint}.throughput"] = loaded.throughput
+
+    return metrics
+
+
+def rss_mb(pids: List[int]) -> float:
+    return sum(psutil.Process(pid).memory_info().rss for pid in pids) / 2**20
+
+
+def replica_pids() -> List[int]:
+    return [
+        actor.pid
+        for actor in list_actors(filters=[("state", "=", "ALIVE")], limit=10_000)
+        if actor.class_name.startswith(f"ServeReplica:{APP_NAME}:")
+    ]
+
+
+def measure_fastapi(duration_s: float, concurrency: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "apps:fastapi_app",
+            "--app-dir",
+            str(HERE),
+            "--host",
+            HOST,
+            "--port",
+            str(FASTAPI_PORT),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        base_url = f"http://{HOST}:{FASTAPI_PORT}"
+        wait_until_up(base_url + ENDPOINTS[0])
+        metrics = {"deploy_s": time.perf_counter() - start}
+        metrics.update(measure_endpoints(base_url, duration_s, concurrency))
+        metrics["memory_mb"] = rss_mb([server.pid])
+        return metrics
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure_serve(
+    build: Callable[[], Any],
+    duration_s: float,
+    concurrency: int,
+    extra_protocols: Optional[Dict[str, Callable[[], Dict[str, float]]]] = None,
+) -> Dict[str, float]:
+    start = time.perf_counter()
+    app = build()
+    built = time.perf_counter()
+    serve.run(app, name=APP_NAME, route_prefix="/", host=HOST, port=SERVE_PORT)
+    try:
+        metrics = {"build_s": built - start, "deploy_s": time.perf_counter() - start}
+        metrics.update(
+            measure_endpoints(f"http://{HOST}:{SERVE_PORT}", duration_s, concurrency)
+        )
+        metrics["memory_mb"] = rss_mb(replica_pids())
+        for protocol, measure in (extra_protocols or {}).items():
+            metrics.update(
+                {f"{protocol}:{name}": value for name, value in measure().items()}
+            )
+        return metrics
+    finally:
+        serve.delete(APP_NAME)
+
+
+def is_gated(name: str) -> bool:
+    """Whether a ratio is stable enough between runs to fail the run."""
+    return not name.endswith(".p99_latency_ms")
+
+
+def compare(
+    ratios: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """Return the ratios that grew more than ``threshold`` over the baseline."""
+    regressions = []
+    for name, ratio in ratios.items():
+        if name not in baseline or not is_gated(name):
+            continue
+        # a higher throughput is better, everything else is a cost
+        if name.endswith(".throughput"):
+            regressed = ratio < baseline[name] * (1 - threshold)
+        else:
+            regressed = ratio > baseline[name] * (1 + threshold)
+        if regressed:
+            regressions.append(f"{name}: {ratio:.3f} (baseline {baseline[name]:.3f})")
+    return regressions
+
+
+def format_table(results: Dict[str, Dict[str, float]]) -> str:
+    names = sorted({name for metrics in results.values() for name in metrics})
+    lines = [f"{'':36}" + "".join(f"{stack:>14}" for stack in results)]
+    for name in names:
+        cells = "".join(
+            f"{metrics[name]:>14.3f}" if name in metrics else f"{'-':>14}"
+            for metrics in results.values()
+        )
+        lines.append(f"{name:36}{cells}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("-o", "--output", type=pathlib.Path)
+    args = parser.parse_args(argv)
+    if not args.update_baseline and not args.baseline.exists():
+        parser.error(
+            f"no baseline in {args.baseline}, store one with --update-baseline"
+        )
+
+    sys.path.insert(0, str(HERE))
+    import apps
+
+    service_name = apps.raycraft_api.grpc_service_name()
+    message_class = build_message_classes(service_name, [apps.Text])[apps.Text]
+    grpc_body = model_to_message(
+        apps.Text.parse_raw(BODY), message_class()
+    ).SerializeToString()
+
+    results = {"fastapi": measure_fastapi(args.duration, args.concurrency)}
+    ray.init()
+    try:
+        serve.start(
+            http_options={"host": HOST, "port": SERVE_PORT},
+            grpc_options=gRPCOptions(
+                port=GRPC_PORT,
+                grpc_servicer_functions=[apps.raycraft_api.grpc_servicer_function()],
+            ),
+        )
+        results["serve"] = measure_serve(
+            lambda: apps.serve_deployment, args.duration, args.concurrency
+        )
+        results["raycraft"] = measure_serve(
+            apps.raycraft_api,
+            args.duration,
+            args.concurrency,
+            {
+                "grpc": lambda: measure_grpc_methods(
+                    service_name, grpc_body, args.duration, args.concurrency
+                ),
+                "ws": lambda: measure_websocket_routes(args.duration, args.concurrency),
+            },
+        )
+    finally:
+        serve.shutdown()
+        ray.shutdown()
+
+    ratios = {
+        name: value / results["serve"][name]
+        for name, value in results["raycraft"].items()
+        if name != "build_s" and results["serve"].get(name)
+    }
+    # gRPC and WebSockets against HTTP, all served by RayCraftAPI
+    ratios.update(
+        {
+            f"{protocol}/http:{name}": results["raycraft"][f"{protocol}:{name}"] / value
+            for protocol in ("grpc", "ws")
+            for name, value in results["raycraft"].items()
+            if f"{protocol}:{name}" in results["raycraft"] and value
+        }
+    )
+    print(format_table(results))
+    print()
+    print(format_table({"ratio": ratios}))
+    if args.output is not None:
+        args.output.write_text(json.dumps({"results": results, "ratios": ratios}))
+
+    if args.update_baseline:
+        gated = {name: ratio for name, ratio in ratios.items() if is_gated(name)}
+        args.baseline.write_text(json.dumps(gated, indent=2, sort_keys=True) + "\n")
+        print(f"\nStored the baseline in {args.baseline}.")
+        return 0
+
+    regressions = compare(ratios, json.loads(args.baseline.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Measure the latency of array payloads sent as JSON and as raw buffers.
+
+A route summing a float32 array is called with 1 MB and 100 MB arrays,
+once with the array as a JSON list parsed by FastAPI and once as a raw
+buffer read by ``ArrayBody``. Requests are sent one at a time for
+``--duration`` seconds per payload, and at least once.
+
+    python demo/payloads/benchmark.py --duration 10
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import ray
+from ray import serve
+
+from raycraft import App, ArrayBody, RayCraftAPI
+from raycraft.bench import generate_load
+from raycraft.binary import encode_array
+
+HOST = "127.0.0.1"
+PORT = 8000
+APP_NAME = "payloads"
+SIZES_MB = (1, 100)
+
+
+def build_app() -> RayCraftAPI:
+    service = RayCraftAPI(num_replicas=1)
+
+    @service.post("/json")
+    async def json_sum(app: App, values: List[float]) -> float:
+        return float(np.sum(np.asarray(values, dtype="float32")))
+
+    @service.post("/binary")
+    async def binary_sum(app: App, values: np.ndarray = ArrayBody()) -> float:
+        return float(np.sum(values))
+
+    return service
+
+
+def payloads(size_mb: int) -> Dict[str, Tuple[bytes, Dict[str, str]]]:
+    array = np.ones(size_mb * 2**20 // 4, dtype="float32")
+    return {
+        "/json": (
+            json.dumps(array.tolist()).encode(),
+            {"content-type": "application/json"},
+        ),
+        "/binary": encode_array(array),
+    }
+
+
+def measure(duration_s: float) -> Dict[Tuple[str, int], Tuple[float, float, int]]:
+    results = {}
+    for size_mb in SIZES_MB:
+        for route, (body, headers) in payloads(size_mb).items():
+            url = f"http://{HOST}:{PORT}{route}"
+            result = asyncio.run(
+                generate_load(url, "POST", body, headers, 1, None, duration_s)
+            )
+            if result.errors or result.p50_latency_s is None:
+                raise RuntimeError(f"{url} answered with errors: {result.status_codes}")
+            results[route, size_mb] = (
+                result.p50_latency_s,
+                len(body) / 2**20,
+                result.requests,
+            )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    ray.init()
+    try:
+        serve.start(http_options={"host": HOST, "port": PORT})
+        serve.run(build_app()(), name=APP_NAME, route_prefix="/")
+        results = measure(args.duration)
+    finally:
+        serve.shutdown()
+        ray.shutdown()
+
+    print(f"{'':10}{'array MB':>10}{'body MB':>10}{'p50 s':>10}{'requests':>10}")
+    for (route, size_mb), (p50_s, body_mb, requests) in results.items():
+        print(f"{route:10}{size_mb:>10}{body_mb:>10.1f}{p50_s:>10.3f}{requests:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
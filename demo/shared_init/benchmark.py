@@ -0,0 +1,90 @@
+"""Measure the cold start of replicas loading a model, shared or not.
+
+Each replica's initializer loads a ``--size-mb`` array from a .npy file,
+once per replica or once per node with ``shared=True``. For 1, 2 and 4
+replicas, the time for ``serve.run`` to return and the proportional set
+size (PSS) of the replicas are reported. The shared loads are mapped from
+the object store, so that memory is not counted again for each replica.
+
+    python demo/shared_init/benchmark.py
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import psutil
+import ray
+from ray import serve
+from ray.util.state import list_actors
+
+from raycraft import App, RayCraftAPI
+
+APP_NAME = "shared_init"
+REPLICAS = (1, 2, 4)
+
+
+def build_app(path: str, num_replicas: int, shared: bool) -> RayCraftAPI:
+    service = RayCraftAPI(num_replicas=num_replicas, ray_actor_options={"num_cpus": 0})
+
+    @service.init(shared=shared)
+    def weights() -> np.ndarray:
+        return np.load(path)  # type: ignore [no-any-return]
+
+    @service.get("/")
+    async def size(app: App) -> int:
+        return int(app.weights.size)
+
+    return service
+
+
+def replica_pss_mb() -> float:
+    pids = [
+        actor.pid
+        for actor in list_actors(filters=[("state", "=", "ALIVE")], limit=10_000)
+        if actor.class_name.startswith(f"ServeReplica:{APP_NAME}:")
+    ]
+    pss = sum(psutil.Process(pid).memory_full_info().pss for pid in pids)
+    return pss / 2**20
+
+
+def measure(path: str) -> Dict[Tuple[str, int], Tuple[float, float]]:
+    results = {}
+    for shared in (False, True):
+        for num_replicas in REPLICAS:
+            start = time.perf_counter()
+            serve.run(build_app(path, num_replicas, shared)(), name=APP_NAME)
+            cold_start_s = time.perf_counter() - start
+            results["shared" if shared else "per replica", num_replicas] = (
+                cold_start_s,
+                replica_pss_mb(),
+            )
+            serve.delete(APP_NAME)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    ray.init()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(pathlib.Path(directory) / "weights.npy")
+            np.save(path, np.ones(args.size_mb * 2**20 // 8))
+            results = measure(path)
+    finally:
+        serve.shutdown()
+        ray.shutdown()
+
+    print(f"{'':14}{'replicas':>10}{'cold start s':>14}{'PSS MB':>10}")
+    for (mode, num_replicas), (cold_start_s, pss_mb) in results.items():
+        print(f"{mode:14}{num_replicas:>10}{cold_start_s:>14.2f}{pss_mb:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
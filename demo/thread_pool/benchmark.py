@@ -0,0 +1,92 @@
+"""Measure the latency of a fast route while a slow sync route is loaded.
+
+The slow route blocks for ``--slow-ms`` in a sync function, which the
+replica runs on its thread pool. The fast route is async. The p50 and p99
+latency of the fast route are measured alone, then with ``--concurrency``
+clients calling the slow route at the same time.
+
+    python demo/thread_pool/benchmark.py --duration 10
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import ray
+from ray import serve
+
+from raycraft import App, RayCraftAPI
+from raycraft.bench import BenchResult, generate_load
+
+HOST = "127.0.0.1"
+PORT = 8000
+APP_NAME = "thread_pool"
+
+
+def build_app(slow_s: float) -> RayCraftAPI:
+    service = RayCraftAPI(num_replicas=1)
+
+    @service.get("/slow")
+    def slow(app: App) -> str:
+        time.sleep(slow_s)
+        return "slow"
+
+    @service.get("/fast")
+    async def fast(app: App) -> str:
+        return "fast"
+
+    return service
+
+
+async def load_both(
+    duration_s: float, concurrency: int
+) -> Tuple[BenchResult, BenchResult]:
+    fast, slow = await asyncio.gather(
+        generate_load(
+            f"http://{HOST}:{PORT}/fast", concurrency=1, duration_s=duration_s
+        ),
+        generate_load(
+            f"http://{HOST}:{PORT}/slow", concurrency=concurrency, duration_s=duration_s
+        ),
+    )
+    return fast, slow
+
+
+def measure(duration_s: float, concurrency: int) -> Dict[str, Any]:
+    fast_url = f"http://{HOST}:{PORT}/fast"
+    asyncio.run(generate_load(fast_url, concurrency=1, duration_s=1.0))
+    alone = asyncio.run(generate_load(fast_url, concurrency=1, duration_s=duration_s))
+    mixed, slow = asyncio.run(load_both(duration_s, concurrency))
+    for result in (alone, mixed, slow):
+        if result.errors:
+            raise RuntimeError(f"requests failed: {result.status_codes}")
+    return {"fast alone": alone, "fast with slow": mixed, "slow": slow}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    ray.init()
+    try:
+        serve.start(http_options={"host": HOST, "port": PORT})
+        serve.run(build_app(args.slow_ms / 1000)(), name=APP_NAME, route_prefix="/")
+        results = measure(args.duration, args.concurrency)
+    finally:
+        serve.shutdown()
+        ray.shutdown()
+
+    print(f"{'':16}{'p50 ms':>10}{'p99 ms':>10}{'requests/s':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:16}{1000 * result.p50_latency_s:>10.1f}"
+            f"{1000 * result.p99_latency_s:>10.1f}{result.throughput:>12.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
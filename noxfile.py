@@ -16,13 +16,15 @@ class Package:
     test_dependencies: List[str]
     locations: List[str]
 
+
 package = Package(
     base_python="3.9",
     python_versions=["3.9"],
     pip_version="23.0.1",
-    build_dependencies=["poetry-core", "setuptools"],    
+    build_dependencies=["poetry-core", "setuptools"],
     test_dependencies=[
         "coverage[toml]",
+        "httpx",
         "pytest",
         "pytest-mock",
         "pytest-sugar",
@@ -34,6 +36,9 @@ package = Package(
     ],
 )
 
+# modules raycraft.cli must not import until a command needs them
+HEAVY_MODULES = ["ray", "fastapi", "starlette", "watchfiles", "yaml", "aiohttp"]
+CLI_IMPORT_BUDGET_US = 250_000
 
 
 @noxsession(python=package.base_python, venv_params=["--pip", package.pip_version])
@@ -77,3 +82,38 @@ def test(session: Session) -> None:
 
     options = session.posargs or []
     session.run("coverage", "run", "-m", "pytest", *options, "tests")
+
+
+@noxsession(python=package.base_python, venv_params=["--pip", package.pip_version])
+def import_time(session: Session) -> None:
+    """Check that the CLI starts without importing its heavy dependencies."""
+    session.install(*package.build_dependencies)
+    session.install(".")
+    output = session.run(
+        "python",
+        "-X",
+        "importtime",
+        "-c",
+        "import raycraft.cli, sys; "
+        f"heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]; "
+        "assert not heavy, f'raycraft.cli imports {heavy}'",
+        silent=True,
+    )
+    # lines look like "import time: self [us] | cumulative | imported package"
+    for line in output.splitlines():
+        if line.startswith("import time:") and line.endswith("| raycraft.cli"):
+            cumulative_us = int(line.split("|")[1])
+            session.log(f"raycraft.cli imports in {cumulative_us / 1000:.1f}ms")
+            if cumulative_us > CLI_IMPORT_BUDGET_US:
+                session.error(
+                    f"raycraft.cli imports in more than "
+                    f"{CLI_IMPORT_BUDGET_US / 1000:.0f}ms"
+                )
+
+
+@noxsession(python=package.base_python, venv_params=["--pip", package.pip_version])
+def overhead(session: Session) -> None:
+    """Compare RayCraftAPI with plain FastAPI and hand-written Ray Serve."""
+    session.install(*package.build_dependencies)
+    session.install(".", "psutil")
+    session.run("python", "demo/overhead/benchmark.py", *session.posargs)
@@ -1,11 +1,71 @@
-from .api import RayCraftAPI
-from typing import Protocol, Any
+import importlib
+from typing import Any, List, Protocol, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .admission import AdmissionConfig
+    from .api import RayCraftAPI
+    from .autoscaling import AutoscalingPolicy, Schedule
+    from .binary import ArrayBody, ArrayResponse
+    from .cache import CacheConfig
+    from .metrics import MetricsConfig
+    from .profiling import ProfilingConfig
+    from .streaming import EventSourceResponse
+    from .tracing import FileExporter, InMemoryExporter, SpanExporter, TracingConfig
+
+# the public API is imported on first access, importing raycraft.cli must not
+# pull Ray, Serve and FastAPI in
+_LAZY_ATTRIBUTES = {
+    "AdmissionConfig": ".admission",
+    "ArrayBody": ".binary",
+    "ArrayResponse": ".binary",
+    "AutoscalingPolicy": ".autoscaling",
+    "CacheConfig": ".cache",
+    "EventSourceResponse": ".streaming",
+    "FileExporter": ".tracing",
+    "InMemoryExporter": ".tracing",
+    "MetricsConfig": ".metrics",
+    "ProfilingConfig": ".profiling",
+    "RayCraftAPI": ".api",
+    "Schedule": ".autoscaling",
+    "SpanExporter": ".tracing",
+    "TracingConfig": ".tracing",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
 
 class App(Protocol):
     """A very generic application interface."""
-    
+
     # to avoid attribute errors
     def __getattr__(self, name: str) -> Any:
         ...
 
-__all__ = ["App", "RayCraftAPI"]
+
+__all__ = [
+    "AdmissionConfig",
+    "App",
+    "ArrayBody",
+    "ArrayResponse",
+    "AutoscalingPolicy",
+    "CacheConfig",
+    "EventSourceResponse",
+    "FileExporter",
+    "InMemoryExporter",
+    "MetricsConfig",
+    "ProfilingConfig",
+    "RayCraftAPI",
+    "Schedule",
+    "SpanExporter",
+    "TracingConfig",
+]
@@ -0,0 +1,230 @@
+import asyncio
+import contextvars
+import functools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .streaming import watch_body
+
+DEADLINE_HEADER = "x-request-deadline"
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    """Per-replica limits of a route.
+
+    Calls beyond ``max_concurrency`` wait in a queue of ``max_queue_length``,
+    calls arriving when the queue is full are rejected with a 503. Calls not
+    done within ``timeout_s`` are cancelled and answered with a 504.
+    """
+
+    max_concurrency: Optional[int] = None
+    max_queue_length: Optional[int] = None
+    timeout_s: Optional[float] = None
+
+
+@dataclass
+class Deadline:
+    """When the current request is given up, as a Unix timestamp."""
+
+    expires_at: float
+    # remote calls to cancel if the deadline passes
+    pending: List[Any] = field(default_factory=list)
+
+    def remaining_s(self) -> float:
+        return self.expires_at - time.time()
+
+
+# the deadline sent by the client, then the one of the route being served
+current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "raycraft_deadline", default=None
+)
+
+
+def get_client_deadline() -> Optional[Deadline]:
+    """Return the deadline of the current request, or None."""
+    return current_deadline.get()
+
+
+class DeadlineMiddleware:
+    """Read the deadline a client set with the ``X-Request-Deadline`` header.
+
+    The header holds a Unix timestamp in seconds, invalid values are ignored.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        deadline = None
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == DEADLINE_HEADER.encode():
+                    try:
+                        deadline = Deadline(float(value))
+                    except ValueError:
+                        pass
+                    break
+
+        token = current_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
+
+
+class Rejected(Exception):
+    """A call refused or given up by admission control.
+
+    Routes answer it with ``status_code``, gRPC methods with ``grpc_code``.
+    """
+
+    def __init__(self, status_code: int, grpc_code: str, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.grpc_code = grpc_code
+        self.detail = detail
+
+
+def overloaded() -> Rejected:
+    return Rejected(503, "RESOURCE_EXHAUSTED", "The service is overloaded.")
+
+
+def deadline_exceeded(when: str) -> Rejected:
+    return Rejected(504, "DEADLINE_EXCEEDED", f"The deadline passed {when}.")
+
+
+async def rejected_response(request: Request, error: Exception) -> JSONResponse:
+    assert isinstance(error, Rejected)
+    headers = {"Retry-After": "1"} if error.status_code == 503 else None
+    return JSONResponse(
+        {"detail": error.detail}, status_code=error.status_code, headers=headers
+    )
+
+
+def track_remote_call(response: Any) -> Any:
+    """Cancel ``response`` if the deadline of the current request passes."""
+    deadline = current_deadline.get()
+    if deadline is not None and hasattr(response, "cancel"):
+        deadline.pending.append(response)
+    return response
+
+
+class Admission:
+    """Apply an ``AdmissionConfig`` on a replica."""
+
+    def __init__(self, config: AdmissionConfig) -> None:
+        self._config = config
+        self._reset()
+
+    def _reset(self) -> None:
+        self._queued = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # replicas each unpickle their own limits
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"_config": self._config}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._config = state["_config"]
+        self._reset()
+
+    def deadline(self) -> Optional[Deadline]:
+        client_deadline = current_deadline.get()
+        if self._config.timeout_s is None:
+            return client_deadline
+
+        expires_at = time.time() + self._config.timeout_s
+        if client_deadline is not None:
+            expires_at = min(expires_at, client_deadline.expires_at)
+        return Deadline(expires_at)
+
+    async def acquire(self, deadline: Optional[Deadline]) -> None:
+        if self._config.max_concurrency is None:
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._config.max_concurrency)
+
+        if (
+            self._semaphore.locked()
+            and self._config.max_queue_length is not None
+            and self._queued >= self._config.max_queue_length
+        ):
+            raise overloaded()
+
+        self._queued += 1
+        try:
+            timeout_s = None if deadline is None else max(deadline.remaining_s(), 0)
+            await asyncio.wait_for(self._semaphore.acquire(), timeout_s)
+        except asyncio.TimeoutError:
+            raise deadline_exceeded("while queued") from None
+        finally:
+            self._queued -= 1
+
+    def release(self) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def run(
+        self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        deadline = self.deadline()
+        if deadline is not None and deadline.remaining_s() <= 0:
+            raise deadline_exceeded("before the call")
+
+        await self.acquire(deadline)
+        streaming = False
+        try:
+            result = await self._within(deadline, func(*args, **kwargs))
+            # a streamed body keeps the slot and the deadline until it is sent
+            streaming = watch_body(
+                result,
+                lambda failed: self.release(),
+                None if deadline is None else functools.partial(self._within, deadline),
+            )
+            return result
+        finally:
+            if not streaming:
+                self.release()
+
+    @staticmethod
+    async def _within(deadline: Optional[Deadline], call: Awaitable[Any]) -> Any:
+        token = current_deadline.set(deadline)
+        try:
+            if deadline is None:
+                return await call
+            return await asyncio.wait_for(call, max(deadline.remaining_s(), 0))
+        except asyncio.TimeoutError:
+            for response in deadline.pending if deadline is not None else []:
+                response.cancel()
+            raise deadline_exceeded("during the call") from None
+        finally:
+            current_deadline.reset(token)
+
+
+def admit(
+    func: Callable[..., Awaitable[Any]], config: Optional[AdmissionConfig]
+) -> Callable[..., Awaitable[Any]]:
+    """Apply limits and deadlines to calls of the async ``func``.
+
+    Client deadlines apply to every call, ``config`` adds the limits of the
+    route. Without a ``config``, calls without a client deadline go straight
+    to ``func``, so that routes not asking for admission control pay a lookup.
+    """
+    admission = Admission(config or AdmissionConfig())
+
+    # the wrapper is pickled with the app, so it leaves the context variable
+    # to a function pickled by reference
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if config is None and get_client_deadline() is None:
+            return await func(*args, **kwargs)
+        return await admission.run(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,112 @@
+import contextvars
+import functools
+import hashlib
+import inspect
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from ray import serve
+
+# keys are hashed onto a fixed ring of slots, which Serve spreads over replicas
+AFFINITY_SLOTS = 256
+AFFINITY_PREFIX = "raycraft-affinity-"
+
+current_affinity: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "raycraft_affinity", default=""
+)
+
+
+def affinity_id(key: Any) -> str:
+    """Map a key to its slot, the same way in every process."""
+    hashed = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return f"{AFFINITY_PREFIX}{int.from_bytes(hashed, 'big') % AFFINITY_SLOTS}"
+
+
+def is_affinity_id(model_id: str) -> bool:
+    return model_id.startswith(AFFINITY_PREFIX)
+
+
+def get_affinity_id() -> str:
+    """Return the slot of the current request, or an empty string."""
+    affinity = current_affinity.get()
+    if affinity:
+        return affinity
+
+    # passed on by the caller when serving a remote method
+    model_id: str = serve.get_multiplexed_model_id()
+    return model_id if is_affinity_id(model_id) else ""
+
+
+async def call_with_affinity(key: Any, call: Awaitable[Any]) -> Any:
+    """Await ``call``, routing the remote calls it makes by ``key``."""
+    token = current_affinity.set(affinity_id(key))
+    try:
+        return await call
+    finally:
+        current_affinity.reset(token)
+
+
+def with_affinity(
+    func: Callable[..., Awaitable[Any]], affinity_key: Callable[..., Any]
+) -> Callable[..., Awaitable[Any]]:
+    """Route the remote calls of the async route ``func`` by ``affinity_key``.
+
+    ``affinity_key`` takes some of the route's parameters, by name. Only calls
+    to remote methods running as their own deployment are routed, the request
+    itself, local remote methods and the route's cache stay on whichever
+    ingress replica Serve picked. Keys share ``AFFINITY_SLOTS`` fixed slots
+    rather than a consistent-hash ring, so keys of a slot move together.
+    """
+    names = list(inspect.signature(affinity_key).parameters)
+    missing = [name for name in names if name not in inspect.signature(func).parameters]
+    if missing:
+        raise ValueError(
+            f"The affinity key of '{func.__name__}' takes {missing}, "
+            "which are not parameters of the route."
+        )
+
+    # the wrapper is pickled with the app, so it leaves the context variable
+    # to a function pickled by reference
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        key = affinity_key(*(kwargs[name] for name in names))
+        return await call_with_affinity(key, func(*args, **kwargs))
+
+    return wrapper
+
+
+def register_affinity(func: Callable[..., Any], max_slots: int) -> Callable[..., Any]:
+    """Report the slots the async ``func`` serves, so Serve routes them back here.
+
+    Slots are reported as multiplexed models: Serve sends a slot to the
+    replicas that reported it, to the replica with the fewest slots when none
+    did, and to any replica once those are saturated for a while. Scaling up
+    or down only moves the slots of new or removed replicas. Each replica
+    reports its ``max_slots`` most recently used slots.
+    """
+
+    async def load_slot(slot: str) -> str:
+        return slot
+
+    registrar = serve.multiplexed(max_num_models_per_replica=max_slots)(load_slot)
+
+    async def register() -> None:
+        model_id = serve.get_multiplexed_model_id()
+        if is_affinity_id(model_id):
+            await registrar(model_id)
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            await register()
+            async for item in func(*args, **kwargs):
+                yield item
+
+        return async_gen_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        await register()
+        return await func(*args, **kwargs)
+
+    return wrapper
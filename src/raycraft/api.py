@@ -1,22 +1,109 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
 import inspect
-from ray.serve import deployment, ingress
-from varname import varname
-from fastapi import FastAPI
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Type, Union
+from types import CodeType
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    overload,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
-from fastapi import routing
-from fastapi.datastructures import Default
+import ray
+from fastapi import FastAPI, Request, routing
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.dependencies.utils import get_typed_return_annotation, get_typed_signature
 from fastapi.params import Depends
 from fastapi.types import DecoratedCallable
 from fastapi.utils import generate_unique_id
-from starlette.responses import JSONResponse, Response
+from ray.serve import batch, deployment, get_replica_context, ingress
+from ray.serve._private.constants import SERVE_DEFAULT_APP_NAME
+from ray.serve._private.http_util import ASGIAppReplicaWrapper
+from ray.serve.handle import DeploymentHandle
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.routing import BaseRoute
+from varname import varname
+
+from .admission import (
+    AdmissionConfig,
+    admit,
+    DeadlineMiddleware,
+    Rejected,
+    rejected_response,
+    track_remote_call,
+)
+from .affinity import get_affinity_id, register_affinity, with_affinity
+from .autoscaling import AutoscalingController, AutoscalingPolicy, start_signal_reporter
+from .cache import CacheConfig, cached
+from .grpc_ingress import (
+    build_grpc_method,
+    grpc_io_models,
+    render_proto,
+    servicer_import_path,
+)
+from .initializers import dependencies, enter_initializer, startup_order
+from .metrics import (
+    get_replica_metrics,
+    instrument,
+    instrument_batch,
+    MetricsConfig,
+    ReplicaMetrics,
+)
+from .multiplex import build_model_loader, get_model_id, local_model_id, MODEL_ID_HEADER
+from .profiling import (
+    build_profile_endpoint,
+    collect_profiles,
+    ProfilingConfig,
+    start_profile_listener,
+)
+from .reload import (
+    digest,
+    dump_functions,
+    function_interface,
+    function_source,
+    global_data,
+    global_references,
+    hot_swappable,
+    load_functions,
+    stable_repr,
+)
+from .replica import create_replica, get_replica, set_local_replica, starting_replica
+from .shared import load_shared, release_shared, shared_name
+from .streaming import encode_chunks, is_generator_function
+from .tracing import trace_kwargs, traced, TraceMiddleware, Tracer, TracingConfig
+
 # from mypy_extensions import VarArg, KwArg
 # from typing_extensions import StaticMethod
 
 IncEx = Union[Set[int], Set[str], Dict[int, Any], Dict[str, Any]]
 
+# teardowns started by the garbage collector, the loop only keeps weak references
+_stopping_replicas: Set["asyncio.Task[None]"] = set()
+
 
 def to_camel_case(text: str) -> str:
     text = text.replace("_", " ")
@@ -25,33 +112,572 @@ def to_camel_case(text: str) -> str:
 
 def maybe_wrap_as_staticmethod(
     func: Callable[..., Any]
-# ) -> Union[StaticMethod[[VarArg(Any), KwArg(Any)], Any], Callable[..., Any]]:
+    # ) -> Union[StaticMethod[[VarArg(Any), KwArg(Any)], Any], Callable[..., Any]]:
 ) -> Callable[..., Any]:
     params = list(inspect.signature(func).parameters)
 
     if len(params) == 0:
-        return staticmethod(func) # type: ignore [return-value]
+        return staticmethod(func)  # type: ignore [return-value]
 
     first_param = params[0]
     if first_param not in {"app"}:
-        return staticmethod(func) # type: ignore [return-value]
+        return staticmethod(func)  # type: ignore [return-value]
     else:
         return func
 
 
+async def run_in_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a sync function on the serving replica's thread pool."""
+    loop = asyncio.get_running_loop()
+    executor = getattr(get_replica(), "_executor", None)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def iterate_in_executor(
+    func: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any
+) -> AsyncIterator[Any]:
+    """Advance a sync generator on the replica's thread pool, one item at a time."""
+    iterator = func(*args, **kwargs)
+    exhausted = object()
+
+    while True:
+        item = await run_in_executor(next, iterator, exhausted)
+        if item is exhausted:
+            break
+        yield item
+
+
+def is_async(func: Callable[..., Any]) -> bool:
+    return inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func)
+
+
+def make_async(func: Callable[..., Any]) -> Callable[..., Any]:
+    if is_async(func):
+        return func
+
+    if inspect.isgeneratorfunction(inspect.unwrap(func)):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            async for item in iterate_in_executor(func, *args, **kwargs):
+                yield item
+
+        return async_gen_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_in_executor(func, *args, **kwargs)
+
+    return wrapper
+
+
+class LocalCall:
+    """A call to a sync remote method served by the calling replica.
+
+    Like Serve's ``DeploymentResponse``, async code awaits it, which runs the
+    method on the replica's thread pool, and sync code off the event loop
+    calls ``result()``, which runs it in the calling thread. Calls to sync
+    generators are iterated with ``async for`` or ``for`` instead.
+    """
+
+    def __init__(
+        self, func: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def _check_off_loop(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        raise RuntimeError(
+            f"'{self._func.__name__}' would block the event loop, await the "
+            "call instead."
+        )
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return run_in_executor(self._func, *self._args, **self._kwargs).__await__()
+
+    def result(self) -> Any:
+        self._check_off_loop()
+        return self._func(*self._args, **self._kwargs)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return iterate_in_executor(self._func, *self._args, **self._kwargs)
+
+    def __iter__(self) -> Iterator[Any]:
+        self._check_off_loop()
+        return iter(self._func(*self._args, **self._kwargs))
+
+
+def dispatch_to_executor(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Make calls to a sync function return a ``LocalCall``.
+
+    Calls return the same type whether they are made from the event loop or
+    from a thread, so callers do not depend on where they run.
+    """
+    if is_async(func):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> LocalCall:
+        return LocalCall(func, args, kwargs)
+
+    return wrapper
+
+
+def pass_replica_as_app(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Supply the leading ``app`` parameter from the serving replica."""
+    params = list(inspect.signature(func).parameters)
+    if len(params) == 0 or params[0] not in {"app"}:
+        return func
+
+    # not using functools.wraps, the wrapper must not look like it takes app
+    wrapper: Callable[..., Any]
+    if inspect.iscoroutinefunction(func):
+
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await func(get_replica(), *args, **kwargs)
+
+        wrapper = async_wrapper
+    else:
+
+        def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+            return func(get_replica(), *args, **kwargs)
+
+        wrapper = sync_wrapper
+
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def build_remote_method(
+    method_dict: Dict[str, Any],
+    instrumented: bool,
+    deployed: bool = False,
+    affinity: bool = False,
+    tracer: Optional[Tracer] = None,
+) -> Callable[..., Any]:
+    """Wrap a remote method for the replica class serving it.
+
+    Methods of their own deployment are only called by Serve, from the event
+    loop, so sync ones become async functions run on the thread pool. With
+    ``affinity``, they report the affinity slots they serve. With a
+    ``tracer``, calls are traced, continuing the caller's trace when deployed.
+    """
+    func = method_dict["func"]
+    name = func.__name__
+    cache = method_dict["cache"]
+
+    if method_dict["batch_max_size"] is not None:
+        # serve.batch only accepts coroutines, sync functions run off the loop.
+        # app is supplied by the replica so that the batch queue never sees it
+        func = make_async(pass_replica_as_app(func))
+        if instrumented:
+            func = instrument_batch(func, method_dict["batch_max_size"])
+        func = batch(
+            max_batch_size=method_dict["batch_max_size"],
+            batch_wait_timeout_s=method_dict["batch_wait_timeout_s"],
+        )(func)
+        if cache is not None:
+            func = cached(func, cache)
+        if instrumented:
+            func = instrument(func, "remote", name)
+        if tracer is not None and not deployed:
+            func = traced(func, tracer, name)
+    else:
+        if cache is not None:
+            func = cached(func, cache)
+        if instrumented:
+            func = instrument(func, "remote", name)
+        if tracer is not None and not deployed:
+            func = traced(func, tracer, name)
+        func = make_async(func) if deployed else dispatch_to_executor(func)
+
+    if tracer is not None and deployed:
+        func = traced(func, tracer, name, "server", remote_parent=True)
+    if affinity:
+        func = register_affinity(func, method_dict["max_affinity_slots_per_replica"])
+
+    return maybe_wrap_as_staticmethod(func)
+
+
+def as_deployment_handle(handle: Any) -> DeploymentHandle:
+    # older ray versions inject the legacy handle into the constructor
+    if isinstance(handle, DeploymentHandle):
+        return handle
+    return handle.options(use_new_handle_api=True)  # type: ignore [no-any-return]
+
+
+def stream_response(
+    func: Callable[..., Any], response_class: Any
+) -> Callable[..., Any]:
+    """Send what a generator route yields as a streaming response."""
+    if not (
+        isinstance(response_class, type)
+        and issubclass(response_class, StreamingResponse)
+    ):
+        response_class = StreamingResponse
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if inspect.isasyncgenfunction(func):
+            chunks = func(*args, **kwargs)
+        else:
+            chunks = iterate_in_executor(func, *args, **kwargs)
+        return response_class(encode_chunks(chunks))
+
+    return wrapper
+
+
+def build_route(method_dict: Dict[str, Any]) -> Callable[..., Any]:
+    func = method_dict["func"]
+
+    if method_dict["cache"] is not None:
+        func = cached(func, method_dict["cache"])
+
+    if is_generator_function(func):
+        func = stream_response(func, method_dict["kwargs"]["response_class"])
+
+    return func  # type: ignore [no-any-return]
+
+
+def get_route_kwargs(method_dict: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = method_dict["kwargs"]
+
+    # fastapi cannot build a response model from an iterator return annotation
+    if is_generator_function(method_dict["func"]) and isinstance(
+        kwargs["response_model"], DefaultPlaceholder
+    ):
+        kwargs = {**kwargs, "response_model": None}
+
+    return kwargs  # type: ignore [no-any-return]
+
+
+async def metrics_endpoint() -> Response:
+    replica_metrics = get_replica_metrics()
+    content = "" if replica_metrics is None else replica_metrics.render()
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
+
+async def get_replica_instance() -> Any:
+    return get_replica()
+
+
+def async_ingress(app: FastAPI, cls_: type) -> type:
+    """Wrap ``cls_`` with ``serve.ingress``, awaiting its async constructor.
+
+    The class returned by ``serve.ingress`` calls the constructor of ``cls_``
+    without awaiting it, so its ``__init__`` is replaced.
+    """
+    ingress_cls = ingress(app)(cls_)
+
+    async def constructor(obj: Any, *args: Any, **kwargs: Any) -> None:
+        await cls_.__init__(obj, *args, **kwargs)  # type: ignore [misc]
+        ASGIAppReplicaWrapper.__init__(obj, app)
+
+    return type(cls_.__name__, (ingress_cls,), {"__init__": constructor})
+
+
+def call_deployment(
+    handle: DeploymentHandle, affinity: bool, propagate_trace: bool = False
+) -> Callable[..., Any]:
+    """Call ``handle`` on behalf of the current request.
+
+    The request's model id is passed on, or its affinity slot when
+    ``affinity`` is set, as well as its trace context with
+    ``propagate_trace``. The call is cancelled if the request's deadline passes.
+    """
+
+    def remote(*args: Any, **kwargs: Any) -> Any:
+        if propagate_trace:
+            kwargs = {**kwargs, **trace_kwargs()}
+        model_id = get_model_id()
+        if not model_id and affinity:
+            model_id = get_affinity_id()
+        if model_id:
+            response = handle.options(multiplexed_model_id=model_id).remote(
+                *args, **kwargs
+            )
+        else:
+            response = handle.remote(*args, **kwargs)
+        return track_remote_call(response)
+
+    return remote
+
+
+def bind_to_replica(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Resolve the leading ``app`` parameter of a route to the serving replica.
+
+    Sync routes are run on the replica's thread pool. The endpoint's signature
+    has its annotations resolved, so it can be wrapped further.
+    """
+    signature = get_typed_signature(inspect.unwrap(func))
+    return_annotation = get_typed_return_annotation(inspect.unwrap(func))
+    params = list(signature.parameters.values())
+    takes_app = len(params) > 0 and params[0].name in {"app"}
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            return await func(*args, **kwargs)
+
+    else:
+
+        @functools.wraps(func)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            return await run_in_executor(func, *args, **kwargs)
+
+    if takes_app:
+        # the app parameter becomes a dependency, so the remaining parameters must
+        # be keyword-only to keep the signature valid (fastapi calls with kwargs)
+        app_param, *other_params = params
+        params = [
+            app_param.replace(default=Depends(get_replica_instance)),
+            *[param.replace(kind=param.KEYWORD_ONLY) for param in other_params],
+        ]
+
+    endpoint.__signature__ = signature.replace(  # type: ignore [attr-defined]
+        parameters=params,
+        return_annotation=(
+            signature.empty if return_annotation is None else return_annotation
+        ),
+    )
+    return endpoint
+
+
 class RayCraftAPI:
-    def __init__(self, **serve_deployment_kwargs: Any) -> None:
+    def __init__(
+        self,
+        *,
+        max_threads: Optional[int] = None,
+        metrics: Optional[MetricsConfig] = MetricsConfig(),
+        autoscaling_policy: Optional[AutoscalingPolicy] = None,
+        profiling: Optional[ProfilingConfig] = None,
+        tracing: Optional[TracingConfig] = None,
+        **serve_deployment_kwargs: Any,
+    ) -> None:
+        """Collect routes, initializers and remote methods for a Serve deployment.
+
+        Sync routes and remote methods run on a per-replica pool of up to
+        ``max_threads`` threads, capped at the deployment's maximum number of
+        concurrent queries so that no more work runs than the replica admits.
+
+        Calls and initializers are instrumented unless ``metrics`` is None.
+
+        An ``autoscaling_policy`` scales the ingress on the load signals RayCraft
+        collects, in place of Serve's ``num_replicas`` and ``autoscaling_config``.
+        It is applied by a blocking ``raycraft run`` and only while it runs, the
+        app keeps its last number of replicas once that process exits.
+
+        ``profiling`` lets replicas be profiled while they serve traffic, see
+        ``ProfilingConfig``.
+
+        ``tracing`` records spans of routes, remote method calls, initializers
+        and warmups, see ``TracingConfig``.
+        """
+        if autoscaling_policy is not None:
+            if metrics is None:
+                raise ValueError("An autoscaling policy requires metrics.")
+            if {"num_replicas", "autoscaling_config"} & set(serve_deployment_kwargs):
+                raise ValueError(
+                    "An autoscaling policy replaces num_replicas and "
+                    "autoscaling_config, they cannot be passed together."
+                )
+
+        self._max_threads = max_threads
+        self._metrics_config = metrics
+        self._autoscaling_policy = autoscaling_policy
+        self._profiling_config = profiling
+        self._tracer = Tracer(tracing) if tracing is not None else None
         self._serve_deployment_kwargs = serve_deployment_kwargs
         self._deployment_name = varname()
-        self._initializers: Dict[str, Callable[..., Any]] = {}
-        self._remote_methods: Dict[str, Callable[..., Any]] = {}
+        self._initializers: Dict[str, Dict[str, Any]] = {}
+        self._remote_methods: Dict[str, Dict[str, Any]] = {}
+        self._warmups: Dict[str, Dict[str, Any]] = {}
         self._http_methods: Dict[str, Dict[str, Any]] = {}
+        self._grpc_methods: Dict[str, Dict[str, Any]] = {}
 
+    @overload
     def init(self, func: DecoratedCallable) -> None:
-        self._initializers[func.__name__] = func
+        ...
+
+    @overload
+    def init(
+        self,
+        *,
+        shared: bool = False,
+        multiplexed: bool = False,
+        max_models_per_replica: int = 3,
+        ray_actor_options: Optional[Dict[str, Any]] = None,
+    ) -> Callable[[DecoratedCallable], None]:
+        ...
+
+    def init(
+        self,
+        func: Optional[DecoratedCallable] = None,
+        *,
+        shared: bool = False,
+        multiplexed: bool = False,
+        max_models_per_replica: int = 3,
+        ray_actor_options: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Callable[[DecoratedCallable], None]]:
+        """Register an initializer whose output is available as ``app.<name>``.
+
+        With ``shared=True``, the initializer only runs once per node and its
+        output is kept in Ray's object store, other replicas on the node read it
+        from there. Buffers such as numpy arrays are then shared without a copy.
+        The initializer runs in an actor started with ``ray_actor_options``,
+        e.g. ``{"num_gpus": 1}`` for a model loaded on a GPU.
+
+        Initializers taking other initializers as parameters run once those
+        are ready, independent ones run concurrently. A generator initializer
+        yields its value and the code after ``yield`` runs when the replica
+        stops.
+
+        With ``multiplexed=True``, the initializer takes a model id and
+        ``await app.<name>(model_id)`` loads models on demand, keeping the
+        ``max_models_per_replica`` most recently used ones on each replica.
+        Without an argument, the model id of the request is used.
+        """
+        if shared and multiplexed:
+            raise ValueError("An initializer cannot be both shared and multiplexed.")
+        if ray_actor_options is not None and not shared:
+            raise ValueError("Only shared initializers take ray_actor_options.")
+
+        def decorator(func: DecoratedCallable) -> None:
+            if shared and is_generator_function(func):
+                raise ValueError("A shared initializer cannot have a teardown.")
+            if multiplexed and is_generator_function(func):
+                raise ValueError("A multiplexed initializer cannot have a teardown.")
+            self._initializers[func.__name__] = {
+                "func": func,
+                "shared": shared,
+                "multiplexed": multiplexed,
+                "max_models_per_replica": max_models_per_replica,
+                "ray_actor_options": ray_actor_options,
+            }
 
-    def remote(self, func: DecoratedCallable) -> None:
-        self._remote_methods[func.__name__] = func
+        if func is None:
+            return decorator
+
+        decorator(func)
+        return None
+
+    @overload
+    def warmup(self, func: DecoratedCallable) -> None:
+        ...
+
+    @overload
+    def warmup(
+        self, *, repeat: int = 1, deployment: Optional[str] = None
+    ) -> Callable[[DecoratedCallable], None]:
+        ...
+
+    def warmup(
+        self,
+        func: Optional[DecoratedCallable] = None,
+        *,
+        repeat: int = 1,
+        deployment: Optional[str] = None,
+    ) -> Optional[Callable[[DecoratedCallable], None]]:
+        """Register a function warming up each replica before it takes traffic.
+
+        It receives the replica as ``app`` once the initializers are done and
+        is called ``repeat`` times, typically sending sample inputs through
+        remote methods. The replica only reports ready once every warmup
+        succeeded. Warmups run on the ingress, or on the replicas of the
+        remote method named by ``deployment`` when it runs on its own.
+        """
+
+        def decorator(func: DecoratedCallable) -> None:
+            self._warmups[func.__name__] = {
+                "func": func,
+                "repeat": repeat,
+                "deployment": deployment,
+            }
+
+        if func is None:
+            return decorator
+
+        decorator(func)
+        return None
+
+    @overload
+    def remote(self, func: DecoratedCallable, /) -> None:
+        ...
+
+    @overload
+    def remote(
+        self,
+        *,
+        batch_max_size: Optional[int] = None,
+        batch_wait_timeout_s: float = 0.0,
+        initializers: Optional[Sequence[str]] = None,
+        cache: Optional[CacheConfig] = None,
+        max_affinity_slots_per_replica: int = 64,
+        **serve_deployment_kwargs: Any,
+    ) -> Callable[[DecoratedCallable], None]:
+        ...
+
+    def remote(
+        self,
+        func: Optional[DecoratedCallable] = None,
+        *,
+        batch_max_size: Optional[int] = None,
+        batch_wait_timeout_s: float = 0.0,
+        initializers: Optional[Sequence[str]] = None,
+        cache: Optional[CacheConfig] = None,
+        max_affinity_slots_per_replica: int = 64,
+        **serve_deployment_kwargs: Any,
+    ) -> Optional[Callable[[DecoratedCallable], None]]:
+        """Register a method callable as ``app.<name>(...)`` on every replica.
+
+        When ``batch_max_size`` is set, concurrent calls are queued and the
+        function is called once with a list of up to ``batch_max_size`` items,
+        waiting at most ``batch_wait_timeout_s`` for a batch to fill. It must
+        return one result per item and callers have to ``await`` the call.
+
+        Passing ``serve_deployment_kwargs`` (e.g. ``num_replicas``) runs the
+        method as its own deployment, scaled independently of the ingress.
+        ``app.<name>(...)`` then returns a ``DeploymentResponse`` to ``await``.
+        Its replicas run the ``initializers`` listed (all of them by default),
+        and listed initializers are no longer run by the ingress.
+
+        ``cache`` memoizes results on each replica, see ``CacheConfig``.
+
+        Calls from routes with an ``affinity_key`` are routed to the replicas
+        that served the same key, each replica keeps the
+        ``max_affinity_slots_per_replica`` most recently used keys, hashed onto
+        slots.
+        """
+        if max_affinity_slots_per_replica < 1:
+            raise ValueError("max_affinity_slots_per_replica must be at least 1.")
+
+        def decorator(func: DecoratedCallable) -> None:
+            self._remote_methods[func.__name__] = {
+                "func": func,
+                "batch_max_size": batch_max_size,
+                "batch_wait_timeout_s": batch_wait_timeout_s,
+                "initializers": initializers,
+                "cache": cache,
+                "max_affinity_slots_per_replica": max_affinity_slots_per_replica,
+                "serve_deployment_kwargs": serve_deployment_kwargs,
+            }
+
+        if func is None:
+            return decorator
+
+        decorator(func)
+        return None
 
     def get(
         self,
@@ -81,9 +707,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "get",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -110,6 +740,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -142,9 +775,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "put",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -171,6 +808,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -203,9 +843,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "post",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -232,6 +876,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -264,9 +911,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "delete",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -293,6 +944,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -325,9 +979,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "options",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -354,6 +1012,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -386,9 +1047,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "head",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -415,6 +1080,9 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
             }
 
         return decorator
@@ -447,9 +1115,13 @@ class RayCraftAPI:
         generate_unique_id_function: Callable[[routing.APIRoute], str] = Default(
             generate_unique_id
         ),
+        cache: Optional[CacheConfig] = None,
+        admission: Optional[AdmissionConfig] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
     ) -> Callable[[DecoratedCallable], None]:
         def decorator(func: DecoratedCallable) -> None:
             self._http_methods[func.__name__] = {
+                "method": "patch",
                 "args": [path],
                 "kwargs": {
                     "response_model": response_model,
@@ -476,52 +1148,942 @@ class RayCraftAPI:
                     "generate_unique_id_function": generate_unique_id_function,
                 },
                 "func": func,
+                "cache": cache,
+                "admission": admission,
+                "affinity_key": affinity_key,
+            }
+
+        return decorator
+
+    def websocket(
+        self,
+        path: str,
+        *,
+        name: Optional[str] = None,
+        dependencies: Optional[Sequence[Depends]] = None,
+        affinity_key: Optional[Callable[..., Any]] = None,
+    ) -> Callable[[DecoratedCallable], None]:
+        """Register an async handler for WebSocket sessions on ``path``.
+
+        The handler takes ``app`` and a ``fastapi.WebSocket``, accepts the
+        connection and exchanges messages until either side closes it. Every
+        message can call remote methods, without the cost of a new request.
+        """
+
+        def decorator(func: DecoratedCallable) -> None:
+            if not inspect.iscoroutinefunction(func):
+                raise TypeError(
+                    f"The WebSocket handler '{func.__name__}' must be async."
+                )
+            self._http_methods[func.__name__] = {
+                "method": "websocket",
+                "args": [path],
+                "kwargs": {"name": name, "dependencies": dependencies},
+                "func": func,
+                "cache": None,
+                "admission": None,
+                "affinity_key": affinity_key,
             }
 
         return decorator
 
-    def __call__(self) -> Any:
+    @overload
+    def grpc(self, func: DecoratedCallable) -> DecoratedCallable:
+        ...
+
+    @overload
+    def grpc(
+        self,
+        *,
+        name: Optional[str] = None,
+        admission: Optional[AdmissionConfig] = None,
+    ) -> Callable[[DecoratedCallable], DecoratedCallable]:
+        ...
+
+    def grpc(
+        self,
+        func: Optional[DecoratedCallable] = None,
+        *,
+        name: Optional[str] = None,
+        admission: Optional[AdmissionConfig] = None,
+    ) -> Union[DecoratedCallable, Callable[[DecoratedCallable], DecoratedCallable]]:
+        """Serve a handler over gRPC, as a method of the app's service.
+
+        The handler takes one pydantic model besides ``app`` and is annotated to
+        return one, the service's messages are generated from them, see
+        ``grpc_proto``. The method is named ``name``, the handler's name in
+        CamelCase by default. The handler is returned, so it can also be
+        registered as a route.
+        """
+
+        def decorator(func: DecoratedCallable) -> DecoratedCallable:
+            param_name, request_model, response_model = grpc_io_models(func)
+            self._grpc_methods[name or to_camel_case(func.__name__)] = {
+                "func": func,
+                "param_name": param_name,
+                "request_model": request_model,
+                "response_model": response_model,
+                "admission": admission,
+            }
+            return func
+
+        if func is None:
+            return decorator
+
+        return decorator(func)
+
+    def grpc_service_name(self) -> str:
+        """The name of the app's gRPC service, in the ``raycraft`` package."""
+        return to_camel_case(self._deployment_name)
+
+    def grpc_proto(self) -> str:
+        """Return the ``.proto`` file of the app's gRPC service, for clients."""
+        return render_proto(
+            self.grpc_service_name(),
+            {
+                method_name: (
+                    method_dict["request_model"],
+                    method_dict["response_model"],
+                )
+                for method_name, method_dict in self._grpc_methods.items()
+            },
+        )
+
+    def grpc_servicer_function(self) -> Optional[str]:
+        """Return the servicer function to list in Serve's ``gRPCOptions``.
+
+        None when the app has no gRPC methods.
+        """
+        if not self._grpc_methods:
+            return None
+        return servicer_import_path(self.grpc_service_name(), list(self._grpc_methods))
+
+    def _get_max_threads(
+        self, serve_deployment_kwargs: Dict[str, Any]
+    ) -> Optional[int]:
+        max_concurrent_queries: Optional[int] = serve_deployment_kwargs.get(
+            "max_concurrent_queries",
+            serve_deployment_kwargs.get("max_ongoing_requests"),
+        )
+        if self._max_threads is None:
+            return max_concurrent_queries
+        if max_concurrent_queries is None:
+            return self._max_threads
+        return min(self._max_threads, max_concurrent_queries)
+
+    def _span(self, name: str) -> ContextManager[Any]:
+        if self._tracer is None:
+            return contextlib.nullcontext()
+        return self._tracer.span(name)
+
+    async def _run_initializers(
+        self, obj: Any, initializer_names: Sequence[str], local: bool = False
+    ) -> None:
+        """Run initializers concurrently, each once its dependencies are ready."""
+        runs: Dict[str, "asyncio.Future[Any]"] = {}
+        # outputs of shared initializers, passed on to the ones depending on them
+        shared_refs: Dict[str, ray.ObjectRef[Any]] = {}
+        # threads for sync initializers, not to wait on the replica's pool
+        executor = ThreadPoolExecutor(
+            max_workers=max(len(initializer_names), 1),
+            thread_name_prefix=f"{type(obj).__name__}Init",
+        )
+
+        async def run(initializer_name: str) -> Any:
+            initializer_dict = self._initializers[initializer_name]
+            func = initializer_dict["func"]
+            # multiplexed initializers are already set on the replica
+            kwargs = {
+                dependency: (
+                    await runs[dependency]
+                    if dependency in runs
+                    else getattr(obj, dependency)
+                )
+                for dependency in dependencies(func, self._initializers)
+            }
+
+            start = time.perf_counter()
+            with self._span(f"init {initializer_name}"):
+                if initializer_dict["shared"] and not local:
+                    load = functools.partial(
+                        load_shared,
+                        shared_name(
+                            get_replica_context().app_name,
+                            f"{to_camel_case(self._deployment_name)}.{initializer_name}",
+                            func,
+                        ),
+                        func,
+                        kwargs,
+                        shared_refs,
+                        initializer_dict["ray_actor_options"],
+                    )
+                    value, ref = await asyncio.get_running_loop().run_in_executor(
+                        executor, load
+                    )
+                    shared_refs[initializer_name] = ref
+                else:
+                    value = await enter_initializer(
+                        func, kwargs, obj._exit_stack, executor
+                    )
+            setattr(obj, initializer_name, value)
+
+            if obj._metrics is not None:
+                obj._metrics.record_initializer(
+                    initializer_name, time.perf_counter() - start
+                )
+            return value
+
+        # every run is scheduled before any of them awaits its dependencies
+        for initializer_name in initializer_names:
+            runs[initializer_name] = asyncio.ensure_future(run(initializer_name))
+        try:
+            await asyncio.gather(*runs.values())
+        except BaseException:
+            for future in runs.values():
+                future.cancel()
+            await obj._exit_stack.aclose()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _warm_up(
+        self, obj: Any, deployment_name: Optional[str], local: bool = False
+    ) -> None:
+        """Run the warmups of a deployment, all of them when served locally."""
+        for warmup_name, warmup_dict in self._warmups.items():
+            target = warmup_dict["deployment"]
+            method_dict = self._remote_methods.get(target or "")
+            # methods without deployment options run on the ingress
+            if method_dict is None or not method_dict["serve_deployment_kwargs"]:
+                target = None
+            if not local and target != deployment_name:
+                continue
+
+            start = time.perf_counter()
+            with self._span(f"warmup {warmup_name}"):
+                for _ in range(warmup_dict["repeat"]):
+                    try:
+                        result = dispatch_to_executor(warmup_dict["func"])(obj)
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception as error:
+                        raise RuntimeError(f"Warmup '{warmup_name}' failed.") from error
+
+            if obj._metrics is not None:
+                obj._metrics.record_initializer(
+                    f"warmup.{warmup_name}", time.perf_counter() - start
+                )
+
+    async def _start_replica(
+        self,
+        obj: Any,
+        initializer_names: Sequence[str],
+        serve_deployment_kwargs: Dict[str, Any],
+        is_ingress: bool = False,
+        local: bool = False,
+        deployment_name: Optional[str] = None,
+    ) -> None:
+        obj._executor = ThreadPoolExecutor(
+            max_workers=self._get_max_threads(serve_deployment_kwargs),
+            thread_name_prefix=type(obj).__name__,
+        )
+        obj._exit_stack = contextlib.AsyncExitStack()
+        replica = weakref.ref(obj)
+
+        async def stop() -> None:
+            # serve awaits the __del__ it finds on the replica when it shuts it
+            # down, the garbage collector calls the sync one of its class
+            obj = replica()
+            if obj is not None:
+                await self._stop_replica(obj)
+
+        obj.__del__ = stop
+        obj._metrics = None
+        if self._metrics_config is not None:
+            obj._metrics = ReplicaMetrics(
+                type(obj).__name__, self._metrics_config, export=not local
+            )
+
+        for initializer_name in initializer_names:
+            initializer_dict = self._initializers[initializer_name]
+            if initializer_dict["multiplexed"]:
+                # models are loaded by the requests that need them
+                model_loader = build_model_loader(
+                    make_async(initializer_dict["func"]),
+                    initializer_dict["max_models_per_replica"],
+                    local,
+                )
+                setattr(obj, initializer_name, model_loader)
+
+        with self._span(f"start {type(obj).__name__}"):
+            await self._run_initializers(
+                obj,
+                [
+                    initializer_name
+                    for initializer_name in initializer_names
+                    if not self._initializers[initializer_name]["multiplexed"]
+                ],
+                local,
+            )
+
+            # serve only routes requests to the replica once its constructor returns
+            token = starting_replica.set(obj)
+            try:
+                await self._warm_up(obj, deployment_name, local)
+            finally:
+                starting_replica.reset(token)
+
+        if (
+            is_ingress
+            and not local
+            and self._autoscaling_policy is not None
+            and obj._metrics is not None
+        ):
+            start_signal_reporter(
+                get_replica_context().app_name,
+                type(obj).__name__,
+                ray.get_runtime_context().get_actor_id(),
+                obj._metrics.signals,
+                self._autoscaling_policy.interval_s,
+            )
+
+        if not local and self._profiling_config is not None:
+            start_profile_listener(
+                get_replica_context().app_name,
+                to_camel_case(self._deployment_name),
+                get_replica_context().replica_tag,
+                self._profile_codes,
+                self._profiling_config,
+            )
+
+    async def _stop_replica(self, obj: Any) -> None:
+        """Run the teardown of generator initializers, in reverse order.
+
+        The replica is also released from its shared initializers.
+        """
+        exit_stack = getattr(obj, "_exit_stack", None)
+        if exit_stack is not None:
+            obj._exit_stack = None
+            await exit_stack.aclose()
+            obj._executor.shutdown(wait=False)
+            await release_shared()
+
+    def _stop_replica_soon(self, obj: Any) -> None:
+        """Stop a replica that is garbage collected before it was stopped."""
+        if getattr(obj, "_exit_stack", None) is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._stop_replica(obj))
+            return
+        task = loop.create_task(self._stop_replica(obj))
+        _stopping_replicas.add(task)
+        task.add_done_callback(_stopping_replicas.discard)
+
+    def _build_remote_deployment(
+        self, method_name: str, method_dict: Dict[str, Any], reloadable: bool = False
+    ) -> Any:
+        initializer_names = method_dict["initializers"]
+        if initializer_names is None:
+            initializer_names = list(self._initializers)
+        initializer_names = startup_order(self._initializers, initializer_names)
+
+        # serve awaits async constructors
+        async def constructor(obj: Any) -> None:
+            await self._start_replica(
+                obj,
+                initializer_names,
+                method_dict["serve_deployment_kwargs"],
+                deployment_name=method_name,
+            )
+
+        def destructor(obj: Any) -> None:
+            self._stop_replica_soon(obj)
+
+        cls_ = type(
+            to_camel_case(self._deployment_name) + to_camel_case(method_name),
+            (object,),
+            {
+                "__init__": constructor,
+                "__del__": destructor,
+                method_name: build_remote_method(
+                    method_dict,
+                    self._metrics_config is not None,
+                    deployed=True,
+                    affinity=not self._is_multiplexed(initializer_names),
+                    tracer=self._tracer,
+                ),
+            },
+        )
+
+        serve_deployment_kwargs = method_dict["serve_deployment_kwargs"]
+        if reloadable:
+            # unchanged methods keep their replicas when the app is redeployed
+            serve_deployment_kwargs = {
+                "version": self._remote_deployment_version(method_name, method_dict),
+                **serve_deployment_kwargs,
+            }
+
+        deployment_decorator = deployment(**serve_deployment_kwargs)
+        return deployment_decorator(cls_).bind()
+
+    def fingerprints(self) -> Dict[str, str]:
+        """Hash the app, split by what a change to it requires.
+
+        ``spec`` covers everything baked into the replicas: options, paths,
+        signatures, initializers and the module data the code reads. ``code``
+        covers the bodies of routes and local remote methods and the helpers
+        they call, which reloadable apps swap in place.
+        """
+        spec = [
+            stable_repr(self._serve_deployment_kwargs),
+            stable_repr(self._max_threads),
+            stable_repr(self._metrics_config),
+            stable_repr(self._autoscaling_policy),
+            stable_repr(self._profiling_config),
+            stable_repr(self._tracer.config if self._tracer is not None else None),
+        ]
+        code = []
+
+        for name, initializer_dict in self._initializers.items():
+            options = {k: v for k, v in initializer_dict.items() if k != "func"}
+            spec.append(f"init {name} {stable_repr(options)}")
+            spec.append(function_source(initializer_dict["func"]))
+
+        for name, warmup_dict in self._warmups.items():
+            options = {k: v for k, v in warmup_dict.items() if k != "func"}
+            spec.append(f"warmup {name} {stable_repr(options)}")
+            spec.append(function_source(warmup_dict["func"]))
+
+        for name, method_dict in self._remote_methods.items():
+            options = {k: v for k, v in method_dict.items() if k != "func"}
+            spec.append(f"remote {name} {stable_repr(options)}")
+            spec.append(function_interface(method_dict["func"]))
+            code.append(function_source(method_dict["func"]))
+
+        for name, method_dict in self._http_methods.items():
+            options = {k: v for k, v in method_dict.items() if k != "func"}
+            spec.append(f"route {name} {stable_repr(options)}")
+            spec.append(function_interface(method_dict["func"]))
+            code.append(function_source(method_dict["func"]))
+
+        for name, method_dict in self._grpc_methods.items():
+            options = {k: v for k, v in method_dict.items() if k != "func"}
+            spec.append(f"grpc {name} {stable_repr(options)}")
+            spec.append(function_interface(method_dict["func"]))
+            code.append(function_source(method_dict["func"]))
+
+        # replicas keep the module data they imported, see dump_functions
+        swapped = [
+            method_dict["func"]
+            for registry in (
+                self._remote_methods,
+                self._http_methods,
+                self._grpc_methods,
+            )
+            for method_dict in registry.values()
+        ]
+        spec.append(
+            global_references(
+                *(init_dict["func"] for init_dict in self._initializers.values()),
+                *(warmup_dict["func"] for warmup_dict in self._warmups.values()),
+            )
+        )
+        spec.append(global_data(*swapped))
+        code.append(global_references(*swapped))
+
+        return {"spec": digest(*spec), "code": digest(*code)}
+
+    def _profile_codes(self, target: Optional[str]) -> Optional[Set[CodeType]]:
+        """The code of the routes or remote methods ``target`` names."""
+        if target is None:
+            return None
+
+        funcs = [
+            method_dict["func"]
+            for name, method_dict in self._http_methods.items()
+            if target in {name, method_dict["args"][0]}
+        ]
+        for registry in (self._remote_methods, self._grpc_methods):
+            if target in registry:
+                funcs.append(registry[target]["func"])
+        if not funcs:
+            raise ValueError(
+                f"The app has no route, gRPC method or remote method '{target}'."
+            )
+        return {inspect.unwrap(func).__code__ for func in funcs}
+
+    def _is_multiplexed(self, initializer_names: Optional[Sequence[str]]) -> bool:
+        """Whether replicas running ``initializer_names`` load models by id."""
+        if initializer_names is None:
+            initializer_names = list(self._initializers)
+        return any(
+            self._initializers[name]["multiplexed"]
+            for name in startup_order(self._initializers, initializer_names)
+        )
+
+    def _check_model_ids(
+        self,
+        ingress_initializers: Sequence[str],
+        deployed_methods: Dict[str, Dict[str, Any]],
+    ) -> None:
+        """Check that each deployment routes by a single kind of model id.
+
+        Serve keeps one list of the model ids a replica holds, so several
+        multiplexed initializers on a replica, or multiplexed models and
+        affinity slots, would overwrite each other's ids. Affinity keys also
+        need remote methods running as their own deployment to route.
+        """
+        deployments = {to_camel_case(self._deployment_name): ingress_initializers}
+        for method_name, method_dict in deployed_methods.items():
+            names = method_dict["initializers"]
+            deployments[method_name] = startup_order(
+                self._initializers,
+                list(self._initializers) if names is None else names,
+            )
+        for deployment_name, initializer_names in deployments.items():
+            multiplexed = [
+                name
+                for name in initializer_names
+                if self._initializers[name]["multiplexed"]
+            ]
+            if len(multiplexed) > 1:
+                raise ValueError(
+                    f"The '{deployment_name}' deployment runs the multiplexed "
+                    f"initializers {multiplexed}, Serve tracks the models of "
+                    "only one of them per replica."
+                )
+
+        keyed_routes = [
+            name
+            for name, method_dict in self._http_methods.items()
+            if method_dict["affinity_key"] is not None
+        ]
+        if keyed_routes and not deployed_methods:
+            raise ValueError(
+                f"The routes {keyed_routes} have an affinity key, which only "
+                "routes calls to remote methods running as their own "
+                "deployment, and the app has none."
+            )
+        multiplexed_methods = [
+            name
+            for name, method_dict in deployed_methods.items()
+            if self._is_multiplexed(method_dict["initializers"])
+        ]
+        if keyed_routes and multiplexed_methods:
+            raise ValueError(
+                f"The routes {keyed_routes} have an affinity key and the remote "
+                f"methods {multiplexed_methods} multiplexed initializers, both "
+                "route calls by Serve's model id."
+            )
+
+    def _remote_deployment_version(
+        self, method_name: str, method_dict: Dict[str, Any]
+    ) -> str:
+        func = method_dict["func"]
+        initializer_names = method_dict["initializers"]
+        if initializer_names is None:
+            initializer_names = list(self._initializers)
+        initializer_names = startup_order(self._initializers, initializer_names)
+
+        initializer_funcs = [
+            self._initializers[name]["func"] for name in initializer_names
+        ]
+        warmups = [
+            warmup_dict
+            for warmup_dict in self._warmups.values()
+            if warmup_dict["deployment"] == method_name
+        ]
+        return digest(
+            stable_repr({k: v for k, v in method_dict.items() if k != "func"}),
+            stable_repr(self._max_threads),
+            stable_repr(self._metrics_config),
+            stable_repr(self._tracer.config if self._tracer is not None else None),
+            function_source(func),
+            *(function_source(initializer) for initializer in initializer_funcs),
+            *(
+                stable_repr(warmup_dict["repeat"])
+                + function_source(warmup_dict["func"])
+                for warmup_dict in warmups
+            ),
+            # helpers the method calls, not the rest of its module
+            global_references(
+                func,
+                *initializer_funcs,
+                *(warmup_dict["func"] for warmup_dict in warmups),
+            ),
+        )
+
+    def profile(
+        self,
+        seconds: float,
+        target: Optional[str] = None,
+        app_name: str = SERVE_DEFAULT_APP_NAME,
+    ) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Profile every replica of the app running as ``app_name`` for ``seconds``.
+
+        ``target`` limits samples to a route, by path or name, or a remote
+        method. Returns the collapsed stacks and error of each replica.
+        """
+        if self._profiling_config is None:
+            raise ValueError("Profiling is not enabled, pass a ProfilingConfig.")
+        self._profile_codes(target)
+        return collect_profiles(
+            app_name, to_camel_case(self._deployment_name), seconds, target
+        )
+
+    def autoscaling_controller(
+        self, app_name: str = SERVE_DEFAULT_APP_NAME
+    ) -> Optional[AutoscalingController]:
+        """Return a controller applying the autoscaling policy, if there is one.
+
+        It scales the app running as ``app_name``, from the load signals of
+        its replicas only.
+        """
+        if self._autoscaling_policy is None:
+            return None
+
+        return AutoscalingController(
+            self._autoscaling_policy, app_name, to_camel_case(self._deployment_name)
+        )
+
+    def _build_grpc_method(
+        self, method_name: str, method_dict: Dict[str, Any]
+    ) -> Callable[..., Any]:
+        """Wrap a gRPC handler like a route, to take and return message bytes."""
+        handler = make_async(pass_replica_as_app(method_dict["func"]))
+        handler = admit(handler, method_dict["admission"])
+        if self._metrics_config is not None:
+            handler = instrument(handler, "route", method_name)
+        if self._tracer is not None:
+            handler = traced(handler, self._tracer, f"gRPC {method_name}", "server")
+        return build_grpc_method(
+            handler,
+            self.grpc_service_name(),
+            method_dict["param_name"],
+            method_dict["request_model"],
+            method_dict["response_model"],
+        )
+
+    def _build_ingress(
+        self,
+        constructor: Callable[..., Awaitable[None]],
+        local_methods: Dict[str, Dict[str, Any]],
+        reloadable: bool = False,
+    ) -> Tuple[FastAPI, type]:
+        """Build the FastAPI app and the class of the replicas serving it."""
         app = FastAPI()
+        app.add_middleware(DeadlineMiddleware)
+        app.add_exception_handler(Rejected, rejected_response)
+        if self._tracer is not None:
+            app.add_middleware(TraceMiddleware)
+        cache_clears: List[Callable[[], None]] = []
 
-        def constructor(obj: Any) -> None:
-            for (
-                initializer_name,
-                initializer,
-            ) in self._initializers.items():
-                setattr(obj, initializer_name, initializer())
+        def reconfigure(obj: Any, config: Dict[str, Any]) -> None:
+            obj._functions = load_functions(config["functions"])
+            # results of the previous code are stale
+            for cache_clear in cache_clears:
+                cache_clear()
+
+        def swappable(method_name: str, method_dict: Dict[str, Any]) -> Dict[str, Any]:
+            if not reloadable:
+                return method_dict
+            return {
+                **method_dict,
+                "func": hot_swappable(method_name, method_dict["func"]),
+            }
 
-            # for method_name, method in self._remote_methods.items():
-            #     # use MethodType to bind the method to the class
-            #     setattr(obj, method_name, MethodType(method, obj))
+        local_methods = {
+            method_name: swappable(method_name, method_dict)
+            for method_name, method_dict in local_methods.items()
+        }
+        http_methods = {
+            method_name: swappable(method_name, method_dict)
+            for method_name, method_dict in self._http_methods.items()
+        }
+        grpc_methods = {
+            method_name: swappable(method_name, method_dict)
+            for method_name, method_dict in self._grpc_methods.items()
+        }
+        clashes = set(grpc_methods) & {
+            "reconfigure",
+            *local_methods,
+            *http_methods,
+            *self._initializers,
+        }
+        if clashes:
+            raise ValueError(
+                f"The gRPC methods {sorted(clashes)} clash with other names of the "
+                "app, rename them with grpc(name=...)."
+            )
+        grpc_handlers: Dict[str, Callable[..., Any]] = {
+            method_name: staticmethod(self._build_grpc_method(method_name, method_dict))
+            for method_name, method_dict in grpc_methods.items()
+        }
 
-            # for method_name, method_dict in self._http_methods.items():
-            #     # use the fastpi app to add the method as a route
-            #     app.post(method_dict["path"])(MethodType(method_dict["func"], obj))
+        def destructor(obj: Any) -> None:
+            self._stop_replica_soon(obj)
 
         cls_ = type(
             to_camel_case(self._deployment_name),
             (object,),
             {
                 "__init__": constructor,
+                "__del__": destructor,
+                **({"reconfigure": reconfigure} if reloadable else {}),
                 **{
-                    method_name: method
-                    for method_name, method in self._remote_methods.items()
+                    method_name: build_remote_method(
+                        method_dict,
+                        self._metrics_config is not None,
+                        tracer=self._tracer,
+                    )
+                    for method_name, method_dict in local_methods.items()
                 },
                 **{
                     method_name: maybe_wrap_as_staticmethod(method_dict["func"])
-                    for method_name, method_dict in self._http_methods.items()
+                    for method_name, method_dict in http_methods.items()
                 },
+                **grpc_handlers,
             },
         )
 
-        obj = cls_()
-        for method_name, method_dict in self._http_methods.items():
+        # routes are bound without instantiating cls_ so that initializers only
+        # ever run inside the replicas, each route resolves its replica at call time
+        for method_name in local_methods:
+            if hasattr(getattr(cls_, method_name), "cache_clear"):
+                cache_clears.append(getattr(cls_, method_name).cache_clear)
+
+        for method_name, method_dict in http_methods.items():
+            endpoint = bind_to_replica(build_route(method_dict))
+            if hasattr(endpoint, "cache_clear"):
+                cache_clears.append(endpoint.cache_clear)
+            if method_dict["affinity_key"] is not None:
+                endpoint = with_affinity(endpoint, method_dict["affinity_key"])
+            endpoint = admit(endpoint, method_dict["admission"])
+            if self._metrics_config is not None:
+                endpoint = instrument(endpoint, "route", method_name)
+            if self._tracer is not None:
+                span_name = f"{method_dict['method'].upper()} {method_dict['args'][0]}"
+                endpoint = traced(endpoint, self._tracer, span_name, "server")
+
             # use the fastpi app to add the method as a route
-            app.post(*method_dict["args"], **method_dict["kwargs"])(
-                getattr(obj, method_name)
+            getattr(app, method_dict["method"])(
+                *method_dict["args"], **get_route_kwargs(method_dict)
+            )(endpoint)
+
+        if self._metrics_config is not None and self._metrics_config.route:
+            app.get(self._metrics_config.route, include_in_schema=False)(
+                metrics_endpoint
             )
 
-        deloyment_decorator = deployment(**self._serve_deployment_kwargs)
-        deployment_ = deloyment_decorator(ingress(app)(type(obj)))
-        deployment_handle = deployment_.bind()
+        if self._profiling_config is not None:
+            app.get(self._profiling_config.route, include_in_schema=False)(
+                build_profile_endpoint(self._profiling_config, self._profile_codes)
+            )
+
+        return app, cls_
+
+    def __call__(
+        self, num_replicas: Optional[int] = None, reloadable: bool = False
+    ) -> Any:
+        """Build the Serve application.
+
+        A ``reloadable`` app receives the code of its routes and local remote
+        methods through ``user_config``, so redeploying it after editing only
+        their bodies updates the running replicas in place.
+        """
+        serve_deployment_kwargs = self._serve_deployment_kwargs
+        if self._autoscaling_policy is not None:
+            if num_replicas is None:
+                num_replicas = self._autoscaling_policy.min_replicas_at(datetime.now())
+            serve_deployment_kwargs = {
+                **serve_deployment_kwargs,
+                "num_replicas": num_replicas,
+            }
+
+        # a fixed version lets serve apply num_replicas and user_config
+        # changes without restarting the replicas
+        if reloadable:
+            serve_deployment_kwargs = {
+                "version": self.fingerprints()["spec"],
+                **serve_deployment_kwargs,
+                "user_config": {
+                    "functions": dump_functions(
+                        {
+                            method_name: method_dict["func"]
+                            for registry in (
+                                self._remote_methods,
+                                self._http_methods,
+                                self._grpc_methods,
+                            )
+                            for method_name, method_dict in registry.items()
+                            if not method_dict.get("serve_deployment_kwargs")
+                        }
+                    )
+                },
+            }
+        elif self._autoscaling_policy is not None:
+            serve_deployment_kwargs = {
+                "version": digest(*self.fingerprints().values()),
+                **serve_deployment_kwargs,
+            }
+
+        deployed_methods = {
+            method_name: method_dict
+            for method_name, method_dict in self._remote_methods.items()
+            if method_dict["serve_deployment_kwargs"]
+        }
+        local_methods = {
+            method_name: method_dict
+            for method_name, method_dict in self._remote_methods.items()
+            if method_name not in deployed_methods
+        }
+        deployed_initializers = {
+            initializer_name
+            for method_dict in deployed_methods.values()
+            for initializer_name in method_dict["initializers"] or []
+        }
+        initializer_names = startup_order(
+            self._initializers,
+            [
+                initializer_name
+                for initializer_name in self._initializers
+                if initializer_name not in deployed_initializers
+            ],
+        )
+
+        self._check_model_ids(initializer_names, deployed_methods)
+
+        async def constructor(obj: Any, **remote_handles: Any) -> None:
+            # set first, warmups may call remote methods
+            for method_name, handle in remote_handles.items():
+                handle = as_deployment_handle(handle).options(
+                    method_name=method_name,
+                    stream=is_generator_function(deployed_methods[method_name]["func"]),
+                )
+                affinity = not self._is_multiplexed(
+                    deployed_methods[method_name]["initializers"]
+                )
+                setattr(
+                    obj,
+                    method_name,
+                    call_deployment(handle, affinity, self._tracer is not None),
+                )
+
+            await self._start_replica(
+                obj, initializer_names, self._serve_deployment_kwargs, is_ingress=True
+            )
+
+        app, cls_ = self._build_ingress(constructor, local_methods, reloadable)
+
+        deloyment_decorator = deployment(**serve_deployment_kwargs)
+        deployment_ = deloyment_decorator(async_ingress(app, cls_))
+        deployment_handle = deployment_.bind(
+            **{
+                method_name: self._build_remote_deployment(
+                    method_name, method_dict, reloadable
+                )
+                for method_name, method_dict in deployed_methods.items()
+            }
+        )
         return deployment_handle
+
+    def _build_local(self) -> Tuple[FastAPI, type]:
+        initializer_names = startup_order(self._initializers, self._initializers)
+
+        async def constructor(obj: Any) -> None:
+            await self._start_replica(
+                obj,
+                initializer_names,
+                self._serve_deployment_kwargs,
+                is_ingress=True,
+                local=True,
+            )
+
+        return self._build_ingress(constructor, self._remote_methods)
+
+    def local(self) -> FastAPI:
+        """Build the app as a plain FastAPI app, served without Ray.
+
+        Each process serving it is a single replica: initializers run once on
+        startup, shared ones included, and every remote method is called as a
+        local function, even those deployed on their own by ``__call__``.
+        """
+        replica: Dict[str, Any] = {}
+        app, cls_ = self._build_local()
+
+        @app.middleware("http")
+        async def read_model_id(request: Request, call_next: Any) -> Response:
+            # on Serve, the proxy reads the header
+            token = local_model_id.set(request.headers.get(MODEL_ID_HEADER, ""))
+            try:
+                return await call_next(request)  # type: ignore [no-any-return]
+            finally:
+                local_model_id.reset(token)
+
+        @app.on_event("startup")
+        async def start_replica() -> None:
+            replica["obj"] = await create_replica(cls_)
+            set_local_replica(replica["obj"])
+
+        @app.on_event("shutdown")
+        async def stop_replica() -> None:
+            set_local_replica(None)
+            await self._stop_replica(replica.pop("obj"))
+
+        return app
+
+    def map_batches(
+        self,
+        source: Any,
+        method: str,
+        *,
+        batch_size: int = 256,
+        concurrency: int = 1,
+        columns: Optional[Sequence[str]] = None,
+        output_column: Optional[str] = None,
+        **ray_remote_args: Any,
+    ) -> Any:
+        """Call a remote method on every record of a dataset, without HTTP.
+
+        ``source`` is a Ray Dataset or the path of JSONL, Parquet or CSV files.
+        Each of the ``concurrency`` workers runs the initializers once, then
+        calls ``method`` with the ``columns`` of each record, by default the
+        ones named like its parameters. The result is added to the records as
+        ``output_column``, the method name by default.
+
+        The returned dataset is lazy and streamed, see ``raycraft batch``.
+        Workers ask for the resources of the method's deployment unless
+        ``ray_remote_args`` are given.
+        """
+        from .batch import read_records, RecordMapper, require_ray_data
+
+        require_ray_data()
+        from ray.data import ActorPoolStrategy, Dataset
+
+        if method not in self._remote_methods:
+            raise ValueError(f"'{method}' is not a remote method of this app.")
+        method_dict = self._remote_methods[method]
+        if is_generator_function(method_dict["func"]):
+            raise ValueError("Generator remote methods cannot map batches.")
+
+        if columns is None:
+            parameters = list(inspect.signature(method_dict["func"]).parameters)
+            columns = [name for name in parameters if name != "app"]
+        if not ray_remote_args:
+            serve_deployment_kwargs = (
+                method_dict["serve_deployment_kwargs"] or self._serve_deployment_kwargs
+            )
+            ray_remote_args = serve_deployment_kwargs.get("ray_actor_options") or {}
+
+        dataset = source if isinstance(source, Dataset) else read_records(source)
+        _, cls_ = self._build_local()
+        return dataset.map_batches(
+            RecordMapper,
+            batch_size=batch_size,
+            batch_format="pandas",
+            compute=ActorPoolStrategy(size=concurrency),
+            fn_constructor_args=(cls_, method, columns, output_column or method),
+            **ray_remote_args,
+        )
@@ -0,0 +1,278 @@
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as time_of_day
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import ray
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """Raise the minimum number of replicas during a daily time window.
+
+    ``weekdays`` follows ``datetime.weekday``, Monday is 0. Windows ending
+    before they start wrap around midnight.
+    """
+
+    start: time_of_day
+    end: time_of_day
+    min_replicas: int
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4, 5, 6)
+
+    def applies(self, now: datetime) -> bool:
+        if now.weekday() not in self.weekdays:
+            return False
+        if self.start <= self.end:
+            return self.start <= now.time() < self.end
+        return now.time() >= self.start or now.time() < self.end
+
+
+@dataclass(frozen=True)
+class LoadSignals:
+    """Load of a deployment, summed over its replicas.
+
+    ``queue_depth`` maps each route to its number of in-flight requests.
+    """
+
+    ongoing_requests: float = 0.0
+    queue_depth: Mapping[str, float] = field(default_factory=dict)
+    batch_fill_ratio: Optional[float] = None
+    p95_latency_s: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "LoadSignals":
+        return cls(
+            ongoing_requests=data.get("ongoing_requests", 0.0),
+            queue_depth=data.get("queue_depth", {}),
+            batch_fill_ratio=data.get("batch_fill_ratio"),
+            p95_latency_s=data.get("p95_latency_s"),
+        )
+
+
+@dataclass(frozen=True)
+class AutoscalingPolicy:
+    """Scale the ingress deployment on load signals collected by RayCraft.
+
+    Each ``target_*`` that is set proposes a number of replicas, the largest
+    proposal wins and is clamped between the scheduled minimum and
+    ``max_replicas``. Scaling happens once a proposal held for the up- or
+    downscale delay.
+    """
+
+    min_replicas: int = 1
+    max_replicas: int = 1
+    target_ongoing_requests: Optional[float] = 2.0
+    target_queue_depth: Optional[float] = None
+    target_batch_fill_ratio: Optional[float] = None
+    target_p95_latency_s: Optional[float] = None
+    schedules: Tuple[Schedule, ...] = ()
+    upscale_delay_s: float = 30.0
+    downscale_delay_s: float = 600.0
+    interval_s: float = 10.0
+
+    def min_replicas_at(self, now: datetime) -> int:
+        return max(
+            [self.min_replicas]
+            + [
+                schedule.min_replicas
+                for schedule in self.schedules
+                if schedule.applies(now)
+            ]
+        )
+
+    def desired_replicas(
+        self, replicas: int, signals: LoadSignals, now: datetime
+    ) -> int:
+        proposals = []
+
+        if self.target_ongoing_requests is not None:
+            proposals.append(signals.ongoing_requests / self.target_ongoing_requests)
+
+        if self.target_queue_depth is not None and signals.queue_depth:
+            deepest = max(signals.queue_depth.values())
+            proposals.append(deepest / self.target_queue_depth)
+
+        if (
+            self.target_batch_fill_ratio is not None
+            and signals.batch_fill_ratio is not None
+        ):
+            ratio = signals.batch_fill_ratio / self.target_batch_fill_ratio
+            proposals.append(replicas * ratio)
+
+        if self.target_p95_latency_s is not None and signals.p95_latency_s is not None:
+            ratio = signals.p95_latency_s / self.target_p95_latency_s
+            proposals.append(replicas * ratio)
+
+        desired = math.ceil(max(proposals)) if proposals else replicas
+        return min(max(desired, self.min_replicas_at(now)), self.max_replicas)
+
+
+class Autoscaler:
+    """Apply an ``AutoscalingPolicy`` over time, honouring its delays."""
+
+    def __init__(self, policy: AutoscalingPolicy, replicas: int) -> None:
+        self.policy = policy
+        self.replicas = replicas
+        self._proposed_since: Optional[datetime] = None
+        self._proposed_direction = 0
+
+    def update(self, signals: LoadSignals, now: datetime) -> int:
+        desired = self.policy.desired_replicas(self.replicas, signals, now)
+
+        # a schedule raising the minimum applies straight away
+        if self.replicas < self.policy.min_replicas_at(now):
+            self.replicas = desired
+            self._proposed_since = None
+            return self.replicas
+
+        direction = (desired > self.replicas) - (desired < self.replicas)
+        if direction == 0:
+            self._proposed_since = None
+            return self.replicas
+
+        if self._proposed_since is None or direction != self._proposed_direction:
+            self._proposed_since = now
+            self._proposed_direction = direction
+
+        if direction > 0:
+            delay_s = self.policy.upscale_delay_s
+        else:
+            delay_s = self.policy.downscale_delay_s
+
+        if (now - self._proposed_since).total_seconds() >= delay_s:
+            self.replicas = desired
+            self._proposed_since = None
+
+        return self.replicas
+
+
+def load_trace(path: str) -> List[Tuple[datetime, LoadSignals]]:
+    """Read a load trace, one JSON object per line with an ISO ``time``."""
+    trace = []
+    with open(path, "r") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                data = json.loads(line)
+                now = datetime.fromisoformat(data["time"])
+                trace.append((now, LoadSignals.from_dict(data)))
+    return trace
+
+
+def simulate(
+    policy: AutoscalingPolicy,
+    trace: Iterable[Tuple[datetime, LoadSignals]],
+    replicas: Optional[int] = None,
+) -> List[Tuple[datetime, int]]:
+    """Replay a load trace offline and return the number of replicas over time."""
+    trace = list(trace)
+    if replicas is None:
+        replicas = policy.min_replicas_at(trace[0][0]) if trace else policy.min_replicas
+
+    autoscaler = Autoscaler(policy, replicas)
+    return [(now, autoscaler.update(signals, now)) for now, signals in trace]
+
+
+@ray.remote(num_cpus=0)
+class SignalCollector:
+    """Gather the load signals replicas report for one deployment."""
+
+    def __init__(self) -> None:
+        self._reports: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def report(self, replica_id: str, signals: Dict[str, Any]) -> None:
+        self._reports[replica_id] = (time.time(), signals)
+
+    def collect(self, max_age_s: float) -> Tuple[int, LoadSignals]:
+        now = time.time()
+        self._reports = {
+            replica_id: report
+            for replica_id, report in self._reports.items()
+            if now - report[0] <= max_age_s
+        }
+        reports = [signals for _, signals in self._reports.values()]
+
+        queue_depth: Dict[str, float] = {}
+        for signals in reports:
+            for route, depth in signals["queue_depth"].items():
+                queue_depth[route] = queue_depth.get(route, 0.0) + depth
+
+        batch_fill_ratios = [
+            signals["batch_fill_ratio"]
+            for signals in reports
+            if signals["batch_fill_ratio"] is not None
+        ]
+        p95_latencies = [
+            signals["p95_latency_s"]
+            for signals in reports
+            if signals["p95_latency_s"] is not None
+        ]
+        return len(reports), LoadSignals(
+            ongoing_requests=sum(signals["ongoing_requests"] for signals in reports),
+            queue_depth=queue_depth,
+            batch_fill_ratio=(
+                sum(batch_fill_ratios) / len(batch_fill_ratios)
+                if batch_fill_ratios
+                else None
+            ),
+            p95_latency_s=max(p95_latencies) if p95_latencies else None,
+        )
+
+
+def signal_collector_name(app_name: str, deployment_name: str) -> str:
+    return f"raycraft-signals:{app_name}:{deployment_name}"
+
+
+class AutoscalingController:
+    """Apply a policy from the process that deployed the app.
+
+    Nothing scales the app once that process exits.
+    """
+
+    def __init__(
+        self, policy: AutoscalingPolicy, app_name: str, deployment_name: str
+    ) -> None:
+        self.policy = policy
+        self._autoscaler = Autoscaler(policy, policy.min_replicas_at(datetime.now()))
+        self._collector = SignalCollector.options(  # type: ignore [attr-defined]
+            name=signal_collector_name(app_name, deployment_name),
+            get_if_exists=True,
+        ).remote()
+
+    def step(self, now: datetime) -> Optional[int]:
+        """Return the new number of replicas, or None to keep the current one."""
+        _, signals = ray.get(
+            self._collector.collect.remote(max_age_s=3 * self.policy.interval_s)
+        )
+        replicas = self._autoscaler.replicas
+        if self._autoscaler.update(signals, now) == replicas:
+            return None
+        return self._autoscaler.replicas
+
+
+def start_signal_reporter(
+    app_name: str,
+    deployment_name: str,
+    replica_id: str,
+    get_signals: Callable[[], Dict[str, Any]],
+    interval_s: float,
+) -> threading.Thread:
+    """Report a replica's load signals in the background, if anyone collects them."""
+
+    def report_forever() -> None:
+        while True:
+            time.sleep(interval_s)
+            try:
+                collector = ray.get_actor(
+                    signal_collector_name(app_name, deployment_name)
+                )
+            except ValueError:
+                # no autoscaling controller is running for this deployment
+                continue
+            collector.report.remote(replica_id, get_signals())
+
+    thread = threading.Thread(target=report_forever, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,138 @@
+import asyncio
+import importlib.util
+import inspect
+import pathlib
+import time
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from .replica import create_replica, set_local_replica
+
+# what Ray Data needs on top of Ray Serve, installed by the "data" extra
+DATA_DEPENDENCIES = ("pandas", "pyarrow", "fsspec")
+
+
+def require_ray_data() -> None:
+    """Fail before starting any work if Ray Data cannot run."""
+    missing = [
+        name for name in DATA_DEPENDENCIES if importlib.util.find_spec(name) is None
+    ]
+    if missing:
+        raise ImportError(
+            f"Batch inference runs on Ray Data, which needs {', '.join(missing)}. "
+            'Install them with `pip install "raycraft[data]"`.'
+        )
+
+
+def read_records(path: str) -> Any:
+    """Read a JSONL, Parquet or CSV file, or a directory of them, lazily."""
+    import ray.data
+
+    suffixes = {suffix.lower() for suffix in pathlib.Path(path).suffixes}
+    if pathlib.Path(path).is_dir():
+        suffixes = {file.suffix.lower() for file in pathlib.Path(path).iterdir()}
+
+    if suffixes & {".jsonl", ".json"}:
+        return ray.data.read_json(path)
+    if ".parquet" in suffixes:
+        return ray.data.read_parquet(path)
+    if ".csv" in suffixes:
+        return ray.data.read_csv(path)
+    raise ValueError(f"Cannot tell the format of '{path}', use JSONL, Parquet or CSV.")
+
+
+class RecordMapper:
+    """Call a remote method on each record of a batch, in a Ray Data worker.
+
+    The worker holds one replica of the app: initializers run once, and
+    calls within a batch run concurrently, so batched remote methods get
+    their batches filled.
+    """
+
+    def __init__(
+        self,
+        replica_class: type,
+        method_name: str,
+        columns: Sequence[str],
+        output_column: str,
+    ) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._replica = self._loop.run_until_complete(create_replica(replica_class))
+        set_local_replica(self._replica)
+        self._method = getattr(self._replica, method_name)
+        self._columns = list(columns)
+        self._output_column = output_column
+
+    async def _call(self, *args: Any) -> Any:
+        result = self._method(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _call_all(self, rows: List[Tuple[Any, ...]]) -> List[Any]:
+        return list(await asyncio.gather(*(self._call(*row) for row in rows)))
+
+    def __call__(self, batch: Any) -> Any:
+        rows = list(zip(*(batch[column].tolist() for column in self._columns)))
+        results = self._loop.run_until_complete(self._call_all(rows))
+        batch[self._output_column] = results
+        return batch
+
+
+def write_records(dataset: Any, path: str) -> Iterator[int]:
+    """Write a dataset to a JSONL, Parquet or CSV file as its batches complete.
+
+    Yields the number of records written so far after each batch.
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix not in {".jsonl", ".json", ".parquet", ".csv"}:
+        raise ValueError(
+            f"Cannot tell the format of '{path}', use JSONL, Parquet or CSV."
+        )
+
+    written = 0
+    header_written = False
+    parquet_writer: Optional[Any] = None
+    with open(path, "wb" if suffix == ".parquet" else "w") as output_file:
+        try:
+            for batch in dataset.iter_batches(batch_format="pandas"):
+                if suffix == ".parquet":
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    table = pa.Table.from_pandas(batch, preserve_index=False)
+                    if parquet_writer is None:
+                        parquet_writer = pq.ParquetWriter(output_file, table.schema)
+                    parquet_writer.write_table(table)
+                elif suffix == ".csv":
+                    # an empty batch still writes the header
+                    batch.to_csv(output_file, header=not header_written, index=False)
+                    header_written = True
+                elif len(batch) > 0:
+                    lines = batch.to_json(orient="records", lines=True)
+                    output_file.write(lines.rstrip("\n") + "\n")
+                written += len(batch)
+                yield written
+        finally:
+            if parquet_writer is not None:
+                parquet_writer.close()
+
+
+def report_throughput(
+    progress: Iterator[int], log: Callable[[str], None], interval_s: float = 10.0
+) -> int:
+    """Consume ``progress`` and log how many records per second are processed."""
+    start = last_report = time.perf_counter()
+    written = 0
+    for written in progress:
+        now = time.perf_counter()
+        if now - last_report >= interval_s:
+            last_report = now
+            log(f"{written} records, {written / (now - start):.1f} records/s.")
+
+    elapsed_s = time.perf_counter() - start
+    log(
+        f"{written} records in {elapsed_s:.1f}s, "
+        f"{written / elapsed_s if elapsed_s else 0.0:.1f} records/s."
+    )
+    return written
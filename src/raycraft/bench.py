@@ -0,0 +1,245 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import aiohttp
+from ray import serve
+from ray.serve._private.common import ReplicaState
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    """Outcome of a load test, latencies are in seconds."""
+
+    requests: int
+    errors: int
+    duration_s: float
+    throughput: float
+    error_rate: float
+    p50_latency_s: Optional[float]
+    p95_latency_s: Optional[float]
+    p99_latency_s: Optional[float]
+    max_latency_s: Optional[float]
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    replicas: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+async def run_load(
+    send: Callable[[], Awaitable[str]],
+    failed: Callable[[str], bool],
+    concurrency: int,
+    rate: Optional[float],
+    duration_s: float,
+) -> BenchResult:
+    """Call ``send`` from ``concurrency`` workers for ``duration_s`` seconds.
+
+    ``send`` makes one request and returns its status, ``failed`` tells the
+    statuses of errors apart.
+    """
+    latencies: List[float] = []
+    status_codes: Counter[str] = Counter()
+    tickets = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration_s
+
+    async def worker() -> None:
+        while True:
+            now = time.perf_counter()
+            if rate is None:
+                scheduled = now
+            else:
+                scheduled = start + next(tickets) / rate
+                if scheduled > now:
+                    await asyncio.sleep(scheduled - now)
+            if scheduled >= deadline:
+                return
+
+            status = await send()
+            latencies.append(time.perf_counter() - scheduled)
+            status_codes[status] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed_s = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(count for status, count in status_codes.items() if failed(status))
+    return BenchResult(
+        requests=len(latencies),
+        errors=errors,
+        duration_s=elapsed_s,
+        throughput=len(latencies) / elapsed_s,
+        error_rate=errors / len(latencies) if latencies else 0.0,
+        p50_latency_s=percentile(latencies, 0.50),
+        p95_latency_s=percentile(latencies, 0.95),
+        p99_latency_s=percentile(latencies, 0.99),
+        max_latency_s=latencies[-1] if latencies else None,
+        status_codes=dict(status_codes),
+    )
+
+
+async def generate_load(
+    url: str,
+    method: str = "GET",
+    body: Optional[bytes] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    duration_s: float = 10.0,
+) -> BenchResult:
+    """Send requests to ``url`` for ``duration_s`` seconds.
+
+    Without a ``rate``, each of the ``concurrency`` workers sends its next
+    request as soon as the previous one completes. With a ``rate``, requests
+    are scheduled at fixed intervals and their latency counts from their
+    scheduled time, so a slow server is not hidden by requests sent late.
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def send() -> str:
+            try:
+                async with session.request(
+                    method, url, data=body, headers=headers
+                ) as response:
+                    await response.read()
+                    return str(response.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                return type(error).__name__
+
+        return await run_load(
+            send,
+            lambda status: not (status.isdigit() and int(status) < 400),
+            concurrency,
+            rate,
+            duration_s,
+        )
+
+
+async def generate_grpc_load(
+    target: str,
+    method_path: str,
+    body: bytes,
+    metadata: Sequence[Tuple[str, str]] = (),
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    duration_s: float = 10.0,
+) -> BenchResult:
+    """Call the unary gRPC method ``method_path`` of ``target`` with ``body``.
+
+    Requests are scheduled as by ``generate_load``, over a single channel.
+    """
+    import grpc
+
+    ok: str = grpc.StatusCode.OK.name
+    async with grpc.aio.insecure_channel(target) as channel:
+        # raw bytes in and out, the messages are not parsed
+        call = channel.unary_unary(method_path)
+
+        async def send() -> str:
+            try:
+                await call(body, metadata=metadata)
+                return ok
+            except grpc.aio.AioRpcError as error:
+                return str(error.code().name)
+
+        return await run_load(
+            send,
+            lambda status: status != ok,
+            concurrency,
+            rate,
+            duration_s,
+        )
+
+
+async def generate_websocket_load(
+    url: str,
+    message: str,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    duration_s: float = 10.0,
+) -> BenchResult:
+    """Send ``message`` over ``concurrency`` WebSocket connections to ``url``.
+
+    Each request is a message and the reply to it, scheduled as by
+    ``generate_load``. Connections are opened before the clock starts.
+    """
+    async with aiohttp.ClientSession() as session:
+        sockets: "asyncio.Queue[aiohttp.ClientWebSocketResponse]" = asyncio.Queue()
+        for _ in range(concurrency):
+            sockets.put_nowait(await session.ws_connect(url))
+
+        async def send() -> str:
+            socket = await sockets.get()
+            try:
+                await socket.send_str(message)
+                reply = await socket.receive()
+                if reply.type == aiohttp.WSMsgType.TEXT:
+                    return "OK"
+                return str(reply.type.name)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                return type(error).__name__
+            finally:
+                sockets.put_nowait(socket)
+
+        try:
+            return await run_load(
+                send, lambda status: status != "OK", concurrency, rate, duration_s
+            )
+        finally:
+            while not sockets.empty():
+                await sockets.get_nowait().close()
+
+
+def replica_counts() -> Dict[str, int]:
+    """Count the running replicas of each deployment, keyed ``app.deployment``."""
+    counts = {}
+    for app_name, app_status in serve.status().applications.items():
+        for deployment_name, deployment_status in app_status.deployments.items():
+            counts[
+                f"{app_name}.{deployment_name}"
+            ] = deployment_status.replica_states.get(ReplicaState.RUNNING, 0)
+    return counts
+
+
+def format_result(result: BenchResult) -> str:
+    def ms(latency_s: Optional[float]) -> str:
+        return "-" if latency_s is None else f"{1000 * latency_s:.1f}ms"
+
+    lines = [
+        f"requests:   {result.requests} in {result.duration_s:.1f}s",
+        f"throughput: {result.throughput:.1f} req/s",
+        f"errors:     {result.errors} ({100 * result.error_rate:.2f}%)",
+        f"latency:    p50 {ms(result.p50_latency_s)}  p95 {ms(result.p95_latency_s)}"
+        f"  p99 {ms(result.p99_latency_s)}  max {ms(result.max_latency_s)}",
+        "status:     "
+        + "  ".join(
+            f"{status}={n}" for status, n in sorted(result.status_codes.items())
+        ),
+    ]
+    for deployment_name, replicas in sorted(result.replicas.items()):
+        lines.append(f"replicas:   {deployment_name}={replicas}")
+    return "\n".join(lines)
@@ -0,0 +1,125 @@
+import ast
+import io
+import struct
+from typing import Any, Callable, Dict, IO, Mapping, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from fastapi import HTTPException, Request
+from fastapi.params import Depends
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+NUMPY_MEDIA_TYPE = "application/x-numpy"
+NPY_MEDIA_TYPE = "application/x-npy"
+DTYPE_HEADER = "x-array-dtype"
+SHAPE_HEADER = "x-array-shape"
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+def encode_array(array: npt.NDArray[Any]) -> Tuple[bytes, Dict[str, str]]:
+    """Return the raw buffer of ``array`` and the headers describing it."""
+    contiguous = np.ascontiguousarray(array)
+    return contiguous.tobytes(), {
+        "content-type": NUMPY_MEDIA_TYPE,
+        DTYPE_HEADER: np.dtype(contiguous.dtype).str,
+        SHAPE_HEADER: ",".join(map(str, contiguous.shape)),
+    }
+
+
+def read_array_header_3_0(
+    stream: IO[bytes],
+) -> Tuple[Tuple[int, ...], bool, np.dtype[Any]]:
+    """Read the UTF-8 header of a version 3.0 ``.npy`` file."""
+    (length,) = struct.unpack("<I", stream.read(4))
+    try:
+        header = ast.literal_eval(stream.read(length).decode("utf8"))
+        return (
+            tuple(header["shape"]),
+            header["fortran_order"],
+            np.lib.format.descr_to_dtype(  # type: ignore [no-untyped-call]
+                header["descr"]
+            ),
+        )
+    except (SyntaxError, KeyError, TypeError, UnicodeDecodeError) as error:
+        raise ValueError(f"Invalid .npy header: {error}") from error
+
+
+NPY_HEADER_READERS: Dict[Tuple[int, int], Callable[[IO[bytes]], Any]] = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+    (3, 0): read_array_header_3_0,
+}
+
+
+def decode_array(
+    body: bytes, headers: Mapping[str, str], dtype: Optional[str] = None
+) -> npt.NDArray[Any]:
+    """Decode a raw or ``.npy`` buffer into a read-only array without copying it."""
+    media_type = headers.get("content-type", NUMPY_MEDIA_TYPE).split(";")[0]
+
+    if media_type == NPY_MEDIA_TYPE:
+        stream = io.BytesIO(body)
+        version = np.lib.format.read_magic(stream)  # type: ignore [no-untyped-call]
+        if version not in NPY_HEADER_READERS:
+            raise ValueError(f"Unsupported .npy format version {version}.")
+        shape, fortran_order, npy_dtype = NPY_HEADER_READERS[version](stream)
+        array = np.frombuffer(body, dtype=npy_dtype, offset=stream.tell())
+        return array.reshape(shape, order="F" if fortran_order else "C")
+
+    if media_type not in {NUMPY_MEDIA_TYPE, "application/octet-stream"}:
+        raise UnsupportedMediaType(f"Unsupported array media type {media_type!r}.")
+
+    array = np.frombuffer(body, dtype=headers.get(DTYPE_HEADER, dtype or "uint8"))
+    if SHAPE_HEADER in headers:
+        dims = headers[SHAPE_HEADER].split(",")
+        array = array.reshape(tuple(int(dim) for dim in dims if dim))
+    return array
+
+
+def ArrayBody(dtype: Optional[str] = None) -> Any:  # noqa: N802
+    """Read the request body as an array instead of parsing JSON.
+
+    The body is either a raw buffer described by the ``X-Array-Dtype`` and
+    ``X-Array-Shape`` headers (``dtype`` is used when the header is missing),
+    or a ``.npy`` file sent as ``application/x-npy``. Other media types are
+    answered with 415, bodies that do not match their description with 422.
+    """
+
+    async def read_array(request: Request) -> npt.NDArray[Any]:
+        body = await request.body()
+        try:
+            return decode_array(body, request.headers, dtype)
+        except UnsupportedMediaType as error:
+            raise HTTPException(status_code=415, detail=str(error)) from error
+        except (ValueError, TypeError) as error:
+            raise HTTPException(status_code=422, detail=str(error)) from error
+
+    return Depends(read_array)
+
+
+class ArrayResponse(Response):
+    """Send an array as its raw buffer, described by ``X-Array-*`` headers."""
+
+    media_type = NUMPY_MEDIA_TYPE
+
+    def __init__(
+        self,
+        content: npt.NDArray[Any],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        body, array_headers = encode_array(content)
+        del array_headers["content-type"]
+        super().__init__(
+            body,
+            status_code=status_code,
+            headers={**array_headers, **(headers or {})},
+            media_type=media_type,
+            background=background,
+        )
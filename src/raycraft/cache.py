@@ -0,0 +1,195 @@
+import asyncio
+import functools
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from .streaming import is_generator_function
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    """Per-replica result cache settings.
+
+    ``key`` receives the call arguments (without ``app``) and returns the
+    cache key, by default the arguments themselves are hashed.
+    """
+
+    max_entries: int = 1024
+    ttl_s: Optional[float] = None
+    key: Optional[Callable[..., Hashable]] = None
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+
+
+class ResultCache:
+    """A thread-safe LRU cache where concurrent misses on a key share one call."""
+
+    def __init__(self, config: CacheConfig) -> None:
+        self._config = config
+        self._reset()
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[Hashable, "Future[Any]"] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # replicas each unpickle their own empty cache
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"_config": self._config}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._config = state["_config"]
+        self._reset()
+
+    def make_key(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+        if self._config.key is not None:
+            return self._config.key(*args, **kwargs)
+
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return pickle.dumps(key)
+        return key
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, len(self._entries)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _claim(self, key: Hashable) -> Tuple[bool, "Future[Any]"]:
+        """Return whether the caller must compute ``key`` and the future to use."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    future: "Future[Any]" = Future()
+                    future.set_result(value)
+                    return False, future
+
+                del self._entries[key]
+                self._evictions += 1
+
+            if key in self._pending:
+                self._hits += 1
+                return False, self._pending[key]
+
+            self._misses += 1
+            future = self._pending[key] = Future()
+            return True, future
+
+    def _resolve(
+        self,
+        key: Hashable,
+        future: "Future[Any]",
+        value: Any = None,
+        exception: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            del self._pending[key]
+            if exception is None:
+                ttl_s = self._config.ttl_s
+                expires_at = float("inf") if ttl_s is None else time.monotonic() + ttl_s
+                self._entries[key] = (expires_at, value)
+                while len(self._entries) > self._config.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+        if exception is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exception)
+
+    def get_or_call(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        owner, future = self._claim(key)
+        if not owner:
+            return future.result()
+
+        try:
+            value = call()
+        except BaseException as exception:
+            self._resolve(key, future, exception=exception)
+            raise
+
+        self._resolve(key, future, value)
+        return value
+
+    async def get_or_await(
+        self, key: Hashable, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        owner, future = self._claim(key)
+        if not owner:
+            # a cancelled waiter must not cancel the call shared with others
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            value = await call()
+        except BaseException as exception:
+            self._resolve(key, future, exception=exception)
+            raise
+
+        self._resolve(key, future, value)
+        return value
+
+
+def cached(func: Callable[..., Any], config: CacheConfig) -> Callable[..., Any]:
+    """Memoize ``func`` per replica, ignoring its leading ``app`` parameter."""
+    if is_generator_function(func):
+        raise TypeError(f"Cannot cache the results of generator {func.__name__!r}")
+
+    params = list(inspect.signature(func).parameters)
+    takes_app = len(params) > 0 and params[0] in {"app"}
+    cache = ResultCache(config)
+
+    def make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+        if takes_app:
+            # routes receive app as a keyword argument, remote methods positionally
+            if "app" in kwargs:
+                kwargs = {
+                    name: value for name, value in kwargs.items() if name != "app"
+                }
+            else:
+                args = args[1:]
+        return cache.make_key(args, kwargs)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = make_key(args, kwargs)
+            return await cache.get_or_await(
+                key, functools.partial(func, *args, **kwargs)
+            )
+
+    else:
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = make_key(args, kwargs)
+            return cache.get_or_call(key, functools.partial(func, *args, **kwargs))
+
+    wrapper.cache_info = cache.info  # type: ignore [attr-defined]
+    wrapper.cache_clear = cache.clear  # type: ignore [attr-defined]
+    return wrapper
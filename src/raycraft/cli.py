@@ -1,29 +1,20 @@
 """Raycraft cli."""
+import asyncio
+import dataclasses
+import json
 import os
 import pathlib
 import sys
 import time
 import traceback
+import urllib.parse
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
 import click
-import ray
-from ray import serve
-import watchfiles
-import yaml
-from typing import Dict, Tuple
-from ray.serve._private.constants import (
-    DEFAULT_HTTP_HOST,
-    DEFAULT_HTTP_PORT,
-    SERVE_NAMESPACE,
-)
-from ray.autoscaler._private.cli_logger import cli_logger
-from ray.dashboard.modules.dashboard_sdk import parse_runtime_env_args
-from ray.serve.schema import (
-    ServeDeploySchema,
-)
-from ray._private.pydantic_compat import ValidationError
-from ray.serve.config import gRPCOptions
-from ray.serve._private import api as _private_api
-from ray._private.utils import import_attr
+
+# Ray, Serve and the other heavy dependencies are imported by the commands
+# that use them, so that `raycraft --help` and shell completion stay fast.
 
 APP_DIR_HELP_STR = (
     "Local directory to look for the IMPORT_PATH (will be inserted into "
@@ -40,6 +31,10 @@ RAY_DASHBOARD_ADDRESS_HELP_STR = (
     "http://localhost:8265). Can also be specified using the "
     "RAY_DASHBOARD_ADDRESS environment variable."
 )
+# `raycraft bench IMPORT_PATH` deploys under its own name to leave other apps alone
+BENCH_APP_NAME = "raycraft-bench"
+# apps already running keep their routes while the benchmarked one is deployed
+BENCH_ROUTE_PREFIX = f"/{BENCH_APP_NAME}"
 
 
 def convert_args_to_dict(args: Tuple[str]) -> Dict[str, str]:
@@ -56,10 +51,12 @@ def convert_args_to_dict(args: Tuple[str]) -> Dict[str, str]:
 
     return args_dict
 
+
 @click.group()
 def cli():
     pass
 
+
 @cli.command(
     short_help="Run RayCraft application(s).",
     help=(
@@ -140,6 +137,39 @@ def cli():
         "app."
     ),
 )
+@click.option(
+    "--reload-debounce-ms",
+    default=1600,
+    type=int,
+    help=(
+        "With --reload, wait for this many milliseconds without file changes "
+        "before redeploying, so that saving several files redeploys once."
+    ),
+)
+@click.option(
+    "--local",
+    is_flag=True,
+    help=(
+        "Serves the application in this process with uvicorn instead of "
+        "deploying it with Ray Serve. Initializers run once per worker and "
+        "remote methods are called as local functions."
+    ),
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=int,
+    help="With --local, the number of uvicorn worker processes.",
+)
+@click.option(
+    "--grpc-port",
+    default=9000,
+    type=int,
+    help=(
+        "Port of Serve's gRPC proxy, started when the application has gRPC "
+        "methods. Ignored when running a config file."
+    ),
+)
 def run(
     config_or_import_path: str,
     arguments: Tuple[str],
@@ -150,7 +180,46 @@ def run(
     address: str,
     blocking: bool,
     reload: bool,
+    reload_debounce_ms: int,
+    local: bool,
+    workers: int,
+    grpc_port: int,
 ) -> None:
+    if local:
+        if pathlib.Path(config_or_import_path).is_file():
+            raise click.ClickException("The --local option needs an import path.")
+        if reload and workers > 1:
+            raise click.ClickException(
+                "The --reload option conflicts with --workers greater than 1."
+            )
+
+        from .local import serve_locally
+
+        serve_locally(
+            config_or_import_path,
+            app_dir,
+            workers=workers,
+            reload_dir=(working_dir or app_dir) if reload else None,
+        )
+        return
+
+    import ray
+    import watchfiles
+    import yaml
+    from ray import serve
+    from ray._private.pydantic_compat import ValidationError
+    from ray._private.utils import import_attr
+    from ray.autoscaler._private.cli_logger import cli_logger
+    from ray.dashboard.modules.dashboard_sdk import parse_runtime_env_args
+    from ray.serve._private import api as _private_api
+    from ray.serve._private.constants import (
+        DEFAULT_HTTP_HOST,
+        DEFAULT_HTTP_PORT,
+        SERVE_NAMESPACE,
+    )
+    from ray.serve.config import gRPCOptions
+    from ray.serve.schema import ServeDeploySchema
+
     sys.path.insert(0, app_dir)
     args_dict = convert_args_to_dict(arguments)
     final_runtime_env = parse_runtime_env_args(
@@ -198,7 +267,12 @@ def run(
         # )
         # TODO - better handling of app creation
         raycraft_api = import_attr(import_path, reload_module=True)
-        app = raycraft_api()
+        if not blocking and raycraft_api._autoscaling_policy is not None:
+            # the policy is applied by this command while it blocks
+            raise click.ClickException(
+                "The --non-blocking option conflicts with an autoscaling policy."
+            )
+        app = raycraft_api(reloadable=reload)
 
     # Only initialize ray if it has not happened yet.
     if not ray.is_initialized():
@@ -228,6 +302,11 @@ def run(
         config_http_options = config.http_options.dict()
         http_options = {**config_http_options, **http_options}
         grpc_options = gRPCOptions(**config.grpc_options.dict())
+    elif raycraft_api.grpc_servicer_function() is not None:
+        grpc_options = gRPCOptions(
+            port=grpc_port,
+            grpc_servicer_functions=[raycraft_api.grpc_servicer_function()],
+        )
 
     client = _private_api.serve_start(
         http_options=http_options,
@@ -252,19 +331,54 @@ def run(
             else:
                 watch_dir = app_dir
 
+            # the watch never returns, so the autoscaling policy is applied in it
+            controller = None if is_config else raycraft_api.autoscaling_controller()
+            num_replicas = None
+            last_step = time.monotonic()
+            fingerprints = None if is_config else raycraft_api.fingerprints()
             for changes in watchfiles.watch(
                 watch_dir,
-                rust_timeout=10000,
+                debounce=reload_debounce_ms,
+                rust_timeout=(
+                    10000
+                    if controller is None
+                    else int(controller.policy.interval_s * 1000)
+                ),
                 yield_on_timeout=True,
             ):
-                if changes:
+                if changes and is_config:
                     cli_logger.info(
-                        f"Detected file change in path {watch_dir}. Redeploying app."
+                        f"Detected file change in path {watch_dir}. Redeploying "
+                        "config file."
                     )
+                    with open(config_path, "r") as config_file:
+                        config = ServeDeploySchema.parse_obj(
+                            yaml.safe_load(config_file)
+                        )
+                    client.deploy_apps(config)
+
+                elif changes:
                     # The module needs to be reloaded with `importlib` in order to pick
                     # up any changes.
                     raycraft_api = import_attr(import_path, reload_module=True)
-                    app = raycraft_api()
+                    previous, fingerprints = fingerprints, raycraft_api.fingerprints()
+                    if (
+                        previous is not None
+                        and previous["spec"] == fingerprints["spec"]
+                    ):
+                        cli_logger.info(
+                            f"Detected file change in path {watch_dir}. Updating "
+                            "the code of the running replicas."
+                        )
+                    else:
+                        cli_logger.info(
+                            f"Detected file change in path {watch_dir}. Redeploying "
+                            "app, the replicas will restart."
+                        )
+                        # the autoscaling policy may have changed with the spec
+                        controller = raycraft_api.autoscaling_controller()
+                        num_replicas = None
+                    app = raycraft_api(num_replicas, reloadable=True)
 
                     # TODO - better handling of app creation
                     # app = _private_api.call_app_builder_with_args_if_necessary(
@@ -273,10 +387,31 @@ def run(
 
                     serve.run(app, host=host, port=port)
 
+                if (
+                    controller is not None
+                    and time.monotonic() - last_step >= controller.policy.interval_s
+                ):
+                    last_step = time.monotonic()
+                    new_num_replicas = controller.step(datetime.now())
+                    if new_num_replicas is not None:
+                        num_replicas = new_num_replicas
+                        cli_logger.info(f"Scaling app to {num_replicas} replicas.")
+                        app = raycraft_api(num_replicas, reloadable=True)
+                        serve.run(app, host=host, port=port)
+
         if blocking:
+            controller = None if is_config else raycraft_api.autoscaling_controller()
             while True:
                 # Block, letting Ray print logs to the terminal.
-                time.sleep(10)
+                if controller is None:
+                    time.sleep(10)
+                    continue
+
+                time.sleep(controller.policy.interval_s)
+                num_replicas = controller.step(datetime.now())
+                if num_replicas is not None:
+                    cli_logger.info(f"Scaling app to {num_replicas} replicas.")
+                    serve.run(raycraft_api(num_replicas), host=host, port=port)
 
     except KeyboardInterrupt:
         cli_logger.info("Got KeyboardInterrupt, shutting down...")
@@ -291,3 +426,399 @@ def run(
         )
         serve.shutdown()
         sys.exit()
+
+
+@cli.command(
+    short_help="Load test a RayCraft application.",
+    help=(
+        "Sends requests to a route of an application and reports throughput, "
+        "latency percentiles, errors and replica counts.\n\n"
+        "Pass an import path (e.g., my_script:app) to deploy the application "
+        "first, its route definitions give the default HTTP method, or pass "
+        "--url to target an application that is already running.\n\n"
+        "raycraft bench my_script:app --route /translate --payload body.json "
+        "--concurrency 16 --duration 30 --output before.json\n\n"
+        "With --method websocket, each worker keeps a WebSocket session open "
+        "and a request is the payload sent as a message and its reply."
+    ),
+)
+@click.argument("import_path", required=False)
+@click.option(
+    "--url",
+    type=str,
+    default=None,
+    help="Base URL of a running application, instead of an import path.",
+)
+@click.option("--route", type=str, default="/", help="Path of the route to call.")
+@click.option(
+    "--method",
+    type=str,
+    default=None,
+    help="HTTP method or websocket, defaults to the route's or GET.",
+)
+@click.option(
+    "--payload",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="File sent as the body of every request.",
+)
+@click.option(
+    "--content-type",
+    type=str,
+    default="application/json",
+    help="Content type of the payload.",
+)
+@click.option(
+    "--concurrency", "-c", type=int, default=8, help="Number of concurrent requests."
+)
+@click.option(
+    "--rate",
+    type=float,
+    default=None,
+    help=(
+        "Requests per second to send, by default each worker sends its next "
+        "request as soon as the previous one completes."
+    ),
+)
+@click.option(
+    "--duration", type=float, default=10.0, help="Duration of the test in seconds."
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the results as JSON to this file.",
+)
+@click.option(
+    "--app-dir",
+    "-d",
+    default=".",
+    type=str,
+    help=APP_DIR_HELP_STR,
+)
+@click.option(
+    "--address",
+    "-a",
+    default=os.environ.get("RAY_ADDRESS", None),
+    required=False,
+    type=str,
+    help=RAY_INIT_ADDRESS_HELP_STR,
+)
+def bench(
+    import_path: Optional[str],
+    url: Optional[str],
+    route: str,
+    method: Optional[str],
+    payload: Optional[str],
+    content_type: str,
+    concurrency: int,
+    rate: Optional[float],
+    duration: float,
+    output: Optional[str],
+    app_dir: str,
+    address: Optional[str],
+) -> None:
+    import ray
+    from ray import serve
+    from ray._private.utils import import_attr
+    from ray.autoscaler._private.cli_logger import cli_logger
+    from ray.serve._private.constants import (
+        DEFAULT_HTTP_HOST,
+        DEFAULT_HTTP_PORT,
+        SERVE_NAMESPACE,
+    )
+
+    from .bench import (
+        format_result,
+        generate_load,
+        generate_websocket_load,
+        replica_counts,
+    )
+
+    if (import_path is None) == (url is None):
+        raise click.ClickException("Pass either an import path or --url.")
+
+    # the app this command deployed, the only one it removes when it is done
+    deployed_app_name = None
+    if import_path is not None:
+        sys.path.insert(0, app_dir)
+        raycraft_api = import_attr(import_path, reload_module=True)
+        path = urllib.parse.urlsplit(route).path
+        route_methods = [
+            method_dict["method"]
+            for method_dict in raycraft_api._http_methods.values()
+            if method_dict["args"][0] == path
+        ]
+        if not route_methods:
+            raise click.ClickException(f"The app has no route '{path}'.")
+        if method is None:
+            method = route_methods[0]
+
+        ray.init(address=address, namespace=SERVE_NAMESPACE)
+        serve.run(
+            raycraft_api(),
+            host=DEFAULT_HTTP_HOST,
+            port=DEFAULT_HTTP_PORT,
+            name=BENCH_APP_NAME,
+            route_prefix=BENCH_ROUTE_PREFIX,
+        )
+        deployed_app_name = BENCH_APP_NAME
+        url = f"http://{DEFAULT_HTTP_HOST}:{DEFAULT_HTTP_PORT}{BENCH_ROUTE_PREFIX}"
+    elif address is not None:
+        # only used to report the replica counts
+        ray.init(address=address, namespace=SERVE_NAMESPACE)
+
+    assert url is not None
+    target = url.rstrip("/") + route
+    body = pathlib.Path(payload).read_bytes() if payload is not None else None
+    method = (method or "GET").upper()
+    cli_logger.print(
+        f"Sending {method} {target} for {duration}s with {concurrency} workers."
+    )
+
+    try:
+        if method == "WEBSOCKET":
+            # http:// becomes ws:// and https:// wss://
+            if target.startswith("http"):
+                target = "ws" + target[len("http") :]
+            result = asyncio.run(
+                generate_websocket_load(
+                    target,
+                    message=(body or b"").decode(),
+                    concurrency=concurrency,
+                    rate=rate,
+                    duration_s=duration,
+                )
+            )
+        else:
+            result = asyncio.run(
+                generate_load(
+                    target,
+                    method=method,
+                    body=body,
+                    headers=(
+                        {"content-type": content_type} if body is not None else None
+                    ),
+                    concurrency=concurrency,
+                    rate=rate,
+                    duration_s=duration,
+                )
+            )
+        if ray.is_initialized():
+            result = dataclasses.replace(result, replicas=replica_counts())
+    finally:
+        if deployed_app_name is not None:
+            serve.delete(deployed_app_name)
+
+    cli_logger.print(format_result(result))
+
+    if output is not None:
+        report = {
+            "target": target,
+            "method": method,
+            "concurrency": concurrency,
+            "rate": rate,
+            "duration_s": duration,
+            "time": datetime.now().isoformat(),
+            "result": result.to_dict(),
+        }
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        cli_logger.success(f"Wrote results to '{output}'.")
+
+
+@cli.command(
+    short_help="Run a remote method over a file of records.",
+    help=(
+        "Calls a remote method of an application on every record of INPUT "
+        "and writes the records with the results to OUTPUT, without going "
+        "through HTTP. Both are JSONL, Parquet or CSV files, the input can "
+        "also be a directory of them. Records are streamed, so inputs larger "
+        "than memory are fine.\n\n"
+        "raycraft batch my_script:app reviews.jsonl scores.jsonl "
+        "--method score --concurrency 4"
+    ),
+)
+@click.argument("import_path")
+@click.argument("input_path")
+@click.argument("output_path")
+@click.option("--method", "-m", required=True, help="The remote method to call.")
+@click.option(
+    "--batch-size", type=int, default=256, help="Number of records per batch."
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=int,
+    default=1,
+    help="Number of workers, each loading the initializers once.",
+)
+@click.option(
+    "--column",
+    "columns",
+    multiple=True,
+    help=(
+        "Column passed to the method, repeat for several arguments. Defaults "
+        "to the columns named like the method's parameters."
+    ),
+)
+@click.option(
+    "--output-column",
+    default=None,
+    help="Column receiving the results, defaults to the method name.",
+)
+@click.option(
+    "--app-dir",
+    "-d",
+    default=".",
+    type=str,
+    help=APP_DIR_HELP_STR,
+)
+@click.option(
+    "--address",
+    "-a",
+    default=os.environ.get("RAY_ADDRESS", None),
+    required=False,
+    type=str,
+    help=RAY_INIT_ADDRESS_HELP_STR,
+)
+def batch(
+    import_path: str,
+    input_path: str,
+    output_path: str,
+    method: str,
+    batch_size: int,
+    concurrency: int,
+    columns: Tuple[str, ...],
+    output_column: Optional[str],
+    app_dir: str,
+    address: Optional[str],
+) -> None:
+    import ray
+    from ray._private.utils import import_attr
+    from ray.autoscaler._private.cli_logger import cli_logger
+
+    from .batch import report_throughput, require_ray_data, write_records
+
+    try:
+        require_ray_data()
+    except ImportError as error:
+        raise click.ClickException(str(error)) from error
+
+    sys.path.insert(0, app_dir)
+    raycraft_api = import_attr(import_path)
+    ray.init(address=address)
+
+    dataset = raycraft_api.map_batches(
+        input_path,
+        method,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        columns=columns or None,
+        output_column=output_column,
+    )
+    report_throughput(write_records(dataset, output_path), cli_logger.print)
+    cli_logger.success(f"Wrote results to '{output_path}'.")
+
+
+@cli.command(
+    short_help="Profile the replicas of a running RayCraft application.",
+    help=(
+        "Samples the stacks of every replica of a running application for "
+        "--seconds and writes them merged as collapsed stacks, the input of "
+        "flamegraph tools. The application must have been created with a "
+        "ProfilingConfig.\n\n"
+        "raycraft profile my_script:app --route /translate --seconds 30 "
+        "--output translate.folded"
+    ),
+)
+@click.argument("import_path")
+@click.option(
+    "--route",
+    type=str,
+    default=None,
+    help="Only keep samples of this route, by path or name.",
+)
+@click.option(
+    "--method",
+    "-m",
+    type=str,
+    default=None,
+    help="Only keep samples of this remote method.",
+)
+@click.option("--seconds", type=float, default=10.0, help="How long to sample for.")
+@click.option(
+    "--name",
+    type=str,
+    default="default",
+    help="Name of the Serve application running the app.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, writable=True),
+    default="profile.folded",
+    help="File receiving the collapsed stacks.",
+)
+@click.option(
+    "--app-dir",
+    "-d",
+    default=".",
+    type=str,
+    help=APP_DIR_HELP_STR,
+)
+@click.option(
+    "--address",
+    "-a",
+    default=os.environ.get("RAY_ADDRESS", None),
+    required=False,
+    type=str,
+    help=RAY_INIT_ADDRESS_HELP_STR,
+)
+def profile(
+    import_path: str,
+    route: Optional[str],
+    method: Optional[str],
+    seconds: float,
+    name: str,
+    output: str,
+    app_dir: str,
+    address: Optional[str],
+) -> None:
+    import ray
+    from ray._private.utils import import_attr
+    from ray.autoscaler._private.cli_logger import cli_logger
+    from ray.serve._private.constants import SERVE_NAMESPACE
+
+    from .profiling import collapse, merge_collapsed
+
+    if route is not None and method is not None:
+        raise click.ClickException("Pass either --route or --method.")
+
+    sys.path.insert(0, app_dir)
+    raycraft_api = import_attr(import_path)
+    ray.init(address=address, namespace=SERVE_NAMESPACE)
+
+    cli_logger.print(f"Profiling the replicas of '{import_path}' for {seconds}s.")
+    try:
+        results = raycraft_api.profile(seconds, route or method, name)
+    except ValueError as error:
+        raise click.ClickException(str(error)) from error
+    if not results:
+        raise click.ClickException(
+            "No replica answered, is the application running with profiling?"
+        )
+
+    for replica_id, (_, failure) in sorted(results.items()):
+        if failure is not None:
+            cli_logger.warning(  # type: ignore [no-untyped-call]
+                f"Replica {replica_id} failed: {failure}"
+            )
+    stacks = merge_collapsed(collapsed for collapsed, _ in results.values())
+    with open(output, "w") as output_file:
+        output_file.write(collapse(stacks))
+    cli_logger.success(
+        f"Wrote {sum(stacks.values())} samples from {len(results)} replicas "
+        f"to '{output}'."
+    )
@@ -0,0 +1,274 @@
+import functools
+import inspect
+import typing
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SINGLETON
+
+from .admission import Rejected
+
+PROTO_PACKAGE = "raycraft"
+# the metadata key Serve's gRPC proxy picks the application with
+APPLICATION_METADATA_KEY = "application"
+# bool before int, of which it is a subclass
+PROTO_SCALAR_TYPES = {
+    bool: "bool",
+    int: "int64",
+    float: "double",
+    str: "string",
+    bytes: "bytes",
+}
+
+
+def grpc_io_models(
+    func: Callable[..., Any]
+) -> Tuple[str, Type[BaseModel], Type[BaseModel]]:
+    """Return the request parameter, request model and response model of a handler."""
+    params = [name for name in inspect.signature(func).parameters if name != "app"]
+    hints = typing.get_type_hints(func)
+    models = [hints.get(name) for name in [*params, "return"]]
+    if len(params) != 1 or not all(
+        isinstance(model, type) and issubclass(model, BaseModel) for model in models
+    ):
+        raise TypeError(
+            f"The gRPC method '{func.__name__}' must take one pydantic model "
+            "besides app and be annotated to return one."
+        )
+    # fail early on fields protobuf cannot represent
+    collect_models(models)  # type: ignore [arg-type]
+    return params[0], models[0], models[1]  # type: ignore [return-value]
+
+
+def _field_type(field: ModelField) -> Any:
+    if field.shape not in {SHAPE_SINGLETON, SHAPE_LIST}:
+        raise TypeError(f"Field '{field.name}' cannot be mapped to protobuf.")
+    if isinstance(field.type_, type):
+        if issubclass(field.type_, BaseModel):
+            return field.type_
+        # constrained types subclass the scalar they constrain
+        for scalar_type in PROTO_SCALAR_TYPES:
+            if issubclass(field.type_, scalar_type):
+                return scalar_type
+    raise TypeError(
+        f"Field '{field.name}' of type {field.type_} cannot be mapped to protobuf, "
+        "use a bool, int, float, str or bytes, a list of them or a pydantic model."
+    )
+
+
+def collect_models(models: List[Type[BaseModel]]) -> List[Type[BaseModel]]:
+    """Return ``models`` and the models nested in them, each once."""
+    collected: List[Type[BaseModel]] = []
+
+    def visit(model: Type[BaseModel]) -> None:
+        if model in collected:
+            return
+        collected.append(model)
+        for field in model.__fields__.values():
+            field_type = _field_type(field)
+            if isinstance(field_type, type) and issubclass(field_type, BaseModel):
+                visit(field_type)
+
+    for model in models:
+        visit(model)
+    return collected
+
+
+def render_proto(
+    service_name: str, methods: Dict[str, Tuple[Type[BaseModel], Type[BaseModel]]]
+) -> str:
+    """Write the ``.proto`` file of a service, for clients to generate stubs."""
+    models = collect_models([model for pair in methods.values() for model in pair])
+    lines = ['syntax = "proto3";', "", f"package {PROTO_PACKAGE};", ""]
+    for model in models:
+        lines.append(f"message {model.__name__} {{")
+        for number, field in enumerate(model.__fields__.values(), start=1):
+            field_type = _field_type(field)
+            type_name = PROTO_SCALAR_TYPES.get(field_type) or field_type.__name__
+            label = "repeated " if field.shape == SHAPE_LIST else ""
+            lines.append(f"  {label}{type_name} {field.name} = {number};")
+        lines.extend(["}", ""])
+
+    lines.append(f"service {service_name} {{")
+    for name, (request_model, response_model) in methods.items():
+        lines.append(
+            f"  rpc {name}({request_model.__name__}) "
+            f"returns ({response_model.__name__});"
+        )
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def build_message_classes(
+    service_name: str, models: List[Type[BaseModel]]
+) -> Dict[Type[BaseModel], Any]:
+    """Generate a protobuf message class per model, without compiling a file."""
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+    scalar_field_types = {
+        bool: descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+        int: descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+        float: descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+        str: descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+        bytes: descriptor_pb2.FieldDescriptorProto.TYPE_BYTES,
+    }
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name=f"{PROTO_PACKAGE}/{service_name}.proto",
+        package=PROTO_PACKAGE,
+        syntax="proto3",
+    )
+    for model in models:
+        message_proto = file_proto.message_type.add(name=model.__name__)
+        for number, field in enumerate(model.__fields__.values(), start=1):
+            field_type = _field_type(field)
+            field_proto = message_proto.field.add(
+                name=field.name,
+                number=number,
+                label=(
+                    descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+                    if field.shape == SHAPE_LIST
+                    else descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+                ),
+            )
+            if field_type in scalar_field_types:
+                field_proto.type = scalar_field_types[field_type]
+            else:
+                field_proto.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+                field_proto.type_name = f".{PROTO_PACKAGE}.{field_type.__name__}"
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    file_descriptor = pool.FindFileByName(file_proto.name)
+    get_message_class = getattr(message_factory, "GetMessageClass", None)
+    if get_message_class is None:
+        # protobuf < 4.21
+        get_message_class = message_factory.MessageFactory(pool).GetPrototype
+    return {
+        model: get_message_class(file_descriptor.message_types_by_name[model.__name__])
+        for model in models
+    }
+
+
+def message_to_model(message: Any, model: Type[BaseModel]) -> BaseModel:
+    values: Dict[str, Any] = {}
+    for field in model.__fields__.values():
+        field_type = _field_type(field)
+        value = getattr(message, field.name)
+        nested = isinstance(field_type, type) and issubclass(field_type, BaseModel)
+        if field.shape == SHAPE_LIST:
+            values[field.name] = [
+                message_to_model(item, field_type) if nested else item for item in value
+            ]
+        elif nested:
+            values[field.name] = (
+                message_to_model(value, field_type)
+                if message.HasField(field.name)
+                else None
+            )
+        else:
+            values[field.name] = value
+    return model.parse_obj(values)
+
+
+def model_to_message(instance: BaseModel, message: Any) -> Any:
+    for field in type(instance).__fields__.values():
+        value = getattr(instance, field.name)
+        if value is None:
+            continue
+        if field.shape == SHAPE_LIST:
+            if value and isinstance(value[0], BaseModel):
+                for item in value:
+                    model_to_message(item, getattr(message, field.name).add())
+            else:
+                getattr(message, field.name).extend(value)
+        elif isinstance(value, BaseModel):
+            model_to_message(value, getattr(message, field.name))
+        else:
+            setattr(message, field.name, value)
+    return message
+
+
+def build_grpc_method(
+    handler: Callable[..., Any],
+    service_name: str,
+    param_name: str,
+    request_model: Type[BaseModel],
+    response_model: Type[BaseModel],
+) -> Callable[..., Any]:
+    """Adapt an async handler taking and returning models to Serve's gRPC calls.
+
+    Serve's proxy passes the request bytes through, they are parsed here and
+    the returned message is serialized by Serve. Calls refused by admission
+    control get its gRPC status code, on the ``grpc_context`` Serve passes to
+    handlers taking one.
+    """
+    # generated classes cannot be pickled, each replica builds its own
+    message_classes: Dict[Type[BaseModel], Any] = {}
+
+    async def grpc_method(request: bytes, grpc_context: Any = None) -> Any:
+        if not message_classes:
+            message_classes.update(
+                build_message_classes(
+                    service_name, collect_models([request_model, response_model])
+                )
+            )
+        message = message_classes[request_model].FromString(request)
+        try:
+            result = await handler(
+                **{param_name: message_to_model(message, request_model)}
+            )
+        except Rejected as error:
+            if grpc_context is None:
+                # Serve versions that pass no context answer errors with INTERNAL
+                raise RuntimeError(f"{error.grpc_code}: {error.detail}") from None
+            import grpc
+
+            grpc_context.set_code(getattr(grpc.StatusCode, error.grpc_code))
+            grpc_context.set_details(error.detail)
+            return message_classes[response_model]()
+        if not isinstance(result, BaseModel):
+            result = response_model.parse_obj(result)
+        return model_to_message(result, message_classes[response_model]())
+
+    grpc_method.__name__ = handler.__name__
+    return grpc_method
+
+
+def add_servicer(
+    service_name: str, method_names: List[str], servicer: Any, server: Any
+) -> None:
+    """Register a service on Serve's gRPC server, passing request bytes through."""
+    import grpc
+
+    handlers = {
+        name: grpc.unary_unary_rpc_method_handler(getattr(servicer, name))
+        for name in method_names
+    }
+    server.add_generic_rpc_handlers(
+        (
+            grpc.method_handlers_generic_handler(
+                f"{PROTO_PACKAGE}.{service_name}", handlers
+            ),
+        )
+    )
+
+
+def servicer_import_path(service_name: str, method_names: List[str]) -> str:
+    """The servicer function to list in Serve's ``gRPCOptions``.
+
+    The service is spelled out in the path, so Serve's proxies register it
+    without importing the app.
+    """
+    return f"{__name__}:{'.'.join([service_name, *method_names])}"
+
+
+def __getattr__(name: str) -> Any:
+    # resolves the paths of servicer_import_path
+    service_name, *method_names = name.split(".")
+    if not method_names or not all(part.isidentifier() for part in name.split(".")):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return functools.partial(add_servicer, service_name, method_names)
+
+
+def grpc_method_path(service_name: str, method_name: str) -> str:
+    return f"/{PROTO_PACKAGE}.{service_name}/{method_name}"
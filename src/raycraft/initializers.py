@@ -0,0 +1,69 @@
+import asyncio
+import contextlib
+import functools
+import inspect
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List
+
+
+def dependencies(func: Callable[..., Any], names: Iterable[str]) -> List[str]:
+    """Return the initializers ``func`` takes as parameters."""
+    names = set(names)
+    return [name for name in inspect.signature(func).parameters if name in names]
+
+
+def startup_order(
+    initializers: Dict[str, Dict[str, Any]], names: Iterable[str]
+) -> List[str]:
+    """Order ``names`` and the initializers they depend on, dependencies first."""
+    order: List[str] = []
+    visiting: List[str] = []
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            cycle = " -> ".join(visiting[visiting.index(name) :] + [name])
+            raise ValueError(f"Initializers depend on each other: {cycle}.")
+
+        visiting.append(name)
+        initializer_dict = initializers[name]
+        # multiplexed initializers take a model id, not other initializers
+        if not initializer_dict["multiplexed"]:
+            for dependency in dependencies(initializer_dict["func"], initializers):
+                visit(dependency)
+        visiting.pop()
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+async def enter_initializer(
+    func: Callable[..., Any],
+    kwargs: Dict[str, Any],
+    exit_stack: contextlib.AsyncExitStack,
+    executor: Executor,
+) -> Any:
+    """Run an initializer, sync ones on ``executor``.
+
+    Generator initializers yield their value, the code after the ``yield`` is
+    pushed on ``exit_stack`` and runs when the replica stops.
+    """
+    loop = asyncio.get_running_loop()
+
+    if inspect.isasyncgenfunction(func):
+        async_context = contextlib.asynccontextmanager(func)(**kwargs)
+        return await exit_stack.enter_async_context(async_context)
+
+    if inspect.isgeneratorfunction(func):
+        context = contextlib.contextmanager(func)(**kwargs)
+        value = await loop.run_in_executor(executor, context.__enter__)
+        exit_stack.push(context.__exit__)
+        return value
+
+    if inspect.iscoroutinefunction(func):
+        return await func(**kwargs)
+
+    return await loop.run_in_executor(executor, functools.partial(func, **kwargs))
@@ -0,0 +1,47 @@
+import importlib
+import os
+from typing import Any, Optional
+
+# the same address as Serve's proxy, so clients work with both modes
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+IMPORT_PATH_ENV_VAR = "RAYCRAFT_LOCAL_IMPORT_PATH"
+
+
+def import_api(import_path: str) -> Any:
+    """Import ``module:attribute`` or ``module.attribute``."""
+    if ":" in import_path:
+        module_name, attribute = import_path.split(":", 1)
+    else:
+        module_name, attribute = import_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def create_app() -> Any:
+    """Build the FastAPI app in each uvicorn worker process."""
+    return import_api(os.environ[IMPORT_PATH_ENV_VAR]).local()
+
+
+def serve_locally(
+    import_path: str,
+    app_dir: str,
+    workers: int = 1,
+    reload_dir: Optional[str] = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+) -> None:
+    """Serve a RayCraftAPI with uvicorn, without starting Ray or Serve."""
+    import uvicorn
+
+    # workers import the app themselves, they inherit the environment
+    os.environ[IMPORT_PATH_ENV_VAR] = import_path
+    uvicorn.run(
+        f"{__name__}:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        reload=reload_dir is not None,
+        reload_dirs=[reload_dir] if reload_dir is not None else None,
+        app_dir=app_dir,
+    )
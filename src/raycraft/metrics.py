@@ -0,0 +1,413 @@
+import bisect
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from ray.util import metrics
+
+from .replica import get_replica
+from .streaming import watch_body
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS_S = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    """Instrumentation of routes, remote methods and initializers.
+
+    Metrics are exported through Ray's metrics API every
+    ``export_interval_s``, and also served in the Prometheus text format by
+    the replica handling ``route`` when it is set.
+    """
+
+    latency_buckets_s: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_S
+    route: Optional[str] = None
+    export_interval_s: float = 1.0
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class ReplicaMetrics:
+    """Metrics of one replica, kept for the metrics route and exported to Ray.
+
+    Calls only update the replica's own counts, a background thread records
+    what changed in Ray's metrics, which take tens of microseconds per update.
+    """
+
+    def __init__(
+        self, deployment_name: str, config: MetricsConfig, export: bool = True
+    ) -> None:
+        self._deployment_name = deployment_name
+        self._config = config
+        self._export = export
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._latencies: Dict[Tuple[str, str], Histogram] = {}
+        self._initializer_durations: Dict[str, float] = {}
+        # windows of recent observations, drained by each load signals report
+        self._recent_latencies: Deque[float] = deque(maxlen=1024)
+        self._recent_batch_fills: Deque[float] = deque(maxlen=1024)
+        # what changed since the last export to Ray
+        self._exported: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._pending_latencies: Deque[Tuple[Tuple[str, str], float]] = deque(
+            maxlen=65536
+        )  # beyond which latencies are only kept for the metrics route
+        self._pending_initializers: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def _tags(self, kind: str, name: str) -> Dict[str, str]:
+        return {"deployment": self._deployment_name, "kind": kind, "method": name}
+
+    def start(self, kind: str, name: str) -> None:
+        with self._lock:
+            self._requests[kind, name] += 1
+            self._in_flight[kind, name] += 1
+        if self._thread is None and self._export:
+            self._start_exporting()
+
+    def finish(self, kind: str, name: str, duration_s: float, failed: bool) -> None:
+        key = (kind, name)
+        with self._lock:
+            self._in_flight[key] -= 1
+            histogram = self._latencies.get(key)
+            if histogram is None:
+                histogram = self._latencies[key] = Histogram(
+                    self._config.latency_buckets_s
+                )
+            histogram.observe(duration_s)
+            if kind == "route":
+                self._recent_latencies.append(duration_s)
+            if failed:
+                self._errors[key] += 1
+            if self._export:
+                self._pending_latencies.append((key, duration_s))
+
+    def record_initializer(self, name: str, duration_s: float) -> None:
+        with self._lock:
+            self._initializer_durations[name] = duration_s
+            if self._export:
+                self._pending_initializers[name] = duration_s
+        if self._thread is None and self._export:
+            self._start_exporting()
+
+    def _start_exporting(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._export_forever, name="raycraft-metrics", daemon=True
+            )
+        self._thread.start()
+
+    def _export_forever(self) -> None:
+        try:
+            ray_metrics = self._ray_metrics()
+        except Exception:
+            logger.exception("Creating the Ray metrics failed, they are not exported.")
+            return
+        while True:
+            try:
+                self._record_in_ray(*ray_metrics)
+            except Exception:
+                logger.exception("Exporting metrics to Ray failed.")
+            time.sleep(self._config.export_interval_s)
+
+    def _ray_metrics(self) -> Tuple[Any, ...]:
+        tag_keys = ("deployment", "kind", "method")
+        return (
+            metrics.Counter(
+                "raycraft_requests_total",
+                description="Number of calls to a route or remote method.",
+                tag_keys=tag_keys,
+            ),
+            metrics.Counter(
+                "raycraft_errors_total",
+                description="Number of calls to a route or remote method that raised.",
+                tag_keys=tag_keys,
+            ),
+            metrics.Gauge(
+                "raycraft_in_flight",
+                description="Number of calls to a route or remote method in progress.",
+                tag_keys=tag_keys,
+            ),
+            metrics.Histogram(
+                "raycraft_latency_seconds",
+                description="Duration of calls to a route or remote method.",
+                boundaries=list(self._config.latency_buckets_s),
+                tag_keys=tag_keys,
+            ),
+            metrics.Gauge(
+                "raycraft_initializer_duration_seconds",
+                description="Duration of an initializer on this replica.",
+                tag_keys=("deployment", "initializer"),
+            ),
+        )
+
+    def _record_in_ray(
+        self,
+        requests: Any,
+        errors: Any,
+        in_flight: Any,
+        latency: Any,
+        initializer_duration: Any,
+    ) -> None:
+        """Record the changes since the previous export in Ray's metrics."""
+        with self._lock:
+            counts = {
+                key: (self._requests[key], self._errors.get(key, 0))
+                for key in self._requests
+            }
+            in_flight_counts = dict(self._in_flight)
+            latencies = list(self._pending_latencies)
+            self._pending_latencies.clear()
+            initializers, self._pending_initializers = self._pending_initializers, {}
+
+        for key, (n_requests, n_errors) in counts.items():
+            tags = self._tags(*key)
+            exported_requests, exported_errors = self._exported.get(key, (0, 0))
+            if n_requests > exported_requests:
+                requests.inc(n_requests - exported_requests, tags=tags)
+            if n_errors > exported_errors:
+                errors.inc(n_errors - exported_errors, tags=tags)
+            in_flight.set(in_flight_counts.get(key, 0), tags=tags)
+            self._exported[key] = (n_requests, n_errors)
+        for key, duration_s in latencies:
+            latency.observe(duration_s, tags=self._tags(*key))
+        for name, duration_s in initializers.items():
+            initializer_duration.set(
+                duration_s,
+                tags={"deployment": self._deployment_name, "initializer": name},
+            )
+
+    def record_batch(self, size: int, max_size: int) -> None:
+        with self._lock:
+            self._recent_batch_fills.append(size / max_size)
+
+    def signals(self) -> Dict[str, Any]:
+        """Summarize the load since the previous call, see ``LoadSignals``."""
+        with self._lock:
+            queue_depth = {
+                name: float(in_flight)
+                for (kind, name), in_flight in self._in_flight.items()
+                if kind == "route"
+            }
+            latencies = sorted(self._recent_latencies)
+            batch_fills = list(self._recent_batch_fills)
+            self._recent_latencies.clear()
+            self._recent_batch_fills.clear()
+
+        return {
+            "ongoing_requests": sum(queue_depth.values()),
+            "queue_depth": queue_depth,
+            "batch_fill_ratio": (
+                sum(batch_fills) / len(batch_fills) if batch_fills else None
+            ),
+            "p95_latency_s": (
+                latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else None
+            ),
+        }
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def labels(kind: str, name: str, **extra: str) -> str:
+            pairs = {**self._tags(kind, name), **extra}
+            return ",".join(f'{key}="{value}"' for key, value in pairs.items())
+
+        with self._lock:
+            for metric, values in (
+                ("raycraft_requests_total", self._requests),
+                ("raycraft_errors_total", self._errors),
+            ):
+                lines.append(f"# TYPE {metric} counter")
+                for (kind, name), value in values.items():
+                    lines.append(f"{metric}{{{labels(kind, name)}}} {value}")
+
+            lines.append("# TYPE raycraft_in_flight gauge")
+            for (kind, name), value in self._in_flight.items():
+                lines.append(f"raycraft_in_flight{{{labels(kind, name)}}} {value}")
+
+            lines.append("# TYPE raycraft_latency_seconds histogram")
+            for (kind, name), histogram in self._latencies.items():
+                cumulative = 0
+                bounds = [*map(str, histogram.buckets), "+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        "raycraft_latency_seconds_bucket"
+                        f"{{{labels(kind, name, le=bound)}}} {cumulative}"
+                    )
+                lines.append(
+                    "raycraft_latency_seconds_sum"
+                    f"{{{labels(kind, name)}}} {histogram.sum}"
+                )
+                lines.append(
+                    "raycraft_latency_seconds_count"
+                    f"{{{labels(kind, name)}}} {cumulative}"
+                )
+
+            lines.append("# TYPE raycraft_initializer_duration_seconds gauge")
+            for name, duration_s in self._initializer_durations.items():
+                lines.append(
+                    "raycraft_initializer_duration_seconds"
+                    f'{{deployment="{self._deployment_name}",initializer="{name}"}} '
+                    f"{duration_s}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def get_replica_metrics() -> Optional[ReplicaMetrics]:
+    return getattr(get_replica(), "_metrics", None)
+
+
+def instrument(func: Callable[..., Any], kind: str, name: str) -> Callable[..., Any]:
+    """Record calls to ``func`` in the serving replica's metrics."""
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            replica_metrics = get_replica_metrics()
+            if replica_metrics is None:
+                async for item in func(*args, **kwargs):
+                    yield item
+                return
+
+            replica_metrics.start(kind, name)
+            start, failed = time.perf_counter(), True
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+                failed = False
+            finally:
+                replica_metrics.finish(kind, name, time.perf_counter() - start, failed)
+
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            replica_metrics = get_replica_metrics()
+            if replica_metrics is None:
+                return (yield from func(*args, **kwargs))
+
+            replica_metrics.start(kind, name)
+            start, failed = time.perf_counter(), True
+            try:
+                result = yield from func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                replica_metrics.finish(kind, name, time.perf_counter() - start, failed)
+
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            replica_metrics = get_replica_metrics()
+            if replica_metrics is None:
+                return await func(*args, **kwargs)
+
+            replica_metrics.start(kind, name)
+            finish = replica_metrics.finish
+            start, failed, streaming = time.perf_counter(), True, False
+            try:
+                result = await func(*args, **kwargs)
+                failed = False
+                # a streamed response is timed until its body is sent
+                streaming = watch_body(
+                    result,
+                    lambda failed: finish(
+                        kind, name, time.perf_counter() - start, failed
+                    ),
+                )
+                return result
+            finally:
+                if not streaming:
+                    finish(kind, name, time.perf_counter() - start, failed)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        replica_metrics = get_replica_metrics()
+        if replica_metrics is None:
+            return func(*args, **kwargs)
+
+        replica_metrics.start(kind, name)
+        finish = replica_metrics.finish
+        start, failed, streaming = time.perf_counter(), True, False
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            streaming = watch_body(
+                result,
+                lambda failed: finish(kind, name, time.perf_counter() - start, failed),
+            )
+            return result
+        finally:
+            if not streaming:
+                finish(kind, name, time.perf_counter() - start, failed)
+
+    return wrapper
+
+
+def instrument_batch(
+    func: Callable[..., Any], max_batch_size: int
+) -> Callable[..., Any]:
+    """Record how full the batches passed to ``func`` are."""
+
+    @functools.wraps(func)
+    async def wrapper(items: List[Any], *args: Any, **kwargs: Any) -> Any:
+        replica_metrics = get_replica_metrics()
+        if replica_metrics is not None:
+            replica_metrics.record_batch(len(items), max_batch_size)
+        return await func(items, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from ray import serve
+
+from .affinity import is_affinity_id
+
+# the header Serve's proxy routes multiplexed requests with
+MODEL_ID_HEADER = "serve_multiplexed_model_id"
+
+# set from MODEL_ID_HEADER when the app is served without Ray
+local_model_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "raycraft_model_id", default=""
+)
+
+
+def get_model_id() -> str:
+    """Return the model id the current request asked for, or an empty string."""
+    model_id = local_model_id.get() or serve.get_multiplexed_model_id()
+    # affinity slots travel as model ids between deployments
+    return "" if is_affinity_id(model_id) else model_id
+
+
+class LocalMultiplexer:
+    """Keep the most recently used models loaded, for apps served without Ray."""
+
+    def __init__(self, load: Callable[[str], Awaitable[Any]], max_models: int) -> None:
+        self._load = load
+        self._max_models = max_models
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Future[Any]"] = {}
+
+    async def _load_and_keep(self, model_id: str) -> Any:
+        model = await self._load(model_id)
+        self._models[model_id] = model
+        while self._max_models != -1 and len(self._models) > self._max_models:
+            self._models.popitem(last=False)
+        return model
+
+    async def get(self, model_id: str) -> Any:
+        if model_id in self._models:
+            self._models.move_to_end(model_id)
+            return self._models[model_id]
+
+        # concurrent requests for a model wait for the same load
+        if model_id not in self._loading:
+            loading = asyncio.ensure_future(self._load_and_keep(model_id))
+            loading.add_done_callback(lambda _: self._loading.pop(model_id, None))
+            self._loading[model_id] = loading
+        return await asyncio.shield(self._loading[model_id])
+
+
+def build_model_loader(
+    load: Callable[[str], Awaitable[Any]], max_models: int, local: bool = False
+) -> Callable[..., Awaitable[Any]]:
+    """Return ``model(model_id=None)``, loading models on demand into an LRU.
+
+    Without a ``model_id``, the one of the current request is used. On Serve,
+    the loaded models are reported so that the proxy routes requests to the
+    replicas that already hold their model.
+    """
+    if local:
+        get_model = LocalMultiplexer(load, max_models).get
+    else:
+
+        async def load_model(model_id: str) -> Any:
+            return await load(model_id)
+
+        get_model = serve.multiplexed(max_num_models_per_replica=max_models)(load_model)
+
+    async def model(model_id: Optional[str] = None) -> Any:
+        if model_id is None:
+            model_id = get_model_id()
+        if not model_id:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Set the {MODEL_ID_HEADER!r} header to pick a model.",
+            )
+        return await get_model(model_id)
+
+    return model
@@ -0,0 +1,300 @@
+import asyncio
+import collections
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import CodeType, FrameType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Counter,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import ray
+from fastapi import HTTPException, Request
+from starlette.responses import PlainTextResponse, Response
+
+PROFILE_TOKEN_ENV_VAR = "RAYCRAFT_PROFILE_TOKEN"
+# how long replicas wait before reconnecting to a profile board that died
+RECONNECT_INTERVAL_S = 1.0
+# how long `raycraft profile` waits for the replicas past the capture itself
+RESULTS_TIMEOUT_S = 10.0
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    """On-demand CPU profiling of replicas.
+
+    The ingress serves ``route``, answering requests that carry an
+    ``Authorization: Bearer <token>`` header matching the ``token_env_var``
+    environment variable of the replica, the route is disabled while it is
+    unset. Replicas also take captures requested by ``raycraft profile``.
+    """
+
+    route: str = "/-/profile"
+    token_env_var: str = PROFILE_TOKEN_ENV_VAR
+    sample_interval_s: float = 0.01
+    max_seconds: float = 300.0
+
+
+def frame_label(code: CodeType) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def running_threads() -> Optional[Set[int]]:
+    """The threads of the process that are on a CPU, None if the OS does not tell.
+
+    Threads blocked on I/O, a lock or a queue are asleep for the kernel,
+    whatever Python function they are blocked in.
+    """
+    running = set()
+    for thread in threading.enumerate():
+        try:
+            with open(f"/proc/self/task/{thread.native_id}/stat") as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            return None
+        # the state follows the thread name, which is in parentheses
+        if stat[stat.rindex(")") + 2] == "R" and thread.ident is not None:
+            running.add(thread.ident)
+    return running
+
+
+class SamplingProfiler:
+    """Sample the stacks of the threads of the process running on a CPU.
+
+    With ``codes``, only samples of stacks running one of them are kept.
+    Where the state of threads is unknown, idle threads are sampled too.
+    """
+
+    # one capture at a time per process, samples would be counted twice
+    _lock = threading.Lock()
+
+    def __init__(
+        self, interval_s: float, codes: Optional[Set[CodeType]] = None
+    ) -> None:
+        self._interval_s = interval_s
+        self._codes = codes
+        self.stacks: Counter[str] = collections.Counter()
+
+    def _sample(self, own_thread_id: int) -> None:
+        frames = sys._current_frames()
+        running = running_threads()
+        for thread_id, frame in frames.items():
+            if thread_id == own_thread_id:
+                continue
+            if running is not None and thread_id not in running:
+                continue
+
+            codes: List[CodeType] = []
+            current: Optional[FrameType] = frame
+            while current is not None:
+                codes.append(current.f_code)
+                current = current.f_back
+            if self._codes is not None and self._codes.isdisjoint(codes):
+                continue
+            self.stacks[";".join(frame_label(code) for code in reversed(codes))] += 1
+
+    def run(self, seconds: float) -> Counter[str]:
+        """Sample for ``seconds``, blocking the calling thread."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already being captured.")
+
+        try:
+            own_thread_id = threading.get_ident()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                self._sample(own_thread_id)
+                time.sleep(self._interval_s)
+            return self.stacks
+        finally:
+            self._lock.release()
+
+
+def collapse(stacks: Counter[str]) -> str:
+    """Format stacks as collapsed stack lines, as read by flamegraph tools."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def merge_collapsed(collapsed: Iterable[str]) -> Counter[str]:
+    stacks: Counter[str] = collections.Counter()
+    for text in collapsed:
+        for line in text.splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+@ray.remote(num_cpus=0)
+class ProfileBoard:
+    """Hand the capture requested by ``raycraft profile`` to the replicas.
+
+    Replicas keep a call to ``wait`` pending, which returns as soon as a
+    capture is requested, the same way Serve pushes config updates.
+    """
+
+    def __init__(self) -> None:
+        self._request: Optional[Dict[str, Any]] = None
+        self._requested = asyncio.Condition()
+        self._taken: Set[str] = set()
+        self._results: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._submitted = asyncio.Condition()
+
+    async def start(self, seconds: float, target: Optional[str]) -> str:
+        self._request = {"id": uuid.uuid4().hex, "seconds": seconds, "target": target}
+        self._taken = set()
+        self._results = {}
+        async with self._requested:
+            self._requested.notify_all()
+        return str(self._request["id"])
+
+    async def wait(self, replica_id: str) -> Dict[str, Any]:
+        async with self._requested:
+            await self._requested.wait_for(
+                lambda: self._request is not None and replica_id not in self._taken
+            )
+        assert self._request is not None
+        self._taken.add(replica_id)
+        return self._request
+
+    async def submit(
+        self, request_id: str, replica_id: str, collapsed: str, error: Optional[str]
+    ) -> None:
+        if self._request is not None and self._request["id"] == request_id:
+            self._results[replica_id] = (collapsed, error)
+            async with self._submitted:
+                self._submitted.notify_all()
+
+    async def results(
+        self, request_id: str, timeout_s: float
+    ) -> Dict[str, Tuple[str, Optional[str]]]:
+        """Wait until every replica that took the capture submitted it."""
+        if self._request is None or self._request["id"] != request_id:
+            return {}
+        async with self._submitted:
+            try:
+                await asyncio.wait_for(
+                    self._submitted.wait_for(lambda: self._taken <= set(self._results)),
+                    timeout_s,
+                )
+            except asyncio.TimeoutError:
+                pass
+        # replicas starting later do not take a capture that is over
+        self._request = None
+        return dict(self._results)
+
+
+def profile_board_name(app_name: str, deployment_name: str) -> str:
+    return f"raycraft-profile:{app_name}:{deployment_name}"
+
+
+def get_profile_board(app_name: str, deployment_name: str) -> Any:
+    # the board lives as long as a replica or `raycraft profile` holds on to it
+    return ProfileBoard.options(  # type: ignore [attr-defined]
+        name=profile_board_name(app_name, deployment_name),
+        get_if_exists=True,
+        # every replica keeps a call pending
+        max_concurrency=10_000,
+    ).remote()
+
+
+def start_profile_listener(
+    app_name: str,
+    deployment_name: str,
+    replica_id: str,
+    resolve_codes: Callable[[Optional[str]], Optional[Set[CodeType]]],
+    config: ProfilingConfig,
+) -> threading.Thread:
+    """Take the captures requested by ``raycraft profile``, in the background."""
+
+    def listen_forever() -> None:
+        board = get_profile_board(app_name, deployment_name)
+        while True:
+            try:
+                request = ray.get(board.wait.remote(replica_id))
+            except ray.exceptions.RayActorError:
+                time.sleep(RECONNECT_INTERVAL_S)
+                board = get_profile_board(app_name, deployment_name)
+                continue
+
+            collapsed, error = "", None
+            try:
+                seconds = min(request["seconds"], config.max_seconds)
+                profiler = SamplingProfiler(
+                    config.sample_interval_s, resolve_codes(request["target"])
+                )
+                collapsed = collapse(profiler.run(seconds))
+            except Exception as exception:
+                error = str(exception)
+            board.submit.remote(request["id"], replica_id, collapsed, error)
+
+    thread = threading.Thread(target=listen_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def collect_profiles(
+    app_name: str, deployment_name: str, seconds: float, target: Optional[str]
+) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Profile every replica of a running app, keyed by replica."""
+    board = get_profile_board(app_name, deployment_name)
+    request_id = ray.get(board.start.remote(seconds, target))
+    time.sleep(seconds)
+    return ray.get(  # type: ignore [no-any-return]
+        board.results.remote(request_id, RESULTS_TIMEOUT_S)
+    )
+
+
+def build_profile_endpoint(
+    config: ProfilingConfig,
+    resolve_codes: Callable[[Optional[str]], Optional[Set[CodeType]]],
+) -> Callable[..., Awaitable[Response]]:
+    """Return the admin route profiling the replica that serves it."""
+
+    async def profile_endpoint(
+        request: Request, seconds: float = 10.0, target: Optional[str] = None
+    ) -> Response:
+        token = os.environ.get(config.token_env_var)
+        if not token:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Set {config.token_env_var} on the replicas to profile them.",
+            )
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid profiling token.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if not 0 < seconds <= config.max_seconds:
+            raise HTTPException(
+                status_code=422,
+                detail=f"seconds must be in (0, {config.max_seconds}].",
+            )
+        try:
+            codes = resolve_codes(target)
+        except ValueError as error:
+            raise HTTPException(status_code=404, detail=str(error)) from None
+
+        profiler = SamplingProfiler(config.sample_interval_s, codes)
+        loop = asyncio.get_running_loop()
+        try:
+            stacks = await loop.run_in_executor(None, profiler.run, seconds)
+        except RuntimeError as error:
+            raise HTTPException(status_code=409, detail=str(error)) from None
+        return PlainTextResponse(collapse(stacks))
+
+    return profile_endpoint
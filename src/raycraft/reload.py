@@ -0,0 +1,281 @@
+import base64
+import dataclasses
+import functools
+import hashlib
+import inspect
+import io
+import json
+import sys
+import typing
+from types import CodeType, FunctionType, ModuleType
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Set, Tuple
+
+from fastapi.datastructures import DefaultPlaceholder
+from pydantic import BaseModel
+from ray import cloudpickle
+from ray.cloudpickle.cloudpickle_fast import CloudPickler
+
+from .replica import get_replica
+
+# nested values deeper than this are described by type and content hash
+STABLE_REPR_MAX_DEPTH = 8
+
+
+def stable_repr(value: Any, depth: int = 0) -> str:
+    """Like ``repr`` but the same across processes and module reloads.
+
+    Functions include their compiled code and pydantic models their schema,
+    so that editing them changes the result.
+    """
+    if depth > STABLE_REPR_MAX_DEPTH:
+        return opaque_repr(value)
+    depth += 1
+
+    if inspect.isfunction(value) or inspect.ismethod(value):
+        func: Any = getattr(value, "__func__", value)
+        code = code_repr(func.__code__)
+        return f"{value.__module__}.{value.__qualname__}({code})"
+    if isinstance(value, DefaultPlaceholder):
+        return f"Default({stable_repr(value.value, depth)})"
+    if isinstance(value, type):
+        name = f"{value.__module__}.{value.__qualname__}"
+        if issubclass(value, BaseModel):
+            return f"{name}({json.dumps(value.schema(), sort_keys=True)})"
+        return name
+    if typing.get_origin(value) is not None:
+        return f"{value!r}{stable_repr(typing.get_args(value), depth)}"
+    if dataclasses.is_dataclass(value):
+        fields = ", ".join(
+            f"{field.name}={stable_repr(getattr(value, field.name), depth)}"
+            for field in dataclasses.fields(value)
+        )
+        return f"{type(value).__qualname__}({fields})"
+    if isinstance(value, dict):
+        items = sorted(
+            f"{stable_repr(key, depth)}: {stable_repr(item, depth)}"
+            for key, item in value.items()
+        )
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [stable_repr(item, depth) for item in value]
+        if isinstance(value, (set, frozenset)):
+            items.sort()
+        return f"{type(value).__name__}({', '.join(items)})"
+    if type(value).__repr__ is object.__repr__:  # type: ignore [comparison-overlap]
+        # the default repr is the address of the object, describe its state instead
+        try:
+            state = (
+                value.__getstate__() if hasattr(value, "__getstate__") else vars(value)
+            )
+        except TypeError:
+            # before Python 3.11, plain objects and __slots__ have neither
+            state = None
+        if state is None:
+            return opaque_repr(value)
+        return f"{type(value).__qualname__}({stable_repr(state, depth)})"
+    return repr(value)
+
+
+def opaque_repr(value: Any) -> str:
+    """Describe ``value`` by its type and pickled content, or its identity."""
+    try:
+        pickled = cloudpickle.dumps(value)  # type: ignore [attr-defined]
+        content = hashlib.sha256(pickled).hexdigest()[:16]
+    except Exception:
+        # not picklable, it is never the same after a reload
+        content = f"id{id(value)}"
+    return f"{type(value).__qualname__}#{content}"
+
+
+def code_repr(code: CodeType) -> str:
+    """Describe compiled code, leaving out where it is in its file.
+
+    Unlike the source, this is exact for lambdas, which ``inspect`` can only
+    locate by line.
+    """
+    consts = [
+        code_repr(const) if isinstance(const, CodeType) else repr(const)
+        for const in code.co_consts
+    ]
+    return f"{code.co_code.hex()} {consts} {code.co_names}"
+
+
+def code_names(code: CodeType) -> Set[str]:
+    """Return the names ``code`` looks up, including in its nested functions."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names |= code_names(const)
+    return names
+
+
+def _global_parts(*funcs: Callable[..., Any]) -> Tuple[List[str], List[str]]:
+    """Describe the module globals ``funcs`` use, split into functions and data."""
+    functions: List[str] = []
+    data: List[str] = []
+    seen: Set[int] = set()
+    pending = [inspect.unwrap(func) for func in funcs]
+    while pending:
+        func = pending.pop()
+        if id(func) in seen or not isinstance(func, FunctionType):
+            continue
+        seen.add(id(func))
+        for name in sorted(code_names(func.__code__)):
+            if name not in func.__globals__:
+                continue
+            value = func.__globals__[name]
+            if isinstance(value, FunctionType) and value.__module__ == func.__module__:
+                pending.append(value)
+                functions.append(f"{name}={function_source(value)}")
+            elif isinstance(value, ModuleType):
+                functions.append(f"{name}={value.__name__}")
+            elif isinstance(value, (FunctionType, type)):
+                functions.append(f"{name}={stable_repr(value)}")
+            else:
+                data.append(f"{name}={stable_repr(value)}")
+    return functions, data
+
+
+def global_references(*funcs: Callable[..., Any]) -> str:
+    """Describe the module globals ``funcs`` use, rather than their whole module.
+
+    Functions defined in the same module are followed, so editing a helper the
+    functions call changes the result but editing an unrelated one does not.
+    """
+    functions, data = _global_parts(*funcs)
+    return "\n".join(functions + data)
+
+
+def global_data(*funcs: Callable[..., Any]) -> str:
+    """Describe the module data ``funcs`` use, leaving out functions and classes.
+
+    ``dump_functions`` does not send this data, replicas look it up in the
+    module they imported, so they only see a change to it when they restart.
+    """
+    _, data = _global_parts(*funcs)
+    return "\n".join(data)
+
+
+def function_source(obj: Any) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return stable_repr(obj)
+
+
+def function_interface(func: Callable[..., Any]) -> str:
+    """Describe what a function looks like from the outside, not its body."""
+    kind = (
+        inspect.isasyncgenfunction(func),
+        inspect.isgeneratorfunction(func),
+        inspect.iscoroutinefunction(func),
+    )
+    signature = inspect.signature(func)
+    annotations = [param.annotation for param in signature.parameters.values()]
+    annotations.append(signature.return_annotation)
+    return f"{func.__name__}{signature} {kind} {stable_repr(annotations)}"
+
+
+def digest(*parts: str) -> str:
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    return hasher.hexdigest()[:16]
+
+
+class _ModuleGlobal:
+    """Unpickles as a global of a module imported by the unpickling process."""
+
+    def __init__(self, module: ModuleType, name: str) -> None:
+        self.module = module
+        self.name = name
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return getattr, (self.module, self.name)
+
+
+class _FunctionPickler(CloudPickler):
+    """Pickle the functions of ``modules`` by value, their other globals by name.
+
+    Replicas then run the functions as they are now, while classes and module
+    level data stay the ones imported by the replica.
+    """
+
+    def __init__(self, file: io.BytesIO, modules: Set[str]) -> None:
+        super().__init__(file)  # type: ignore [no-untyped-call]
+        self._modules = modules
+
+    def reducer_override(self, obj: Any) -> Any:
+        if not isinstance(obj, FunctionType) or obj.__module__ not in self._modules:
+            return super().reducer_override(obj)  # type: ignore [no-untyped-call]
+
+        reduced = self._dynamic_function_reduce(obj)  # type: ignore [no-untyped-call]
+        state, slotstate = reduced[2]
+        module = sys.modules[obj.__module__]
+        slotstate["__globals__"] = {
+            name: value
+            if isinstance(value, (FunctionType, ModuleType, type))
+            or vars(module).get(name) is not value
+            else _ModuleGlobal(module, name)
+            for name, value in slotstate["__globals__"].items()
+        }
+        return (*reduced[:2], (state, slotstate), *reduced[3:])
+
+
+def dump_functions(functions: Dict[str, Callable[..., Any]]) -> str:
+    """Serialize functions by value, so replicas run the code as it is now."""
+    modules = {
+        func.__module__
+        for func in functions.values()
+        if func.__module__ in sys.modules and func.__module__ != "__main__"
+    }
+    with io.BytesIO() as file:
+        pickler = _FunctionPickler(file, modules)
+        pickler.dump(functions)  # type: ignore [no-untyped-call]
+        return base64.b64encode(file.getvalue()).decode()
+
+
+def load_functions(dump: str) -> Dict[str, Callable[..., Any]]:
+    return cloudpickle.loads(base64.b64decode(dump))  # type: ignore [no-any-return]
+
+
+def hot_swappable(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Call the latest version of ``func`` the serving replica was sent."""
+
+    def current() -> Callable[..., Any]:
+        functions: Dict[str, Callable[..., Any]] = getattr(
+            get_replica(), "_functions", {}
+        )
+        return functions.get(name, func)
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            async for item in current()(*args, **kwargs):
+                yield item
+
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            return (yield from current()(*args, **kwargs))
+
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await current()(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return current()(*args, **kwargs)
+
+    return wrapper
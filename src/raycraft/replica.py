@@ -0,0 +1,34 @@
+import contextvars
+from typing import Any, Optional
+
+from ray.serve import get_replica_context
+
+# set when the app is served without Ray, see ``RayCraftAPI.local``
+_local_replica: Optional[Any] = None
+
+# the replica being constructed, serve only knows it once its constructor returns
+starting_replica: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar(
+    "raycraft_starting_replica", default=None
+)
+
+
+def set_local_replica(obj: Optional[Any]) -> None:
+    global _local_replica
+    _local_replica = obj
+
+
+async def create_replica(cls: type, **kwargs: Any) -> Any:
+    """Instantiate a class with an async ``__init__``, the way Serve does."""
+    obj: Any = object.__new__(cls)
+    await obj.__init__(**kwargs)
+    return obj
+
+
+def get_replica() -> Any:
+    """Return the instance of the generated class serving the current request."""
+    replica = starting_replica.get()
+    if replica is not None:
+        return replica
+    if _local_replica is not None:
+        return _local_replica
+    return get_replica_context().servable_object
@@ -0,0 +1,156 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import ray
+from ray.exceptions import ObjectLostError, RayActorError
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
+
+from .reload import digest, function_source, global_references
+
+# the initializer actors this replica is attached to, by name
+_stores: Dict[str, Any] = {}
+# owned by this replica, lost with it, which is how the actors notice it died
+_leases: Dict[str, "ray.ObjectRef[str]"] = {}
+
+# how often initializer actors look for replicas that died without releasing
+REAP_INTERVAL_S = 2.0
+
+
+@ray.remote(num_cpus=0)
+class SharedInitializer:
+    """Run an initializer once per node and keep its output in the object store.
+
+    Calls are processed one at a time, so replicas starting together wait for
+    the first load instead of repeating it. The actor is detached, so that its
+    output outlives the replica that created it, and exits once the last
+    replica attached to it is released or has died.
+    """
+
+    def __init__(self, initializer: Callable[..., Any]) -> None:
+        self._initializer = initializer
+        self._refs: List["ray.ObjectRef[Any]"] = []
+        # the lease of each replica, an object the replica owns
+        self._replicas: Dict[str, "ray.ObjectRef[str]"] = {}
+
+        handle = ray.get_runtime_context().current_actor
+
+        def reap_forever() -> None:
+            while True:
+                time.sleep(REAP_INTERVAL_S)
+                handle.reap.remote()
+
+        threading.Thread(target=reap_forever, daemon=True).start()
+
+    # references are wrapped in lists so that Ray does not resolve them
+
+    def attach(
+        self, replica_id: str, lease: List["ray.ObjectRef[str]"]
+    ) -> List["ray.ObjectRef[Any]"]:
+        [self._replicas[replica_id]] = lease
+        return self._refs
+
+    def get(
+        self, dependencies: Dict[str, List["ray.ObjectRef[Any]"]]
+    ) -> List["ray.ObjectRef[Any]"]:
+        if not self._refs:
+            kwargs = {name: ray.get(ref) for name, [ref] in dependencies.items()}
+            self._refs = [ray.put(self._initializer(**kwargs))]
+        return self._refs
+
+    def release(self, replica_id: str) -> None:
+        self._replicas.pop(replica_id, None)
+        if not self._replicas:
+            ray.actor.exit_actor()
+
+    def reap(self) -> None:
+        """Release the replicas that died, as their leases are lost with them."""
+        if not self._replicas:
+            return
+        for replica_id, lease in list(self._replicas.items()):
+            try:
+                ray.get(lease)
+            except ObjectLostError:
+                del self._replicas[replica_id]
+        if not self._replicas:
+            ray.actor.exit_actor()
+
+
+def shared_name(app_name: str, name: str, initializer: Callable[..., Any]) -> str:
+    """Name the output of ``initializer`` after its Serve app and its code.
+
+    Apps using the same names do not share outputs, and replicas of a
+    redeployed app do not attach to the output of an edited initializer.
+    """
+    code = digest(function_source(initializer), global_references(initializer))
+    return f"{app_name}:{name}:{code}"
+
+
+def load_shared(
+    name: str,
+    initializer: Callable[..., Any],
+    dependencies: Mapping[str, Any],
+    dependency_refs: Mapping[str, "ray.ObjectRef[Any]"],
+    ray_actor_options: Optional[Dict[str, Any]] = None,
+) -> Tuple[Any, "ray.ObjectRef[Any]"]:
+    """Return the output of ``initializer`` shared by the replicas on this node.
+
+    Buffers such as numpy arrays are mapped from the object store without a
+    copy, other objects are deserialized instead of running the initializer.
+    The ``dependencies`` it takes are sent through the object store, reusing
+    the ``dependency_refs`` of those already there. Returns the output and
+    its reference.
+    """
+    node_id = ray.get_runtime_context().get_node_id()
+    actor_name = f"raycraft-shared:{name}:{node_id}"
+    replica_id = ray.get_runtime_context().get_worker_id()
+    lease = _leases.setdefault(actor_name, ray.put(replica_id))
+    for attempt in range(2):
+        store = SharedInitializer.options(  # type: ignore [attr-defined]
+            name=actor_name,
+            get_if_exists=True,
+            lifetime="detached",
+            scheduling_strategy=NodeAffinitySchedulingStrategy(node_id, soft=False),
+            **(ray_actor_options or {}),
+        ).remote(initializer)
+        try:
+            refs = ray.get(store.attach.remote(replica_id, [lease]))
+            break
+        except RayActorError:
+            # the last replica released the actor in between, start a new one
+            if attempt:
+                raise
+    _stores[actor_name] = store
+
+    if not refs:
+        # only the first replicas on the node need to send the dependencies
+        sent = {
+            dependency: [
+                dependency_refs[dependency]
+                if dependency in dependency_refs
+                else ray.put(value)
+            ]
+            for dependency, value in dependencies.items()
+        }
+        refs = ray.get(store.get.remote(sent))
+    [ref] = refs
+    return ray.get(ref), ref
+
+
+async def release_shared() -> None:
+    """Detach this replica from its shared initializers.
+
+    Called when the replica stops, the initializers of a deleted app exit
+    with their last replica.
+    """
+    if not _stores:
+        return
+    replica_id = ray.get_runtime_context().get_worker_id()
+    while _stores:
+        actor_name, store = _stores.popitem()
+        _leases.pop(actor_name, None)
+        try:
+            await store.release.remote(replica_id)
+        except RayActorError:
+            # it exited as this was its last replica
+            pass
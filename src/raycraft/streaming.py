@@ -0,0 +1,118 @@
+import inspect
+import json
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Mapping,
+    Optional,
+    Union,
+)
+
+from fastapi.encoders import jsonable_encoder
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+
+def is_generator_function(func: Callable[..., Any]) -> bool:
+    func = inspect.unwrap(func)
+    return inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+
+
+async def encode_chunks(chunks: AsyncIterator[Any]) -> AsyncIterator[Union[str, bytes]]:
+    """Pass text and bytes through, send anything else as a line of JSON."""
+    async for chunk in chunks:
+        if isinstance(chunk, (str, bytes)):
+            yield chunk
+        else:
+            yield json.dumps(jsonable_encoder(chunk)) + "\n"
+
+
+class _WatchedBody:
+    """Iterate ``body``, calling ``finish(failed)`` once, when it ends.
+
+    A body dropped before it ends, e.g. when the client disconnects before the
+    response starts, is finished as failed.
+    """
+
+    def __init__(
+        self,
+        body: AsyncIterable[Any],
+        finish: Callable[[bool], None],
+        wrap: Optional[Callable[[Awaitable[Any]], Awaitable[Any]]],
+    ) -> None:
+        self._body = body.__aiter__()
+        self._finish: Optional[Callable[[bool], None]] = finish
+        self._wrap = wrap
+
+    def __aiter__(self) -> "_WatchedBody":
+        return self
+
+    async def __anext__(self) -> Any:
+        chunk = self._body.__anext__()
+        try:
+            return await (chunk if self._wrap is None else self._wrap(chunk))
+        except StopAsyncIteration:
+            self._finish_once(False)
+            raise
+        except BaseException:
+            self._finish_once(True)
+            raise
+
+    def _finish_once(self, failed: bool) -> None:
+        finish, self._finish = self._finish, None
+        if finish is not None:
+            finish(failed)
+
+    def __del__(self) -> None:
+        self._finish_once(True)
+
+
+def watch_body(
+    response: Any,
+    finish: Callable[[bool], None],
+    wrap: Optional[Callable[[Awaitable[Any]], Awaitable[Any]]] = None,
+) -> bool:
+    """Call ``finish(failed)`` once a streaming ``response`` has sent its body.
+
+    Each chunk is awaited through ``wrap``, if given. Returns whether
+    ``response`` streams, otherwise it is left as is and the caller finishes.
+    """
+    if not isinstance(response, StreamingResponse):
+        return False
+    response.body_iterator = _WatchedBody(response.body_iterator, finish, wrap)
+    return True
+
+
+class EventSourceResponse(StreamingResponse):
+    """Stream each chunk yielded by a route as a Server-Sent Event."""
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        content: AsyncIterator[Union[str, bytes]],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        super().__init__(
+            self._to_events(content),
+            status_code=status_code,
+            headers={"Cache-Control": "no-cache", **(headers or {})},
+            media_type=media_type,
+            background=background,
+        )
+
+    @staticmethod
+    async def _to_events(
+        content: AsyncIterator[Union[str, bytes]]
+    ) -> AsyncIterator[str]:
+        async for chunk in content:
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode()
+            lines = chunk.splitlines() or [""]
+            yield "".join(f"data: {line}\n" for line in lines) + "\n"
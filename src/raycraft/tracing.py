@@ -0,0 +1,397 @@
+import abc
+import atexit
+import collections
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .streaming import watch_body
+
+TRACEPARENT_HEADER = "traceparent"
+# hidden keyword argument carrying the trace context to remote deployments
+TRACE_KWARG = "_raycraft_trace"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        """Format as a W3C ``traceparent`` header."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: str) -> Optional["SpanContext"]:
+        match = _TRACEPARENT.match(value.strip().lower())
+        if match is None or set(match[1]) == {"0"} or set(match[2]) == {"0"}:
+            return None
+        return cls(match[1], match[2], bool(int(match[3], 16) & 1))
+
+
+@dataclass
+class Span:
+    """A timed operation, times are Unix timestamps in seconds."""
+
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SpanExporter(abc.ABC):
+    """Receive finished spans, subclass it to send them to a tracing backend.
+
+    Exporters are pickled into every replica, ``export`` is called with
+    batches of spans from a background thread, one per app and process.
+    """
+
+    @abc.abstractmethod
+    def export(self, spans: Sequence[Span]) -> None:
+        ...
+
+
+class InMemoryExporter(SpanExporter):
+    """Keep the latest ``max_spans`` spans of the process, for tests and local runs."""
+
+    def __init__(self, max_spans: int = 10_000) -> None:
+        self.spans: Deque[Span] = collections.deque(maxlen=max_spans)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"max_spans": self.spans.maxlen}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["max_spans"])  # type: ignore [misc]
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class FileExporter(SpanExporter):
+    """Append spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"])  # type: ignore [misc]
+
+    def export(self, spans: Sequence[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict()) + "\n" for span in spans)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(lines)
+
+
+@dataclass(frozen=True)
+class TracingConfig:
+    """Trace routes, remote methods and initializers.
+
+    Requests without a ``traceparent`` header start a new trace with
+    probability ``sample_rate``, the others follow the caller's decision.
+
+    Finished spans are queued and exported in the background, every
+    ``export_interval_s`` or as soon as ``max_batch_size`` are waiting.
+    Spans finishing while ``max_queue_size`` are waiting are dropped.
+    """
+
+    exporter: SpanExporter = field(default_factory=InMemoryExporter)
+    sample_rate: float = 1.0
+    export_interval_s: float = 1.0
+    max_batch_size: int = 512
+    max_queue_size: int = 8192
+
+
+# the span being run, or the context received from the caller
+current_span: contextvars.ContextVar[Optional[SpanContext]] = contextvars.ContextVar(
+    "raycraft_span", default=None
+)
+
+
+def new_id(n_bytes: int) -> str:
+    return secrets.token_hex(n_bytes)
+
+
+class Tracer:
+    def __init__(self, config: TracingConfig) -> None:
+        self.config = config
+        self._queue: Deque[Span] = collections.deque()
+        self._batch_ready = threading.Event()
+        self._export_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # ids of the spans ended by the body of their response
+        self._streaming: Set[str] = set()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"config": self.config}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["config"])  # type: ignore [misc]
+
+    def _record(self, span: Span) -> None:
+        if len(self._queue) >= self.config.max_queue_size:
+            # the exporter does not keep up, drop spans rather than memory
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.config.max_batch_size:
+            self._batch_ready.set()
+        if self._thread is None:
+            self._start_exporting()
+
+    def _start_exporting(self) -> None:
+        with self._export_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._export_forever, name="raycraft-spans", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _export_forever(self) -> None:
+        while True:
+            self._batch_ready.wait(self.config.export_interval_s)
+            self._batch_ready.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export the queued spans now."""
+        with self._export_lock:
+            while self._queue:
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(len(self._queue), self.config.max_batch_size))
+                ]
+                try:
+                    self.config.exporter.export(batch)
+                except Exception:
+                    logger.exception(f"Exporting {len(batch)} spans failed.")
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+        make_current: bool = True,
+    ) -> Iterator[Optional[Span]]:
+        """Run the block in a new span, child of ``parent`` or the current one.
+
+        Generators pass ``make_current=False``: they may be resumed in other
+        contexts, where the span could not be reset.
+        """
+        parent = parent or current_span.get()
+        if parent is None:
+            sampled = random.random() < self.config.sample_rate
+            trace_id, parent_id = new_id(16), None
+        else:
+            sampled = parent.sampled
+            trace_id, parent_id = parent.trace_id, parent.span_id
+
+        if not sampled:
+            if not make_current:
+                yield None
+                return
+            token = current_span.set(SpanContext(trace_id, new_id(8), False))
+            try:
+                yield None
+            finally:
+                current_span.reset(token)
+            return
+
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=trace_id,
+            span_id=new_id(8),
+            parent_id=parent_id,
+            start_time=time.time(),
+            attributes=dict(attributes or {}),
+        )
+        span_token = current_span.set(span.context()) if make_current else None
+        try:
+            yield span
+        except BaseException as error:
+            span.status = "error"
+            span.attributes["error.type"] = type(error).__name__
+            raise
+        finally:
+            if span_token is not None:
+                current_span.reset(span_token)
+            if span.span_id not in self._streaming:
+                self._end(span)
+
+    def _end(self, span: Span) -> None:
+        span.end_time = time.time()
+        self._record(span)
+
+    def end_with_body(self, span: Optional[Span], response: Any) -> None:
+        """End ``span`` once a streaming ``response`` has sent its body.
+
+        The span is current while the body is produced, rather than ending
+        when its block exits.
+        """
+        if span is None:
+            return
+
+        streamed, context = span, span.context()
+
+        async def wrap(chunk: Awaitable[Any]) -> Any:
+            token = current_span.set(context)
+            try:
+                return await chunk
+            finally:
+                current_span.reset(token)
+
+        def finish(failed: bool) -> None:
+            self._streaming.discard(streamed.span_id)
+            if failed and streamed.status == "ok":
+                streamed.status = "error"
+            self._end(streamed)
+
+        if watch_body(response, finish, wrap):
+            self._streaming.add(streamed.span_id)
+
+
+def traced(
+    func: Callable[..., Any],
+    tracer: Tracer,
+    name: str,
+    kind: str = "internal",
+    remote_parent: bool = False,
+) -> Callable[..., Any]:
+    """Run each call to ``func`` in a span.
+
+    With ``remote_parent``, calls carry the caller's context in the
+    ``TRACE_KWARG`` keyword argument, as sent by ``trace_kwargs``, and the
+    time spent between the call being sent and starting is recorded.
+    """
+
+    def start(kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        parent, attributes = None, {}
+        if remote_parent:
+            kwargs = dict(kwargs)
+            trace = kwargs.pop(TRACE_KWARG, None)
+            if trace is not None:
+                parent = SpanContext.from_traceparent(trace["traceparent"])
+                attributes["queue_s"] = max(time.time() - trace["sent_at"], 0.0)
+        return kwargs, {"parent": parent, "attributes": attributes}
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            kwargs, options = start(kwargs)
+            with tracer.span(name, kind, make_current=False, **options):
+                async for item in func(*args, **kwargs):
+                    yield item
+
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            kwargs, options = start(kwargs)
+            with tracer.span(name, kind, make_current=False, **options):
+                return (yield from func(*args, **kwargs))
+
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            kwargs, options = start(kwargs)
+            with tracer.span(name, kind, **options) as span:
+                result = await func(*args, **kwargs)
+                tracer.end_with_body(span, result)
+                return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        kwargs, options = start(kwargs)
+        with tracer.span(name, kind, **options) as span:
+            result = func(*args, **kwargs)
+            tracer.end_with_body(span, result)
+            return result
+
+    return wrapper
+
+
+def trace_kwargs() -> Dict[str, Any]:
+    """The keyword argument passing the current trace context to a deployment."""
+    context = current_span.get()
+    if context is None:
+        return {}
+    return {TRACE_KWARG: {"traceparent": context.traceparent(), "sent_at": time.time()}}
+
+
+class TraceMiddleware:
+    """Continue the trace a client started, from its ``traceparent`` header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        context = None
+        if scope["type"] in {"http", "websocket"}:
+            for name, value in scope["headers"]:
+                if name == TRACEPARENT_HEADER.encode():
+                    context = SpanContext.from_traceparent(value.decode("latin-1"))
+                    break
+
+        token = current_span.set(context)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_span.reset(token)
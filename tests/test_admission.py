@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, List
+
+import grpc
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from raycraft import AdmissionConfig, App, RayCraftAPI
+from raycraft.admission import admit
+from raycraft.grpc_ingress import build_grpc_method
+
+
+def test_calls_beyond_the_queue_are_rejected():
+    svc = RayCraftAPI()
+
+    @svc.get("/", admission=AdmissionConfig(max_concurrency=1, max_queue_length=0))
+    async def slow(app: App) -> None:
+        await asyncio.sleep(0.5)
+
+    with TestClient(svc.local()) as client:
+        first = threading.Thread(target=client.get, args=("/",))
+        first.start()
+        time.sleep(0.1)
+        response = client.get("/")
+        first.join()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_calls_past_the_timeout_are_cancelled():
+    cancelled: List[bool] = []
+    svc = RayCraftAPI()
+
+    @svc.get("/", admission=AdmissionConfig(timeout_s=0.1))
+    async def slow(app: App) -> None:
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with TestClient(svc.local()) as client:
+        response = client.get("/")
+
+    assert response.status_code == 504
+    assert cancelled == [True]
+
+
+def test_client_deadlines_apply_to_every_route():
+    svc = RayCraftAPI()
+
+    @svc.get("/")
+    async def slow(app: App) -> None:
+        await asyncio.sleep(1.0)
+
+    with TestClient(svc.local()) as client:
+        start = time.perf_counter()
+        response = client.get(
+            "/", headers={"X-Request-Deadline": str(time.time() + 0.1)}
+        )
+        elapsed_s = time.perf_counter() - start
+        expired = client.get("/", headers={"X-Request-Deadline": str(time.time() - 1)})
+
+    assert response.status_code == 504
+    assert elapsed_s < 0.5
+    assert expired.status_code == 504
+
+
+def test_streams_hold_their_slot_until_they_end():
+    svc = RayCraftAPI()
+
+    @svc.get("/", admission=AdmissionConfig(max_concurrency=1, max_queue_length=0))
+    async def stream(app: App) -> AsyncIterator[str]:
+        for chunk in "abc":
+            await asyncio.sleep(0.2)
+            yield chunk
+
+    with TestClient(svc.local()) as client:
+        responses = []
+        first = threading.Thread(target=lambda: responses.append(client.get("/")))
+        first.start()
+        time.sleep(0.3)
+        rejected = client.get("/")
+        first.join()
+        after = client.get("/")
+
+    assert responses[0].text == "abc"
+    assert rejected.status_code == 503
+    assert after.text == "abc"
+
+
+def test_streams_are_cut_off_at_the_deadline():
+    chunks: List[str] = []
+    svc = RayCraftAPI()
+
+    @svc.get("/", admission=AdmissionConfig(max_concurrency=1, timeout_s=0.3))
+    async def stream(app: App) -> AsyncIterator[str]:
+        for chunk in "abc":
+            await asyncio.sleep(0.2)
+            chunks.append(chunk)
+            yield chunk
+
+    with TestClient(svc.local(), raise_server_exceptions=False) as client:
+        first = client.get("/")
+        # the slot was released, the next stream is not rejected
+        second = client.get("/")
+
+    assert first.status_code == second.status_code == 200
+    # the third chunk would have been late
+    assert chunks == ["a", "a"]
+
+
+class Text(BaseModel):
+    text: str
+
+
+class Context:
+    def set_code(self, code: Any) -> None:
+        self.code = code
+
+    def set_details(self, details: str) -> None:
+        self.details = details
+
+
+def test_grpc_calls_get_grpc_status_codes():
+    async def slow(text: Text) -> Text:
+        await asyncio.sleep(1.0)
+        return text
+
+    handler = admit(slow, AdmissionConfig(timeout_s=0.1))
+    method = build_grpc_method(handler, "AdmissionTest", "text", Text, Text)
+    request = b"\n\x02hi"
+
+    context = Context()
+    asyncio.run(method(request, grpc_context=context))
+    assert context.code == grpc.StatusCode.DEADLINE_EXCEEDED
+    # without a context, the code is in the error
+    with pytest.raises(RuntimeError, match="^DEADLINE_EXCEEDED: "):
+        asyncio.run(method(request))
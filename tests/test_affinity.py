@@ -0,0 +1,83 @@
+from typing import Any, Dict
+
+import httpx
+import pytest
+from ray import serve
+
+from raycraft import App, RayCraftAPI
+from raycraft.api import build_remote_method
+
+
+def test_slots_per_replica_are_bounded(monkeypatch):
+    limits = []
+
+    def multiplexed(max_num_models_per_replica: int) -> Any:
+        limits.append(max_num_models_per_replica)
+        return lambda func: func
+
+    monkeypatch.setattr(serve, "multiplexed", multiplexed)
+    svc = RayCraftAPI()
+
+    @svc.remote(num_replicas=2)
+    def default(app: App) -> None:
+        ...
+
+    @svc.remote(num_replicas=2, max_affinity_slots_per_replica=8)
+    def configured(app: App) -> None:
+        ...
+
+    methods: Dict[str, Dict[str, Any]] = svc._remote_methods
+    for method_dict in methods.values():
+        build_remote_method(method_dict, False, deployed=True, affinity=True)
+
+    assert limits == [64, 8]
+
+
+def test_slots_per_replica_must_be_positive():
+    svc = RayCraftAPI()
+
+    with pytest.raises(ValueError):
+        svc.remote(max_affinity_slots_per_replica=0)
+
+
+def test_affinity_keys_need_deployed_remote_methods():
+    svc = RayCraftAPI()
+
+    @svc.remote
+    def local(app: App, user: str) -> str:
+        return user
+
+    @svc.get("/", affinity_key=lambda user: user)
+    async def route(app: App, user: str) -> str:
+        return await app.local(user)  # type: ignore [no-any-return]
+
+    with pytest.raises(ValueError, match="affinity key"):
+        svc()
+
+
+def test_calls_with_a_key_stick_to_one_replica(ray_cluster):
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.remote(num_replicas=3, ray_actor_options={"num_cpus": 0})
+    def replica(app: App) -> str:
+        return serve.get_replica_context().replica_tag  # type: ignore [no-any-return]
+
+    @svc.get("/", affinity_key=lambda user: user)
+    async def route(app: App, user: str) -> str:
+        return await app.replica()  # type: ignore [no-any-return]
+
+    serve.run(svc(), name="test-affinity", route_prefix="/test-affinity")
+    try:
+        replicas = {
+            user: {
+                httpx.get(
+                    "http://127.0.0.1:8000/test-affinity/", params={"user": user}
+                ).json()
+                for _ in range(10)
+            }
+            for user in ("ann", "bob", "cid")
+        }
+    finally:
+        serve.delete("test-affinity")
+
+    assert all(len(tags) == 1 for tags in replicas.values()), replicas
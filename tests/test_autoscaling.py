@@ -0,0 +1,145 @@
+import json
+import textwrap
+from datetime import datetime, time, timedelta
+
+import pytest
+import ray
+from click.testing import CliRunner
+
+from raycraft import AutoscalingPolicy, RayCraftAPI, Schedule
+from raycraft.autoscaling import load_trace, LoadSignals, SignalCollector, simulate
+from raycraft.cli import cli
+
+# a Monday
+MONDAY = datetime(2024, 1, 1, 12, 0)
+
+
+def test_schedules_apply_on_their_days_and_hours():
+    office_hours = Schedule(time(9), time(17), min_replicas=4, weekdays=(0, 1, 2, 3, 4))
+    night = Schedule(time(22), time(6), min_replicas=2)
+
+    assert office_hours.applies(MONDAY)
+    assert not office_hours.applies(MONDAY.replace(hour=17))
+    assert not office_hours.applies(MONDAY + timedelta(days=5))
+    # windows ending before they start wrap around midnight
+    assert night.applies(MONDAY.replace(hour=23))
+    assert night.applies(MONDAY.replace(hour=5))
+    assert not night.applies(MONDAY)
+
+
+def test_the_largest_proposal_wins_within_the_bounds():
+    policy = AutoscalingPolicy(
+        min_replicas=1,
+        max_replicas=10,
+        target_ongoing_requests=2.0,
+        target_queue_depth=4.0,
+        target_p95_latency_s=0.5,
+    )
+
+    # 6 ongoing requests call for 3 replicas, the deepest queue for 5
+    signals = LoadSignals(ongoing_requests=6, queue_depth={"/a": 20, "/b": 1})
+    assert policy.desired_replicas(2, signals, MONDAY) == 5
+    # twice the target latency doubles the current replicas
+    assert policy.desired_replicas(4, LoadSignals(p95_latency_s=1.0), MONDAY) == 8
+    assert policy.desired_replicas(2, LoadSignals(ongoing_requests=100), MONDAY) == 10
+    assert policy.desired_replicas(2, LoadSignals(), MONDAY) == 1
+
+
+def test_schedules_raise_the_minimum():
+    policy = AutoscalingPolicy(
+        min_replicas=1,
+        max_replicas=10,
+        schedules=(Schedule(time(9), time(17), min_replicas=4),),
+    )
+
+    assert policy.desired_replicas(1, LoadSignals(), MONDAY) == 4
+    assert policy.desired_replicas(1, LoadSignals(), MONDAY.replace(hour=20)) == 1
+
+
+def test_simulation_waits_for_the_delays():
+    policy = AutoscalingPolicy(
+        max_replicas=4, upscale_delay_s=30, downscale_delay_s=120, interval_s=10
+    )
+    busy, idle = LoadSignals(ongoing_requests=8), LoadSignals()
+    trace = [(MONDAY + timedelta(seconds=10 * i), busy) for i in range(5)] + [
+        (MONDAY + timedelta(seconds=50 + 10 * i), idle) for i in range(14)
+    ]
+
+    replicas = [count for _, count in simulate(policy, trace)]
+
+    # scaled up once the load held for 30s, down once it was gone for 120s
+    assert replicas[:5] == [1, 1, 1, 4, 4]
+    assert replicas[5:] == [4] * 12 + [1, 1]
+
+
+def test_simulation_reads_load_traces(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    lines = [
+        {"time": "2024-01-01T12:00:00", "ongoing_requests": 2},
+        {"time": "2024-01-01T12:00:10", "ongoing_requests": 6, "p95_latency_s": 0.2},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n\n")
+
+    trace = load_trace(str(path))
+
+    assert trace == [
+        (MONDAY, LoadSignals(ongoing_requests=2)),
+        (
+            MONDAY + timedelta(seconds=10),
+            LoadSignals(ongoing_requests=6, p95_latency_s=0.2),
+        ),
+    ]
+    policy = AutoscalingPolicy(max_replicas=4, upscale_delay_s=0)
+    assert [count for _, count in simulate(policy, trace)] == [1, 3]
+
+
+def test_policies_need_metrics_and_replace_serve_autoscaling():
+    with pytest.raises(ValueError, match="metrics"):
+        RayCraftAPI(autoscaling_policy=AutoscalingPolicy(), metrics=None)
+    with pytest.raises(ValueError, match="num_replicas"):
+        RayCraftAPI(autoscaling_policy=AutoscalingPolicy(), num_replicas=2)
+
+
+def test_collector_aggregates_the_reports_of_replicas(ray_cluster):
+    collector = SignalCollector.remote()  # type: ignore [attr-defined]
+    for replica_id, depth, fill, p95 in (("a", 3, 0.5, 0.1), ("b", 1, None, 0.3)):
+        report = {
+            "ongoing_requests": depth,
+            "queue_depth": {"/predict": depth},
+            "batch_fill_ratio": fill,
+            "p95_latency_s": p95,
+        }
+        ray.get(collector.report.remote(replica_id, report))
+
+    assert ray.get(collector.collect.remote(max_age_s=60)) == (
+        2,
+        LoadSignals(
+            ongoing_requests=4,
+            queue_depth={"/predict": 4},
+            batch_fill_ratio=0.5,
+            p95_latency_s=0.3,
+        ),
+    )
+    # replicas that stopped reporting are forgotten
+    assert ray.get(collector.collect.remote(max_age_s=-1)) == (0, LoadSignals())
+
+
+def test_non_blocking_runs_refuse_an_autoscaling_policy(tmp_path):
+    (tmp_path / "scaled_app.py").write_text(
+        textwrap.dedent(
+            """
+            from raycraft import AutoscalingPolicy, RayCraftAPI
+
+            service = RayCraftAPI(autoscaling_policy=AutoscalingPolicy())
+            """
+        )
+    )
+
+    result = CliRunner().invoke(
+        cli,
+        ["run", "scaled_app:service", "--app-dir", str(tmp_path), "--non-blocking"],
+    )
+
+    # nothing would apply the policy once the command returns
+    assert result.exit_code != 0
+    assert "autoscaling policy" in result.output
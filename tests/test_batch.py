@@ -0,0 +1,50 @@
+import importlib.util
+from typing import Any, Iterator, List, TextIO
+
+import pytest
+
+from raycraft import RayCraftAPI
+from raycraft.batch import require_ray_data, write_records
+
+
+class Batch:
+    """The part of a pandas DataFrame that CSV output uses."""
+
+    def __init__(self, rows: List[str]) -> None:
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def to_csv(self, output_file: TextIO, header: bool, index: bool) -> None:
+        output_file.write("".join((["text\n"] if header else []) + self._rows))
+
+
+class Dataset:
+    def __init__(self, *batches: Batch) -> None:
+        self._batches = batches
+
+    def iter_batches(self, batch_format: str) -> Iterator[Any]:
+        return iter(self._batches)
+
+
+def test_missing_data_dependencies_are_named(monkeypatch):
+    # only pyarrow is missing
+    monkeypatch.setattr(
+        importlib.util, "find_spec", lambda name: None if name == "pyarrow" else name
+    )
+
+    with pytest.raises(ImportError, match=r"needs pyarrow\..*raycraft\[data\]"):
+        require_ray_data()
+
+    svc = RayCraftAPI()
+    with pytest.raises(ImportError):
+        svc.map_batches("texts.jsonl", "translate")
+
+
+def test_csv_files_have_one_header(tmp_path):
+    path = tmp_path / "out.csv"
+    dataset = Dataset(Batch([]), Batch(["a\n", "b\n"]), Batch(["c\n"]))
+
+    assert list(write_records(dataset, str(path))) == [0, 2, 3]
+    assert path.read_text() == "text\na\nb\nc\n"
@@ -0,0 +1,47 @@
+import asyncio
+from typing import List
+
+from fastapi.testclient import TestClient
+
+from raycraft import App, RayCraftAPI
+
+
+def test_concurrent_calls_are_batched_in_order():
+    batch_sizes: List[int] = []
+    svc = RayCraftAPI()
+
+    @svc.remote(batch_max_size=4, batch_wait_timeout_s=0.5)
+    def square(app: App, xs: List[int]) -> List[int]:
+        batch_sizes.append(len(xs))
+        return [x * x for x in xs]
+
+    @svc.get("/squares")
+    async def squares(app: App, n: int) -> List[int]:
+        return await asyncio.gather(*(app.square(x) for x in range(n)))  # type: ignore
+
+    with TestClient(svc.local()) as client:
+        response = client.get("/squares", params={"n": 10})
+
+    assert response.json() == [x * x for x in range(10)]
+    assert batch_sizes == [4, 4, 2]
+
+
+def test_batch_waits_at_most_the_timeout():
+    batch_sizes: List[int] = []
+    svc = RayCraftAPI()
+
+    @svc.remote(batch_max_size=8, batch_wait_timeout_s=0.01)
+    async def double(app: App, xs: List[int]) -> List[int]:
+        batch_sizes.append(len(xs))
+        return [2 * x for x in xs]
+
+    @svc.get("/double")
+    async def route(app: App, x: int) -> int:
+        return await app.double(x)  # type: ignore [no-any-return]
+
+    with TestClient(svc.local()) as client:
+        results = [client.get("/double", params={"x": x}).json() for x in range(3)]
+
+    assert results == [0, 2, 4]
+    # sequential calls are not held back to fill a batch
+    assert batch_sizes == [1, 1, 1]
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import socket
+import textwrap
+import threading
+import time
+from typing import Iterator, List
+
+import pytest
+import uvicorn
+from click.testing import CliRunner
+from fastapi import HTTPException, WebSocket
+
+from raycraft import App, RayCraftAPI
+from raycraft.bench import (
+    BenchResult,
+    format_result,
+    generate_load,
+    generate_websocket_load,
+    percentile,
+    run_load,
+)
+from raycraft.cli import BENCH_APP_NAME, BENCH_ROUTE_PREFIX, cli
+
+
+def build_app() -> RayCraftAPI:
+    svc = RayCraftAPI()
+
+    @svc.get("/ok")
+    async def ok(app: App) -> str:
+        return "ok"
+
+    @svc.get("/fail")
+    async def fail(app: App) -> str:
+        # answered without an unhandled error, which may drop the connection
+        raise HTTPException(status_code=500, detail="Failed.")
+
+    @svc.websocket("/echo")
+    async def echo(app: App, websocket: WebSocket) -> None:
+        await websocket.accept()
+        while True:
+            await websocket.send_text(await websocket.receive_text())
+
+    return svc
+
+
+@pytest.fixture(scope="module")
+def base_url() -> Iterator[str]:
+    """The app served by uvicorn from a background thread."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(build_app().local(), port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(10)
+
+
+def test_percentiles_are_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3.0], 0.99) == 3
+    assert percentile([], 0.5) is None
+
+
+def test_load_is_spread_over_the_workers():
+    in_flight: List[int] = [0, 0]
+
+    async def send() -> str:
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return "200"
+
+    result = asyncio.run(run_load(send, lambda status: status != "200", 4, None, 0.5))
+
+    assert in_flight[1] == 4
+    assert result.errors == 0
+    assert result.requests == result.status_codes["200"]
+    assert result.throughput == pytest.approx(result.requests / result.duration_s)
+
+
+def test_a_rate_schedules_requests_at_fixed_intervals():
+    async def send() -> str:
+        return "200"
+
+    result = asyncio.run(
+        run_load(send, lambda status: status != "200", 4, rate=50, duration_s=1.0)
+    )
+
+    assert 45 <= result.requests <= 55
+
+
+def test_results_are_formatted_for_the_terminal():
+    result = BenchResult(
+        requests=100,
+        errors=1,
+        duration_s=10.0,
+        throughput=10.0,
+        error_rate=0.01,
+        p50_latency_s=0.01,
+        p95_latency_s=0.02,
+        p99_latency_s=0.05,
+        max_latency_s=None,
+        status_codes={"200": 99, "500": 1},
+        replicas={"app.Service": 2},
+    )
+
+    assert format_result(result).splitlines() == [
+        "requests:   100 in 10.0s",
+        "throughput: 10.0 req/s",
+        "errors:     1 (1.00%)",
+        "latency:    p50 10.0ms  p95 20.0ms  p99 50.0ms  max -",
+        "status:     200=99  500=1",
+        "replicas:   app.Service=2",
+    ]
+
+
+def test_http_load_counts_errors(base_url):
+    ok = asyncio.run(generate_load(f"{base_url}/ok", concurrency=2, duration_s=0.5))
+    failed = asyncio.run(
+        generate_load(f"{base_url}/fail", concurrency=2, duration_s=0.5)
+    )
+
+    assert ok.requests > 0 and ok.errors == 0
+    assert ok.p50_latency_s is not None
+    assert failed.error_rate == 1.0
+    assert set(failed.status_codes) == {"500"}, failed.status_codes
+
+
+def test_websocket_load_sends_messages_over_sessions(base_url):
+    url = base_url.replace("http", "ws") + "/echo"
+    result = asyncio.run(
+        generate_websocket_load(url, "hello", concurrency=2, duration_s=0.5)
+    )
+
+    assert result.requests > 0 and result.errors == 0
+    assert set(result.status_codes) == {"OK"}
+
+
+def test_bench_command_targets_a_running_app(base_url, tmp_path):
+    output = tmp_path / "results.json"
+
+    result = CliRunner().invoke(
+        cli,
+        ["bench", "--url", base_url, "--route", "/ok"]
+        + ["--duration", "0.5", "--output", str(output)],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert report["target"] == f"{base_url}/ok"
+    assert report["method"] == "GET"
+    assert report["result"]["requests"] > 0
+
+
+def test_bench_command_deploys_the_app_under_its_own_prefix(
+    ray_cluster, tmp_path, monkeypatch
+):
+    import ray
+    from ray import serve
+
+    (tmp_path / "bench_app.py").write_text(
+        textwrap.dedent(
+            """
+            from raycraft import App, RayCraftAPI
+
+            service = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+            @service.post("/")
+            async def root(app: App) -> str:
+                return "root"
+            """
+        )
+    )
+    output = tmp_path / "results.json"
+    # the tests are already connected to Ray
+    monkeypatch.setattr(ray, "init", lambda *args, **kwargs: None)
+
+    result = CliRunner().invoke(
+        cli,
+        ["bench", "bench_app:service", "--app-dir", str(tmp_path)]
+        + ["--duration", "0.5", "--output", str(output)],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert report["target"] == f"http://127.0.0.1:8000{BENCH_ROUTE_PREFIX}/"
+    assert report["method"] == "POST"
+    assert report["result"]["errors"] == 0
+    # the benchmarked app is removed again
+    assert BENCH_APP_NAME not in serve.status().applications
@@ -0,0 +1,126 @@
+import io
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import pytest
+from fastapi.testclient import TestClient
+
+from raycraft import App, ArrayBody, ArrayResponse, RayCraftAPI
+from raycraft.binary import decode_array, encode_array, NPY_MEDIA_TYPE
+
+
+def make_client() -> TestClient:
+    svc = RayCraftAPI()
+
+    @svc.remote
+    async def double(app: App, array: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        return array * 2
+
+    @svc.post("/double", response_class=ArrayResponse)
+    async def route(app: App, array: npt.NDArray[Any] = ArrayBody()) -> ArrayResponse:
+        return ArrayResponse(await app.double(array))
+
+    @svc.post("/writeable")
+    async def writeable(app: App, array: npt.NDArray[Any] = ArrayBody()) -> bool:
+        return bool(array.flags.writeable)
+
+    return TestClient(svc.local())
+
+
+def test_raw_array_round_trip():
+    array = np.arange(12, dtype="float32").reshape(3, 4)
+    body, headers = encode_array(array)
+
+    with make_client() as client:
+        response = client.post("/double", content=body, headers=headers)
+
+    assert response.headers["content-type"] == "application/x-numpy"
+    result = decode_array(response.content, response.headers)
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(result, array * 2)
+
+
+def test_npy_round_trip_keeps_fortran_order():
+    array = np.asfortranarray(np.arange(6, dtype="int64").reshape(2, 3))
+    stream = io.BytesIO()
+    np.save(stream, array)
+
+    with make_client() as client:
+        response = client.post(
+            "/double",
+            content=stream.getvalue(),
+            headers={"content-type": NPY_MEDIA_TYPE},
+        )
+
+    np.testing.assert_array_equal(
+        decode_array(response.content, response.headers), array * 2
+    )
+
+
+def test_bytes_are_read_as_uint8_without_a_copy():
+    with make_client() as client:
+        headers = {"content-type": "application/octet-stream"}
+        doubled = client.post("/double", content=b"\x01\x02\x03", headers=headers)
+        writeable = client.post("/writeable", content=b"\x01", headers=headers)
+
+    assert doubled.content == b"\x02\x04\x06"
+    assert doubled.headers["x-array-dtype"] == "|u1"
+    # the array is a view of the request body
+    assert writeable.json() is False
+
+
+def test_unsupported_media_type():
+    with make_client() as client:
+        response = client.post(
+            "/double", content=b"[1, 2]", headers={"content-type": "application/json"}
+        )
+
+    assert response.status_code == 415
+
+
+# version 3.0 headers are UTF-8, so field names are not limited to latin-1
+@pytest.mark.parametrize(
+    "version, field", [((1, 0), "n"), ((2, 0), "n"), ((3, 0), "数")]
+)
+def test_npy_format_versions(version, field):
+    array = np.array([(1, 2.0), (3, 4.0)], dtype=[(field, "<i4"), ("x", "<f8")])
+    stream = io.BytesIO()
+    np.lib.format.write_array(  # type: ignore [no-untyped-call]
+        stream, array, version=version
+    )
+
+    decoded = decode_array(stream.getvalue(), {"content-type": NPY_MEDIA_TYPE})
+
+    assert np.dtype(decoded.dtype) == np.dtype(array.dtype)
+    np.testing.assert_array_equal(decoded, array)
+
+
+def test_unknown_npy_format_version():
+    stream = io.BytesIO()
+    np.save(stream, np.arange(3))
+    body = stream.getvalue().replace(b"NUMPY\x01", b"NUMPY\x09", 1)
+
+    with pytest.raises(ValueError, match="version"):
+        decode_array(body, {"content-type": NPY_MEDIA_TYPE})
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"x-array-dtype": "<f4", "x-array-shape": "3,4"},
+        {"x-array-dtype": "not a dtype"},
+        {"content-type": NPY_MEDIA_TYPE},
+    ],
+)
+def test_bodies_not_matching_their_description(headers):
+    body, _ = encode_array(np.arange(6, dtype="float32"))
+
+    with make_client() as client:
+        response = client.post(
+            "/double",
+            content=body,
+            headers={"content-type": "application/x-numpy", **headers},
+        )
+
+    assert response.status_code == 422
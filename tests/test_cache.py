@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from raycraft import App, CacheConfig, RayCraftAPI
+from raycraft.cache import cached, CacheInfo
+
+
+def cache_info(func: Callable[..., Any]) -> CacheInfo:
+    return func.cache_info()  # type: ignore [attr-defined, no-any-return]
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_concurrent_calls_for_a_key_run_once():
+    calls: List[int] = []
+    release = threading.Event()
+
+    def square(app: App, x: int) -> int:
+        calls.append(x)
+        release.wait(5)
+        return x * x
+
+    cached_square = cached(square, CacheConfig())
+    with ThreadPoolExecutor(8) as executor:
+        results = [executor.submit(cached_square, None, 3) for _ in range(8)]
+        # the other callers wait on the first call instead of making their own
+        wait_for(lambda: cache_info(cached_square).hits == 7)
+        release.set()
+
+    assert [result.result() for result in results] == [9] * 8
+    assert calls == [3]
+    assert cache_info(cached_square) == CacheInfo(7, 1, 0, 1)
+
+
+def test_concurrent_awaits_for_a_key_run_once():
+    calls: List[int] = []
+
+    async def square(app: App, x: int) -> int:
+        calls.append(x)
+        await asyncio.sleep(0.1)
+        return x * x
+
+    cached_square = cached(square, CacheConfig())
+
+    async def main() -> List[int]:
+        return list(await asyncio.gather(*(cached_square(None, 3) for _ in range(8))))
+
+    assert asyncio.run(main()) == [9] * 8
+    assert calls == [3]
+
+
+def test_failures_are_not_cached():
+    calls: List[int] = []
+
+    async def flaky(app: App, x: int) -> int:
+        calls.append(x)
+        await asyncio.sleep(0.1)
+        if len(calls) == 1:
+            raise ConnectionError("Model server is down.")
+        return x
+
+    cached_flaky = cached(flaky, CacheConfig())
+
+    async def main() -> List[object]:
+        results = await asyncio.gather(
+            *(cached_flaky(None, 1) for _ in range(3)), return_exceptions=True
+        )
+        return list(results)
+
+    # the callers waiting on the failed call get its error
+    assert [type(result) for result in asyncio.run(main())] == [ConnectionError] * 3
+    assert asyncio.run(cached_flaky(None, 1)) == 1
+    assert calls == [1, 1]
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        "raycraft.cache.time", types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+    calls: List[int] = []
+
+    def double(app: App, x: int) -> int:
+        calls.append(x)
+        return 2 * x
+
+    cached_double = cached(double, CacheConfig(ttl_s=10))
+    cached_double(None, 1)
+    now[0] = 9.0
+    cached_double(None, 1)
+    assert calls == [1]
+
+    now[0] = 11.0
+    cached_double(None, 1)
+    assert calls == [1, 1]
+    assert cache_info(cached_double) == CacheInfo(1, 2, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    svc = RayCraftAPI()
+    calls: List[str] = []
+
+    def lowercase(name: str) -> str:
+        return name.lower()
+
+    @svc.get("/greet", cache=CacheConfig(max_entries=2, key=lowercase))
+    async def greet(app: App, name: str) -> str:
+        calls.append(name)
+        return f"Hello {name}!"
+
+    with TestClient(svc.local()) as client:
+        for name in ("Ann", "ANN", "Bob", "Ann", "Cid", "Bob"):
+            client.get("/greet", params={"name": name})
+
+    # Bob was the least recently used when Cid came in
+    assert calls == ["Ann", "Bob", "Cid", "Bob"]
+
+
+def test_generators_cannot_be_cached():
+    def words(app: App, text: str) -> Iterator[str]:
+        yield from text.split()
+
+    with pytest.raises(TypeError):
+        cached(words, CacheConfig())
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from raycraft import App, RayCraftAPI
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_sync_remote_methods_run_off_the_event_loop():
+    threads: Dict[str, int] = {}
+    svc = RayCraftAPI()
+
+    @svc.remote
+    def work(app: App) -> bool:
+        threads["work"] = threading.get_ident()
+        return on_event_loop()
+
+    @svc.get("/")
+    async def route(app: App) -> bool:
+        threads["route"] = threading.get_ident()
+        return await app.work()  # type: ignore [no-any-return]
+
+    with TestClient(svc.local()) as client:
+        assert client.get("/").json() is False
+
+    assert threads["work"] != threads["route"]
+
+
+def test_sync_routes_call_remote_methods_with_result():
+    svc = RayCraftAPI()
+
+    @svc.remote
+    def double(app: App, x: int) -> int:
+        return 2 * x
+
+    @svc.get("/sync")
+    def sync_route(app: App, x: int) -> Dict[str, Any]:
+        return {"result": app.double(x).result(), "on_loop": on_event_loop()}
+
+    @svc.get("/blocking")
+    async def blocking_route(app: App) -> int:
+        return app.double(1).result()  # type: ignore [no-any-return]
+
+    with TestClient(svc.local(), raise_server_exceptions=False) as client:
+        assert client.get("/sync", params={"x": 2}).json() == {
+            "result": 4,
+            "on_loop": False,
+        }
+        # result() on the event loop would stall every other request
+        assert client.get("/blocking").status_code == 500
+
+
+def test_sync_generators_are_iterated_off_the_event_loop():
+    svc = RayCraftAPI()
+
+    @svc.remote
+    def count(app: App, n: int) -> Iterator[int]:
+        for i in range(n):
+            yield on_event_loop() or i
+
+    @svc.get("/")
+    async def route(app: App, n: int) -> List[int]:
+        return [i async for i in app.count(n)]
+
+    with TestClient(svc.local()) as client:
+        assert client.get("/", params={"n": 3}).json() == [0, 1, 2]
+
+
+def test_thread_pool_is_capped():
+    running: List[int] = []
+    peak: List[int] = [0]
+    lock = threading.Lock()
+    svc = RayCraftAPI(max_threads=2)
+
+    @svc.remote
+    def slow(app: App) -> None:
+        with lock:
+            running.append(1)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.1)
+        with lock:
+            running.pop()
+
+    @svc.get("/")
+    async def route(app: App) -> None:
+        await asyncio.gather(*(app.slow() for _ in range(6)))
+
+    with TestClient(svc.local()) as client:
+        start = time.perf_counter()
+        assert client.get("/").status_code == 200
+        elapsed_s = time.perf_counter() - start
+
+    assert peak[0] == 2
+    assert elapsed_s == pytest.approx(0.3, abs=0.2)
+
+
+def test_slow_sync_route_does_not_stall_async_routes():
+    svc = RayCraftAPI()
+
+    @svc.get("/slow")
+    def slow(app: App) -> None:
+        time.sleep(1.0)
+
+    @svc.get("/fast")
+    async def fast(app: App) -> None:
+        return None
+
+    with TestClient(svc.local()) as client:
+        slow_call = threading.Thread(target=client.get, args=("/slow",))
+        slow_call.start()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        client.get("/fast")
+        fast_s = time.perf_counter() - start
+        slow_call.join()
+
+    assert fast_s < 0.5
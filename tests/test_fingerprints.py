@@ -0,0 +1,234 @@
+import importlib.util
+import itertools
+import sys
+import textwrap
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from raycraft.reload import stable_repr
+
+APP_SOURCE = """
+from pydantic import BaseModel
+
+from raycraft import App, ProfilingConfig, RayCraftAPI, TracingConfig
+
+
+class Item(BaseModel):
+    name: str
+    {field}
+
+
+svc = RayCraftAPI({options})
+
+
+@svc.post("/items", affinity_key=lambda item: {key})
+async def create(app: App, item: Item) -> Item:
+    return {body}
+"""
+
+BASELINE = {
+    "field": "",
+    "options": "",
+    "key": "item.name",
+    "body": "item",
+}
+
+_versions = itertools.count()
+
+
+def fingerprints(tmp_path: Path, **edits: str) -> Dict[str, str]:
+    """Load the app as it would be after editing its module."""
+    path = tmp_path / str(next(_versions)) / "edited_app.py"
+    path.parent.mkdir()
+    path.write_text(textwrap.dedent(APP_SOURCE).format(**{**BASELINE, **edits}))
+
+    spec = importlib.util.spec_from_file_location("edited_app", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.svc.fingerprints()  # type: ignore [no-any-return]
+
+
+def test_unchanged_app_has_the_same_fingerprints(tmp_path):
+    assert fingerprints(tmp_path) == fingerprints(tmp_path)
+
+
+def test_body_edits_only_change_the_code(tmp_path):
+    before = fingerprints(tmp_path)
+    after = fingerprints(tmp_path, body="Item(name=item.name.upper())")
+
+    assert after["spec"] == before["spec"]
+    assert after["code"] != before["code"]
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        {"field": "size: int = 0"},
+        {"field": "name_2: str = ''"},
+        {"key": "item.name.lower()"},
+        {"options": "tracing=TracingConfig()"},
+        {"options": "tracing=TracingConfig(sample_rate=0.5)"},
+        {"options": "profiling=ProfilingConfig()"},
+        {"options": "profiling=ProfilingConfig(sample_interval_s=0.1)"},
+    ],
+)
+def test_spec_changes(tmp_path, edit):
+    assert fingerprints(tmp_path, **edit)["spec"] != fingerprints(tmp_path)["spec"]
+
+
+def test_tracing_config_changes(tmp_path):
+    default = fingerprints(tmp_path, options="tracing=TracingConfig()")
+    sampled = fingerprints(tmp_path, options="tracing=TracingConfig(sample_rate=0.5)")
+
+    assert default["spec"] != sampled["spec"]
+    assert default == fingerprints(tmp_path, options="tracing=TracingConfig()")
+
+
+REMOTE_SOURCE = """
+from raycraft import App, RayCraftAPI
+
+svc = RayCraftAPI()
+
+
+def normalize(text: str) -> str:
+    return {normalize}
+
+
+@svc.remote(num_replicas=2)
+def translate(app: App, text: str) -> str:
+    return normalize(text)
+
+
+@svc.post("/")
+async def route(app: App, text: str) -> str:
+    return {route}
+"""
+
+
+def remote_version(tmp_path: Path, normalize: str = "text", route: str = "text") -> str:
+    path = tmp_path / str(next(_versions)) / "remote_app.py"
+    path.parent.mkdir()
+    path.write_text(REMOTE_SOURCE.format(normalize=normalize, route=route))
+
+    spec = importlib.util.spec_from_file_location("remote_app", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    svc = module.svc
+    return svc._remote_deployment_version(  # type: ignore [no-any-return]
+        "translate", svc._remote_methods["translate"]
+    )
+
+
+def test_route_edits_keep_the_remote_deployment_version(tmp_path):
+    before = remote_version(tmp_path)
+
+    assert remote_version(tmp_path, route="text.upper()") == before
+    assert remote_version(tmp_path, normalize="text.strip()") != before
+
+
+GLOBALS_SOURCE = """
+from raycraft import App, RayCraftAPI
+
+svc = RayCraftAPI()
+
+GREETING = {greeting!r}
+
+
+def load_model() -> str:
+    return {model!r}
+
+
+@svc.init
+def model(app: App) -> str:
+    return load_model()
+
+
+@svc.get("/")
+async def greet(app: App) -> str:
+    return GREETING
+"""
+
+
+def globals_fingerprints(
+    tmp_path: Path, greeting: str = "hello", model: str = "small"
+) -> Dict[str, str]:
+    path = tmp_path / str(next(_versions)) / "globals_app.py"
+    path.parent.mkdir()
+    path.write_text(GLOBALS_SOURCE.format(greeting=greeting, model=model))
+
+    spec = importlib.util.spec_from_file_location("globals_app", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.svc.fingerprints()  # type: ignore [no-any-return]
+
+
+def test_module_data_edits_change_the_spec(tmp_path):
+    # replicas keep the module data they imported, so swapping code is not enough
+    assert (
+        globals_fingerprints(tmp_path, greeting="hi")["spec"]
+        != globals_fingerprints(tmp_path)["spec"]
+    )
+
+
+def test_initializer_helper_edits_change_the_spec(tmp_path):
+    assert (
+        globals_fingerprints(tmp_path, model="large")["spec"]
+        != globals_fingerprints(tmp_path)["spec"]
+    )
+
+
+SENTINEL_SOURCE = """
+from raycraft import App, RayCraftAPI
+
+svc = RayCraftAPI()
+
+MISSING = object()
+
+
+class Point:
+    __slots__ = ("x",)
+
+    def __init__(self, x: int) -> None:
+        self.x = x
+
+
+ORIGIN = Point(0)
+
+
+@svc.get("/")
+async def route(app: App) -> bool:
+    return ORIGIN is not MISSING
+"""
+
+
+def test_globals_without_state_have_fingerprints(tmp_path):
+    path = tmp_path / "sentinel_app.py"
+    path.write_text(SENTINEL_SOURCE)
+
+    fingerprints = []
+    for _ in range(2):
+        spec = importlib.util.spec_from_file_location("sentinel_app", path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        # imported as raycraft run --reload does, so classes pickle by name
+        sys.modules["sentinel_app"] = module
+        try:
+            spec.loader.exec_module(module)
+            fingerprints.append(module.svc.fingerprints())
+        finally:
+            del sys.modules["sentinel_app"]
+
+    # the same objects again after a reload
+    assert fingerprints[0] == fingerprints[1]
+
+
+def test_nesting_depth_is_bounded():
+    nested: List[Any] = []
+    nested.append(nested)
+
+    assert stable_repr(nested) == stable_repr(nested)
@@ -0,0 +1,200 @@
+import asyncio
+import socket
+import textwrap
+from typing import Any, Dict, List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from raycraft import AdmissionConfig, App, RayCraftAPI
+from raycraft.admission import Rejected
+from raycraft.grpc_ingress import (
+    APPLICATION_METADATA_KEY,
+    build_grpc_method,
+    build_message_classes,
+    collect_models,
+    grpc_io_models,
+    grpc_method_path,
+    message_to_model,
+    model_to_message,
+)
+
+
+class Point(BaseModel):
+    x: float
+    label: str = ""
+
+
+class Shape(BaseModel):
+    name: str
+    closed: bool
+    sides: int
+    data: bytes
+    origin: Optional[Point] = None
+    points: List[Point] = []
+    tags: List[str] = []
+
+
+class Area(BaseModel):
+    value: float
+
+
+def build_app() -> RayCraftAPI:
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.post("/area")
+    @svc.grpc
+    async def area(app: App, shape: Shape) -> Area:
+        return Area(value=shape.sides * sum(point.x for point in shape.points))
+
+    @svc.grpc(
+        name="Busy", admission=AdmissionConfig(max_concurrency=0, max_queue_length=0)
+    )
+    async def busy(app: App, shape: Shape) -> Area:
+        return Area(value=0)
+
+    return svc
+
+
+def test_models_survive_a_round_trip_through_protobuf():
+    message_classes = build_message_classes("Shapes", collect_models([Shape]))
+    shapes = [
+        Shape(
+            name="triangle",
+            closed=True,
+            sides=3,
+            data=b"\x00\xff",
+            origin=Point(x=0.5, label="o"),
+            points=[Point(x=1.0), Point(x=2.0, label="b")],
+            tags=["a", "b"],
+        ),
+        # unset nested messages stay None
+        Shape(name="line", closed=False, sides=1, data=b""),
+    ]
+
+    for shape in shapes:
+        message = model_to_message(shape, message_classes[Shape]())
+        parsed = message_classes[Shape].FromString(message.SerializeToString())
+        assert message_to_model(parsed, Shape) == shape
+
+
+def test_the_proto_file_describes_the_service():
+    assert build_app().grpc_proto() == textwrap.dedent(
+        """\
+        syntax = "proto3";
+
+        package raycraft;
+
+        message Shape {
+          string name = 1;
+          bool closed = 2;
+          int64 sides = 3;
+          bytes data = 4;
+          Point origin = 5;
+          repeated Point points = 6;
+          repeated string tags = 7;
+        }
+
+        message Point {
+          double x = 1;
+          string label = 2;
+        }
+
+        message Area {
+          double value = 1;
+        }
+
+        service Svc {
+          rpc Area(Shape) returns (Area);
+          rpc Busy(Shape) returns (Area);
+        }
+        """
+    )
+
+
+def test_handlers_need_models_protobuf_can_represent():
+    class Mapping(BaseModel):
+        values: Dict[str, int]
+
+    async def text(app: App, shape: Shape) -> str:
+        return shape.name
+
+    async def mapping(app: App, mapping: Mapping) -> Area:
+        return Area(value=len(mapping.values))
+
+    with pytest.raises(TypeError, match="return one"):
+        grpc_io_models(text)
+    with pytest.raises(TypeError, match="Field 'values'"):
+        grpc_io_models(mapping)
+
+
+class GrpcContext:
+    def __init__(self) -> None:
+        self.code: Any = None
+        self.details = ""
+
+    def set_code(self, code: Any) -> None:
+        self.code = code
+
+    def set_details(self, details: str) -> None:
+        self.details = details
+
+
+def test_rejected_calls_set_their_status_code():
+    import grpc
+
+    async def handler(shape: Shape) -> Area:
+        raise Rejected(503, "RESOURCE_EXHAUSTED", "Too many requests.")
+
+    grpc_method = build_grpc_method(handler, "Shapes", "shape", Shape, Area)
+    request = build_message_classes("Shapes", collect_models([Shape]))[Shape]()
+    context = GrpcContext()
+
+    asyncio.run(grpc_method(request.SerializeToString(), context))
+
+    assert context.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+    assert context.details == "Too many requests."
+
+
+def test_deployed_methods_are_served_over_grpc(ray_cluster):
+    import grpc
+    from ray import serve
+    from ray.serve.config import gRPCOptions
+
+    svc = build_app()
+    service_name = svc.grpc_service_name()
+    message_classes = build_message_classes(service_name, collect_models([Shape, Area]))
+    request = model_to_message(
+        Shape(name="square", closed=True, sides=4, data=b"", points=[Point(x=2.0)]),
+        message_classes[Shape](),
+    ).SerializeToString()
+    metadata = [(APPLICATION_METADATA_KEY, "test-grpc")]
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    # the gRPC proxy only starts with Serve
+    serve.shutdown()
+    serve.start(
+        grpc_options=gRPCOptions(
+            port=port, grpc_servicer_functions=[svc.grpc_servicer_function()]
+        )
+    )
+    try:
+        serve.run(svc(), name="test-grpc", route_prefix="/test-grpc")
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            area = channel.unary_unary(grpc_method_path(service_name, "Area"))
+            response = area(request, metadata=metadata)
+            with pytest.raises(grpc.RpcError) as excinfo:
+                channel.unary_unary(grpc_method_path(service_name, "Busy"))(
+                    request, metadata=metadata
+                )
+    finally:
+        serve.shutdown()
+
+    parsed = message_classes[Area].FromString(response)
+    assert message_to_model(parsed, Area) == Area(value=8.0)
+    assert excinfo.value.code() in {
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+        grpc.StatusCode.INTERNAL,
+    }
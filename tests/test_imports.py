@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import raycraft
+
+# as in noxfile.py, what importing raycraft and its CLI must not pull in
+HEAVY_MODULES = ["ray", "fastapi", "starlette", "watchfiles", "yaml", "aiohttp"]
+
+
+@pytest.mark.parametrize("module", ["raycraft", "raycraft.cli"])
+def test_importing_leaves_the_heavy_dependencies_out(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c"]
+        + [f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    imported = set(json.loads(result.stdout))
+    assert [name for name in HEAVY_MODULES if name in imported] == []
+    # every import is listed, the heavy ones would be too
+    assert f"| {module}" in result.stderr
+
+
+def test_the_public_api_is_imported_on_first_access():
+    assert raycraft.RayCraftAPI.__module__ == "raycraft.api"
+    assert set(raycraft.__all__) <= set(dir(raycraft))
+    with pytest.raises(AttributeError):
+        raycraft.Missing
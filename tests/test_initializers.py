@@ -0,0 +1,104 @@
+import asyncio
+import gc
+import warnings
+from typing import Any, AsyncIterator, Iterator, List
+
+import httpx
+from fastapi.testclient import TestClient
+
+from raycraft import App, RayCraftAPI
+from raycraft.replica import create_replica
+
+
+def build_app(events: List[str]) -> RayCraftAPI:
+    svc = RayCraftAPI()
+
+    @svc.init
+    def pool() -> Iterator[str]:
+        events.append("open pool")
+        yield "pool"
+        events.append("close pool")
+
+    @svc.init
+    async def session(pool: str) -> AsyncIterator[str]:
+        events.append("open session")
+        yield f"session on {pool}"
+        events.append("close session")
+
+    @svc.get("/")
+    async def route(app: App) -> str:
+        return app.session  # type: ignore [no-any-return]
+
+    return svc
+
+
+def test_teardown_runs_in_reverse_order_on_shutdown():
+    events: List[str] = []
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        with TestClient(build_app(events).local()) as client:
+            assert client.get("/").json() == "session on pool"
+        gc.collect()
+
+    assert events == ["open pool", "open session", "close session", "close pool"]
+
+
+def test_serve_awaits_the_teardown():
+    events: List[str] = []
+    _, cls_ = build_app(events)._build_local()
+
+    async def run_replica() -> Any:
+        obj = await create_replica(cls_)
+        # what Serve does when it shuts a replica down
+        await obj.__del__()
+        return obj
+
+    obj = asyncio.run(run_replica())
+    assert events[-1] == "close pool"
+
+    # the garbage collector does not run it again
+    del obj
+    gc.collect()
+    assert events.count("close pool") == 1
+
+
+def test_collected_replica_is_torn_down():
+    events: List[str] = []
+    _, cls_ = build_app(events)._build_local()
+
+    async def drop_replica() -> None:
+        await create_replica(cls_)
+        gc.collect()
+        await asyncio.sleep(0.1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        asyncio.run(drop_replica())
+
+    assert events[-2:] == ["close session", "close pool"]
+
+
+def test_deployed_replicas_await_the_constructor(ray_cluster):
+    from ray import serve
+
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.init
+    def greeting() -> str:
+        return "hello"
+
+    @svc.remote(num_replicas=1, ray_actor_options={"num_cpus": 0})
+    def shout(app: App, text: str) -> str:
+        return text.upper()
+
+    @svc.get("/")
+    async def route(app: App) -> str:
+        return await app.shout(app.greeting)  # type: ignore [no-any-return]
+
+    serve.run(svc(), name="test-initializers", route_prefix="/test-initializers")
+    try:
+        response = httpx.get("http://127.0.0.1:8000/test-initializers/")
+        assert response.json() == "HELLO"
+    finally:
+        serve.delete("test-initializers")
@@ -0,0 +1,145 @@
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from raycraft import App, EventSourceResponse, RayCraftAPI
+
+
+class Text(BaseModel):
+    text: str
+
+
+class Translation(BaseModel):
+    translation: str
+
+
+def build_app(loads: List[str]) -> RayCraftAPI:
+    """The app run by the tests, in local mode and deployed with Serve."""
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.init
+    def model() -> Dict[str, str]:
+        loads.append("model")
+        return {"hello": "bonjour", "world": "monde"}
+
+    @svc.remote
+    def translate(app: App, text: str) -> str:
+        if not text:
+            raise ValueError("Nothing to translate.")
+        return " ".join(app.model.get(word, word) for word in text.split())
+
+    # runs as its own deployment with Serve
+    @svc.remote(num_replicas=2, ray_actor_options={"num_cpus": 0})
+    async def shout(app: App, text: str) -> str:
+        return text.upper()
+
+    @svc.remote
+    def words(app: App, text: str) -> Iterator[str]:
+        yield from text.split()
+
+    @svc.get("/words/{word}")
+    async def lookup(app: App, word: str) -> str:
+        if word not in app.model:
+            raise HTTPException(status_code=404, detail=f"Unknown word {word!r}.")
+        return app.model[word]  # type: ignore [no-any-return]
+
+    @svc.post("/translate", response_model=Translation)
+    async def post_translate(app: App, body: Text, loud: bool = False) -> Translation:
+        translation = await app.translate(body.text)
+        if loud:
+            translation = await app.shout(translation)
+        return Translation(translation=translation)
+
+    @svc.post("/stream")
+    async def stream(app: App, body: Text) -> AsyncIterator[Dict[str, str]]:
+        async for word in app.words(body.text):
+            yield {"word": await app.translate(word)}
+
+    @svc.post("/events", response_class=EventSourceResponse)
+    async def events(app: App, body: Text) -> AsyncIterator[str]:
+        async for word in app.words(body.text):
+            yield word
+
+    return svc
+
+
+@pytest.fixture
+def loads() -> List[str]:
+    return []
+
+
+@pytest.fixture(scope="module", params=["local", "serve"])
+def client(request: Any) -> Iterator[httpx.Client]:
+    """The same routes, served in-process and by a Serve deployment."""
+    if request.param == "local":
+        with TestClient(build_app([]).local(), raise_server_exceptions=False) as client:
+            yield client
+        return
+
+    from ray import serve
+
+    request.getfixturevalue("ray_cluster")
+    serve.run(build_app([])(), name="test-local", route_prefix="/test-local")
+    try:
+        with httpx.Client(base_url="http://127.0.0.1:8000/test-local") as client:
+            yield client
+    finally:
+        serve.delete("test-local")
+
+
+def test_routes_and_remote_methods(client):
+    assert client.get("/words/hello").json() == "bonjour"
+    response = client.post("/translate", json={"text": "hello world"})
+    assert response.json() == {"translation": "bonjour monde"}
+    response = client.post(
+        "/translate", json={"text": "hello world"}, params={"loud": True}
+    )
+    assert response.json() == {"translation": "BONJOUR MONDE"}
+
+
+def test_initializers_run_once_on_startup(loads):
+    with TestClient(build_app(loads).local()) as client:
+        for _ in range(2):
+            client.get("/words/hello")
+    assert loads == ["model"]
+
+
+def test_streaming(client):
+    response = client.post("/stream", json={"text": "hello big world"})
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"word": "bonjour"},
+        {"word": "big"},
+        {"word": "monde"},
+    ]
+
+    response = client.post("/events", json={"text": "hello world"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "data: hello\n\ndata: world\n\n"
+
+
+def test_error_paths(client):
+    response = client.get("/words/goodbye")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Unknown word 'goodbye'."}
+    # invalid bodies are rejected before the route runs
+    assert client.post("/translate", json={"txt": "hello"}).status_code == 422
+    assert client.get("/missing").status_code == 404
+    # errors in remote methods fail the route that called them
+    assert client.post("/translate", json={"text": ""}).status_code == 500
+
+
+def test_failing_initializer_fails_startup():
+    svc = RayCraftAPI()
+
+    @svc.init
+    def model() -> None:
+        raise RuntimeError("Out of memory.")
+
+    with pytest.raises(RuntimeError, match="Out of memory."):
+        with TestClient(svc.local()):
+            pass
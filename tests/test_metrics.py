@@ -0,0 +1,126 @@
+import asyncio
+import re
+from typing import Any, AsyncIterator, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from raycraft import App, MetricsConfig, RayCraftAPI
+from raycraft.metrics import ReplicaMetrics
+
+
+class RecordingMetric:
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, float, str]] = []
+
+    def _record(self, call: str, value: float, tags: Any) -> None:
+        self.calls.append((call, value, tags.get("method", tags.get("initializer"))))
+
+    def inc(self, value: float = 1.0, tags: Any = None) -> None:
+        self._record("inc", value, tags)
+
+    def set(self, value: float, tags: Any = None) -> None:
+        self._record("set", value, tags)
+
+    def observe(self, value: float, tags: Any = None) -> None:
+        self._record("observe", value, tags)
+
+
+def test_metrics_are_rendered_in_the_prometheus_format():
+    replica_metrics = ReplicaMetrics(
+        "Deployment", MetricsConfig(latency_buckets_s=(0.1, 1.0)), export=False
+    )
+    for duration_s, failed in ((0.05, False), (0.5, False), (2.0, True)):
+        replica_metrics.start("route", "predict")
+        replica_metrics.finish("route", "predict", duration_s, failed)
+    replica_metrics.start("remote", "embed")
+    replica_metrics.record_initializer("model", 1.5)
+
+    labels = 'deployment="Deployment",kind="route",method="predict"'
+    remote_labels = 'deployment="Deployment",kind="remote",method="embed"'
+    initializer_labels = 'deployment="Deployment",initializer="model"'
+    assert replica_metrics.render().splitlines() == [
+        "# TYPE raycraft_requests_total counter",
+        f"raycraft_requests_total{{{labels}}} 3",
+        f"raycraft_requests_total{{{remote_labels}}} 1",
+        "# TYPE raycraft_errors_total counter",
+        f"raycraft_errors_total{{{labels}}} 1",
+        "# TYPE raycraft_in_flight gauge",
+        f"raycraft_in_flight{{{labels}}} 0",
+        f"raycraft_in_flight{{{remote_labels}}} 1",
+        "# TYPE raycraft_latency_seconds histogram",
+        f'raycraft_latency_seconds_bucket{{{labels},le="0.1"}} 1',
+        f'raycraft_latency_seconds_bucket{{{labels},le="1.0"}} 2',
+        f'raycraft_latency_seconds_bucket{{{labels},le="+Inf"}} 3',
+        f"raycraft_latency_seconds_sum{{{labels}}} 2.55",
+        f"raycraft_latency_seconds_count{{{labels}}} 3",
+        "# TYPE raycraft_initializer_duration_seconds gauge",
+        f"raycraft_initializer_duration_seconds{{{initializer_labels}}} 1.5",
+    ]
+
+
+def test_signals_summarize_the_load_since_the_previous_report():
+    replica_metrics = ReplicaMetrics("Deployment", MetricsConfig(), export=False)
+    for i in range(1, 21):
+        replica_metrics.start("route", "predict")
+        replica_metrics.finish("route", "predict", i / 100, False)
+    replica_metrics.start("route", "predict")
+    replica_metrics.start("remote", "embed")
+    replica_metrics.record_batch(2, 8)
+    replica_metrics.record_batch(8, 8)
+
+    assert replica_metrics.signals() == {
+        "ongoing_requests": 1.0,
+        "queue_depth": {"predict": 1.0},
+        "batch_fill_ratio": 0.625,
+        "p95_latency_s": 0.19,
+    }
+    # the windows are drained, the calls in progress are not
+    assert replica_metrics.signals() == {
+        "ongoing_requests": 1.0,
+        "queue_depth": {"predict": 1.0},
+        "batch_fill_ratio": None,
+        "p95_latency_s": None,
+    }
+
+
+def test_only_the_changes_are_recorded_in_ray(monkeypatch):
+    replica_metrics = ReplicaMetrics("Deployment", MetricsConfig(), export=False)
+    replica_metrics._export = True
+    # exported by the test alone, not by a thread racing it once Ray is up
+    monkeypatch.setattr(replica_metrics, "_start_exporting", lambda: None)
+    ray_metrics = [RecordingMetric() for _ in range(5)]
+    requests, errors, in_flight, latency, initializer_duration = ray_metrics
+
+    replica_metrics.start("route", "predict")
+    replica_metrics.finish("route", "predict", 0.5, True)
+    replica_metrics.start("route", "predict")
+    replica_metrics.record_initializer("model", 1.5)
+    replica_metrics._record_in_ray(*ray_metrics)
+    replica_metrics.finish("route", "predict", 0.25, False)
+    replica_metrics._record_in_ray(*ray_metrics)
+
+    assert requests.calls == [("inc", 2, "predict")]
+    assert errors.calls == [("inc", 1, "predict")]
+    assert in_flight.calls == [("set", 1, "predict"), ("set", 0, "predict")]
+    assert latency.calls == [("observe", 0.5, "predict"), ("observe", 0.25, "predict")]
+    assert initializer_duration.calls == [("set", 1.5, "model")]
+
+
+def test_streamed_routes_are_timed_until_their_body_is_sent():
+    svc = RayCraftAPI(metrics=MetricsConfig(route="/metrics"))
+
+    @svc.get("/words")
+    async def words(app: App) -> AsyncIterator[str]:
+        for word in ("a", "b"):
+            await asyncio.sleep(0.1)
+            yield word
+
+    with TestClient(svc.local()) as client:
+        assert client.get("/words").text == "ab"
+        rendered = client.get("/metrics").text
+
+    duration_s = re.search(
+        r'raycraft_latency_seconds_sum\{[^}]*method="words"\} (\S+)', rendered
+    )
+    assert duration_s is not None and float(duration_s.group(1)) >= 0.2
+    assert re.search(r'raycraft_in_flight\{[^}]*method="words"\} 0', rendered)
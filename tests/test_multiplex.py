@@ -0,0 +1,169 @@
+import asyncio
+from typing import AsyncIterator, Iterator, List
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from raycraft import App, RayCraftAPI
+from raycraft.multiplex import build_model_loader, LocalMultiplexer, MODEL_ID_HEADER
+
+
+def test_least_recently_used_models_are_evicted():
+    loads: List[str] = []
+
+    async def load(model_id: str) -> str:
+        loads.append(model_id)
+        return model_id.upper()
+
+    multiplexer = LocalMultiplexer(load, max_models=2)
+
+    async def main() -> List[str]:
+        return [await multiplexer.get(model_id) for model_id in "abacb"]
+
+    assert asyncio.run(main()) == ["A", "B", "A", "C", "B"]
+    # b was the least recently used when c came in
+    assert loads == ["a", "b", "c", "b"]
+
+
+def test_concurrent_requests_for_a_model_load_it_once():
+    loads: List[str] = []
+
+    async def load(model_id: str) -> str:
+        loads.append(model_id)
+        await asyncio.sleep(0.1)
+        return model_id.upper()
+
+    multiplexer = LocalMultiplexer(load, max_models=-1)
+
+    async def main() -> List[str]:
+        return list(await asyncio.gather(*(multiplexer.get("a") for _ in range(4))))
+
+    assert asyncio.run(main()) == ["A"] * 4
+    assert loads == ["a"]
+
+
+def test_the_loader_needs_a_model_id():
+    async def load(model_id: str) -> str:
+        return model_id.upper()
+
+    model = build_model_loader(load, max_models=2, local=True)
+
+    async def main() -> int:
+        assert await model("a") == "A"
+        try:
+            await model()
+        except HTTPException as error:
+            return error.status_code
+        return 200
+
+    assert asyncio.run(main()) == 400
+
+
+def test_multiplexed_initializers_cannot_have_a_teardown():
+    svc = RayCraftAPI()
+
+    with pytest.raises(ValueError, match="teardown"):
+
+        @svc.init(multiplexed=True)
+        def model(model_id: str) -> Iterator[str]:
+            yield model_id
+
+
+def test_replicas_multiplex_a_single_initializer():
+    svc = RayCraftAPI()
+
+    @svc.init(multiplexed=True)
+    def model(model_id: str) -> str:
+        return model_id
+
+    @svc.init(multiplexed=True)
+    def tokenizer(model_id: str) -> str:
+        return model_id
+
+    with pytest.raises(ValueError, match="tokenizer"):
+        svc()
+
+
+def test_deployments_multiplex_their_own_initializer():
+    svc = RayCraftAPI()
+
+    @svc.init(multiplexed=True)
+    def model(model_id: str) -> str:
+        return model_id
+
+    @svc.init(multiplexed=True)
+    def tokenizer(model_id: str) -> str:
+        return model_id
+
+    @svc.remote(num_replicas=1, initializers=["model"])
+    def generate(app: App) -> None:
+        ...
+
+    @svc.remote(num_replicas=1, initializers=["tokenizer"])
+    def tokenize(app: App) -> None:
+        ...
+
+    # each replica tracks the model ids of a single initializer
+    svc()
+
+
+def test_affinity_keys_and_multiplexed_remote_methods_conflict():
+    svc = RayCraftAPI()
+
+    @svc.init(multiplexed=True)
+    def model(model_id: str) -> str:
+        return model_id
+
+    @svc.remote(num_replicas=2, initializers=["model"])
+    async def generate(app: App, prompt: str) -> str:
+        return await app.model() + prompt  # type: ignore [no-any-return]
+
+    @svc.get("/", affinity_key=lambda user: user)
+    async def route(app: App, user: str) -> str:
+        return await app.generate(user)  # type: ignore [no-any-return]
+
+    with pytest.raises(ValueError, match="affinity key"):
+        svc()
+
+
+def build_app() -> RayCraftAPI:
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.init(multiplexed=True, max_models_per_replica=2)
+    async def model(model_id: str) -> str:
+        return model_id.upper()
+
+    @svc.get("/")
+    async def name(app: App) -> str:
+        return await app.model()  # type: ignore [no-any-return]
+
+    @svc.get("/stream")
+    async def stream(app: App) -> AsyncIterator[str]:
+        for _ in range(2):
+            await asyncio.sleep(0.01)
+            yield await app.model()
+
+    return svc
+
+
+def test_routes_load_the_model_of_the_request():
+    with TestClient(build_app().local()) as client:
+        assert client.get("/", headers={MODEL_ID_HEADER: "a"}).json() == "A"
+        assert client.get("/stream", headers={MODEL_ID_HEADER: "b"}).text == "BB"
+        assert client.get("/").status_code == 400
+
+
+def test_deployed_streaming_routes_load_the_model_of_the_request(ray_cluster):
+    from ray import serve
+
+    serve.run(build_app()(), name="test-multiplex", route_prefix="/test-multiplex")
+    try:
+        response = httpx.get(
+            "http://127.0.0.1:8000/test-multiplex/stream",
+            headers={MODEL_ID_HEADER: "b"},
+        )
+        assert response.text == "BB"
+    finally:
+        serve.delete("test-multiplex")
@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+from raycraft.profiling import (
+    collect_profiles,
+    ProfilingConfig,
+    running_threads,
+    SamplingProfiler,
+    start_profile_listener,
+)
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        pass
+
+
+def idle(stop: threading.Event) -> None:
+    stop.wait()
+
+
+@pytest.fixture
+def threads() -> Iterator[None]:
+    stop = threading.Event()
+    started = [
+        threading.Thread(target=target, args=(stop,), daemon=True)
+        for target in (spin, idle)
+    ]
+    for thread in started:
+        thread.start()
+    # let the idle thread reach its wait
+    time.sleep(0.1)
+    yield
+    stop.set()
+    for thread in started:
+        thread.join()
+
+
+def test_idle_threads_are_not_sampled(threads):
+    if running_threads() is None:
+        pytest.skip("The OS does not report the state of threads.")
+
+    stacks = SamplingProfiler(0.001).run(0.5)
+
+    assert any("spin" in stack for stack in stacks)
+    assert not any("idle" in stack for stack in stacks)
+
+
+def test_replicas_profile_on_request(ray_cluster, threads):
+    config = ProfilingConfig(sample_interval_s=0.001)
+    # the profiler is per process, like the replicas
+    start_profile_listener("app", "Test", "replica", lambda target: None, config)
+    # an app of the same name deployed under another Serve app is not profiled
+    start_profile_listener("other", "Test", "other", lambda target: None, config)
+
+    for _ in range(2):
+        start = time.perf_counter()
+        results = collect_profiles("app", "Test", 0.5, None)
+        elapsed_s = time.perf_counter() - start
+
+        assert set(results) == {"replica"}
+        collapsed, error = results["replica"]
+        assert error is None
+        assert "spin" in collapsed
+    # the replica is waiting for the request, it does not poll for it
+    assert elapsed_s < 1.0
@@ -0,0 +1,54 @@
+import sys
+import types
+
+from pydantic import BaseModel
+
+from raycraft.reload import dump_functions, load_functions
+
+MODULE_SOURCE = """
+from pydantic import BaseModel
+
+
+class Item(BaseModel):
+    name: str
+
+
+TABLE = list(range(100_000))
+
+
+def size() -> int:
+    return len(TABLE)
+
+
+def create(name: str) -> Item:
+    return Item(name=name)
+
+
+def count(name: str) -> int:
+    return size() + len(name)
+"""
+
+
+def load_module(source: str) -> types.ModuleType:
+    module = types.ModuleType("reloaded_app")
+    exec(source, module.__dict__)
+    sys.modules[module.__name__] = module
+    return module
+
+
+def test_functions_are_dumped_by_value_and_classes_by_reference():
+    module = load_module(MODULE_SOURCE)
+    try:
+        dump = dump_functions({"create": module.create, "count": module.count})
+        # the replica still has the module as it was imported
+        load_module(MODULE_SOURCE.replace("+ len(name)", "+ 0"))
+        functions = load_functions(dump)
+
+        item = functions["create"]("a")
+        assert type(item) is sys.modules["reloaded_app"].Item
+        assert isinstance(item, BaseModel)
+        assert functions["count"]("abc") == 100_003
+        # module level data is looked up on the replica rather than copied
+        assert len(dump) < 10_000
+    finally:
+        del sys.modules["reloaded_app"]
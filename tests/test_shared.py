@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import numpy as np
+import numpy.typing as npt
+import pytest
+import ray
+
+from raycraft import App, RayCraftAPI
+from raycraft.shared import load_shared, REAP_INTERVAL_S, release_shared, shared_name
+
+
+def random_embeddings() -> npt.NDArray[Any]:
+    return np.random.rand(1000)
+
+
+def test_initializer_runs_once_per_node(ray_cluster):
+    first, first_ref = load_shared("test.embeddings", random_embeddings, {}, {})
+    second, second_ref = load_shared("test.embeddings", random_embeddings, {}, {})
+
+    # a second run would have drawn other numbers
+    np.testing.assert_array_equal(first, second)
+    assert first_ref == second_ref
+    # mapped from the object store rather than copied
+    assert not second.flags.writeable
+
+
+def test_dependencies_go_through_the_object_store(ray_cluster):
+    embeddings, embeddings_ref = load_shared(
+        "test.dependency", random_embeddings, {}, {}
+    )
+
+    def normalize(embeddings: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        return embeddings / embeddings.sum()  # type: ignore [no-any-return]
+
+    normalized, _ = load_shared(
+        "test.normalized",
+        normalize,
+        {"embeddings": embeddings},
+        {"embeddings": embeddings_ref},
+    )
+    np.testing.assert_allclose(normalized, embeddings / embeddings.sum())
+
+
+def store_exists(name: str) -> bool:
+    node_id = ray.get_runtime_context().get_node_id()
+    try:
+        ray.get_actor(f"raycraft-shared:{name}:{node_id}")
+    except ValueError:
+        return False
+    return True
+
+
+@ray.remote
+class Replica:
+    def load(self, name: str) -> float:
+        value, _ = load_shared(name, random_embeddings, {}, {})
+        return float(value.sum())
+
+
+def test_output_outlives_the_replica_that_loaded_it(ray_cluster):
+    replica = Replica.remote()  # type: ignore [attr-defined]
+    loaded = ray.get(replica.load.remote("test.outlives"))
+    # the driver stays attached while the replica that loaded it dies
+    load_shared("test.outlives", random_embeddings, {}, {})
+    ray.kill(replica)
+
+    time.sleep(2 * REAP_INTERVAL_S)
+    value, _ = load_shared("test.outlives", random_embeddings, {}, {})
+    assert float(value.sum()) == loaded
+
+
+def test_initializer_exits_when_its_last_replica_dies(ray_cluster):
+    replica = Replica.remote()  # type: ignore [attr-defined]
+    ray.get(replica.load.remote("test.reaped"))
+    assert store_exists("test.reaped")
+
+    ray.kill(replica)
+    deadline = time.monotonic() + 5 * REAP_INTERVAL_S
+    while store_exists("test.reaped") and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not store_exists("test.reaped")
+
+
+def test_initializer_exits_with_its_last_replica(ray_cluster):
+    load_shared("test.released", random_embeddings, {}, {})
+    assert store_exists("test.released")
+
+    asyncio.run(release_shared())
+    deadline = time.monotonic() + 10
+    while store_exists("test.released") and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not store_exists("test.released")
+
+
+def test_actor_options_reserve_resources(ray_cluster):
+    def load() -> int:
+        return 1
+
+    before = ray.available_resources().get("CPU", 0)
+    load_shared("test.options", load, {}, {}, {"num_cpus": 0.5})
+    assert ray.available_resources().get("CPU", 0) == pytest.approx(before - 0.5)
+
+
+def test_actor_options_need_a_shared_initializer():
+    svc = RayCraftAPI()
+
+    with pytest.raises(ValueError):
+
+        @svc.init(ray_actor_options={"num_gpus": 1})
+        def model() -> None:
+            ...
+
+
+def test_deleted_apps_release_their_shared_initializers(ray_cluster):
+    from ray import serve
+
+    svc = RayCraftAPI(num_replicas=2, ray_actor_options={"num_cpus": 0})
+
+    @svc.init(shared=True)
+    def embeddings() -> npt.NDArray[Any]:
+        return random_embeddings()
+
+    @svc.get("/")
+    async def route(app: App) -> float:
+        return float(app.embeddings.sum())
+
+    serve.run(svc(), name="test-shared", route_prefix="/test-shared")
+    name = shared_name(
+        "test-shared", "Svc.embeddings", svc._initializers["embeddings"]["func"]
+    )
+    try:
+        sums = {
+            httpx.get("http://127.0.0.1:8000/test-shared/").json() for _ in range(8)
+        }
+        # both replicas got the output of a single run
+        assert len(sums) == 1
+        assert store_exists(name)
+    finally:
+        serve.delete("test-shared")
+
+    deadline = time.monotonic() + 10
+    while store_exists(name) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not store_exists(name)
+
+
+def test_shared_names_depend_on_the_app_and_the_code():
+    def small() -> int:
+        return 1
+
+    def large() -> int:
+        return 2
+
+    name = shared_name("app", "Svc.model", small)
+
+    assert shared_name("app", "Svc.model", small) == name
+    assert shared_name("other-app", "Svc.model", small) != name
+    assert shared_name("app", "Svc.model", large) != name
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from ray._private.utils import import_attr
+
+# a model that takes a while to load and a fair amount of memory
+MODEL_LOAD_S = 1.0
+MODEL_MB = 256
+
+# what building the app may cost the driver, well below loading the model
+# and far above what the build takes, so that a loaded machine still passes
+BUILD_BUDGET_S = MODEL_LOAD_S
+BUILD_BUDGET_MB = MODEL_MB / 4
+
+# leaves a marker when the "model" is loaded
+APP_SOURCE = f"""
+import pathlib
+import time
+
+from raycraft import App, RayCraftAPI
+
+MARKER = pathlib.Path(__file__).with_suffix(".ran")
+
+svc = RayCraftAPI()
+
+
+@svc.init
+def model():
+    MARKER.touch()
+    time.sleep({MODEL_LOAD_S})
+    # filled rather than zeroed, so that its pages are resident
+    return bytearray(b"1") * {MODEL_MB} * 2**20
+
+
+@svc.remote
+def size(app: App) -> int:
+    return len(app.model)
+
+
+@svc.post("/")
+async def route(app: App) -> int:
+    return await app.size()
+"""
+
+# what `raycraft run` does in the driver, in a fresh interpreter
+MEASURE_SOURCE = """
+import json, resource, sys, time
+
+import ray
+from ray import serve
+from ray._private.utils import import_attr
+
+import raycraft
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+sys.path.insert(0, sys.argv[1])
+start_s, start_mb = time.perf_counter(), max_rss_mb()
+svc = import_attr("heavy_app:svc")
+svc()
+print(json.dumps({
+    "build_s": time.perf_counter() - start_s,
+    "build_mb": max_rss_mb() - start_mb,
+}))
+"""
+
+
+def write_app(tmp_path: Path) -> Path:
+    (tmp_path / "heavy_app.py").write_text(textwrap.dedent(APP_SOURCE))
+    return tmp_path / "heavy_app.ran"
+
+
+def test_building_the_app_does_not_run_initializers(tmp_path, monkeypatch):
+    marker = write_app(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    svc = import_attr("heavy_app:svc")
+    svc()
+    svc(reloadable=True)
+
+    assert not marker.exists()
+
+
+def test_building_the_app_stays_within_budget(tmp_path):
+    write_app(tmp_path)
+
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_SOURCE, str(tmp_path)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stdout
+    measured = json.loads(output.splitlines()[-1])
+
+    # building the app leaves the model to the replicas
+    assert measured["build_s"] < BUILD_BUDGET_S, measured
+    assert measured["build_mb"] < BUILD_BUDGET_MB, measured
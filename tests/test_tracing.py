@@ -0,0 +1,114 @@
+import asyncio
+import pickle
+import threading
+import time
+from typing import AsyncIterator, List, Sequence
+
+import pytest
+from fastapi.testclient import TestClient
+
+from raycraft import App, InMemoryExporter, RayCraftAPI, SpanExporter, TracingConfig
+from raycraft.tracing import Span, Tracer
+
+
+class ThreadExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+        self.threads: List[int] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.batches.append([span.name for span in spans])
+        self.threads.append(threading.get_ident())
+
+
+class FailingExporter(SpanExporter):
+    def export(self, spans: Sequence[Span]) -> None:
+        raise ConnectionError("collector is down")
+
+
+def test_exporters_must_implement_export():
+    with pytest.raises(TypeError):
+        SpanExporter()  # type: ignore [abstract]
+
+
+def test_in_memory_exporter_keeps_the_latest_spans():
+    exporter = InMemoryExporter(max_spans=3)
+    tracer = Tracer(TracingConfig(exporter=exporter))
+
+    for i in range(5):
+        with tracer.span(f"span {i}"):
+            pass
+    tracer.flush()
+
+    assert [span.name for span in exporter.spans] == ["span 2", "span 3", "span 4"]
+    assert pickle.loads(pickle.dumps(exporter)).spans.maxlen == 3
+
+
+def test_spans_are_exported_in_batches_off_the_request_thread():
+    exporter = ThreadExporter()
+    tracer = Tracer(
+        TracingConfig(exporter=exporter, export_interval_s=60, max_batch_size=2)
+    )
+
+    for i in range(3):
+        with tracer.span(f"span {i}"):
+            pass
+    # a full batch is exported without waiting for the interval
+    deadline = time.monotonic() + 5
+    while not exporter.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    tracer.flush()
+
+    assert sum(exporter.batches, []) == ["span 0", "span 1", "span 2"]
+    assert all(len(batch) <= 2 for batch in exporter.batches)
+    assert exporter.threads[0] != threading.get_ident()
+
+
+def test_spans_are_dropped_when_the_queue_is_full():
+    exporter = InMemoryExporter()
+    tracer = Tracer(
+        TracingConfig(exporter=exporter, export_interval_s=60, max_queue_size=2)
+    )
+
+    for i in range(3):
+        with tracer.span(f"span {i}"):
+            pass
+    tracer.flush()
+
+    assert [span.name for span in exporter.spans] == ["span 0", "span 1"]
+
+
+def test_failing_exporter_does_not_fail_requests():
+    svc = RayCraftAPI(tracing=TracingConfig(exporter=FailingExporter()))
+
+    @svc.get("/")
+    async def route(app: App) -> int:
+        return 1
+
+    with TestClient(svc.local()) as client:
+        assert [client.get("/").json() for _ in range(2)] == [1, 1]
+
+
+def test_streamed_route_spans_end_with_the_body():
+    exporter = InMemoryExporter()
+    svc = RayCraftAPI(tracing=TracingConfig(exporter=exporter))
+
+    @svc.remote
+    async def word(app: App, i: int) -> str:
+        return f"word {i}"
+
+    @svc.get("/words")
+    async def words(app: App) -> AsyncIterator[str]:
+        for i in range(2):
+            await asyncio.sleep(0.1)
+            yield await app.word(i)
+
+    with TestClient(svc.local()) as client:
+        assert client.get("/words").text == "word 0word 1"
+        svc._tracer.flush()  # type: ignore [union-attr]
+
+    spans = {span.name: span for span in exporter.spans}
+    route = spans["GET /words"]
+    assert route.end_time is not None and route.end_time - route.start_time >= 0.2
+    # the remote calls made while streaming are children of the route
+    assert spans["word"].parent_id == route.span_id
@@ -0,0 +1,79 @@
+from typing import List
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from raycraft import App, MetricsConfig, RayCraftAPI
+
+
+def test_warmups_run_before_the_first_request():
+    events: List[str] = []
+    svc = RayCraftAPI(metrics=MetricsConfig(route="/metrics"))
+
+    @svc.init
+    def model() -> str:
+        events.append("init")
+        return "model"
+
+    @svc.remote
+    def predict(app: App, text: str) -> str:
+        events.append(f"predict {text}")
+        return text.upper()
+
+    @svc.warmup(repeat=2)
+    async def warm(app: App) -> None:
+        assert app.model == "model"
+        await app.predict("warmup")
+
+    @svc.get("/")
+    async def route(app: App) -> str:
+        return await app.predict("request")  # type: ignore [no-any-return]
+
+    with TestClient(svc.local()) as client:
+        assert client.get("/").json() == "REQUEST"
+        rendered = client.get("/metrics").text
+
+    assert events == ["init", "predict warmup", "predict warmup", "predict request"]
+    assert 'initializer="warmup.warm"' in rendered
+
+
+def test_a_failing_warmup_fails_the_start():
+    svc = RayCraftAPI()
+
+    @svc.warmup
+    def warm(app: App) -> None:
+        raise ValueError("Sample input rejected.")
+
+    with pytest.raises(RuntimeError, match="Warmup 'warm' failed."):
+        with TestClient(svc.local()):
+            pass
+
+
+def test_deployed_warmups_run_on_their_deployment(ray_cluster):
+    from ray import serve
+
+    svc = RayCraftAPI(ray_actor_options={"num_cpus": 0})
+
+    @svc.remote(num_replicas=1, ray_actor_options={"num_cpus": 0})
+    def warmups(app: App) -> List[str]:
+        return getattr(app, "warmed", [])
+
+    @svc.warmup(repeat=2, deployment="warmups")
+    def warm_method(app: App) -> None:
+        setattr(app, "warmed", [*getattr(app, "warmed", []), "method"])
+
+    @svc.warmup
+    def warm_ingress(app: App) -> None:
+        setattr(app, "warmed", [*getattr(app, "warmed", []), "ingress"])
+
+    @svc.get("/")
+    async def route(app: App) -> List[List[str]]:
+        return [getattr(app, "warmed", []), await app.warmups()]
+
+    serve.run(svc(), name="test-warmup", route_prefix="/test-warmup")
+    try:
+        response = httpx.get("http://127.0.0.1:8000/test-warmup/")
+        assert response.json() == [["ingress"], ["method", "method"]]
+    finally:
+        serve.delete("test-warmup")
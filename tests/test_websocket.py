@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Dict, List
+
+import aiohttp
+import pytest
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from raycraft import App, MetricsConfig, RayCraftAPI
+
+
+def build_app(**serve_deployment_kwargs: Any) -> RayCraftAPI:
+    svc = RayCraftAPI(
+        metrics=MetricsConfig(route="/metrics"), ray_actor_options={"num_cpus": 0}
+    )
+
+    @svc.remote(**serve_deployment_kwargs)
+    def reply(app: App, message: Dict[str, Any]) -> Dict[str, Any]:
+        return {**message, "words": message["text"].split()}
+
+    @svc.websocket("/chat/{room}")
+    async def chat(app: App, websocket: WebSocket, room: str) -> None:
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive_json()
+                await websocket.send_json(await app.reply({**message, "room": room}))
+        except WebSocketDisconnect:
+            pass
+
+    return svc
+
+
+def test_messages_make_a_round_trip_over_a_session():
+    with TestClient(build_app().local()) as client:
+        with client.websocket_connect("/chat/lobby") as websocket:
+            for text in ("hello there", "bye"):
+                websocket.send_json({"text": text, "id": 1})
+                assert websocket.receive_json() == {
+                    "text": text,
+                    "id": 1,
+                    "room": "lobby",
+                    "words": text.split(),
+                }
+        rendered = client.get("/metrics").text
+
+    # a session is counted once, however many messages it exchanged
+    assert (
+        'raycraft_requests_total{deployment="Svc",kind="route",method="chat"} 1'
+        in rendered
+    )
+
+
+def test_websocket_handlers_must_be_async():
+    svc = RayCraftAPI()
+
+    with pytest.raises(TypeError, match="must be async"):
+
+        @svc.websocket("/chat")
+        def chat(app: App, websocket: WebSocket) -> None:
+            ...
+
+
+def test_deployed_sessions_call_remote_methods(ray_cluster):
+    from ray import serve
+
+    svc = build_app(num_replicas=1, ray_actor_options={"num_cpus": 0})
+
+    async def chat() -> List[Dict[str, Any]]:
+        url = "ws://127.0.0.1:8000/test-websocket/chat/lobby"
+        replies = []
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(url) as websocket:
+                for text in ("hello there", "bye"):
+                    await websocket.send_json({"text": text})
+                    replies.append(await websocket.receive_json(timeout=30))
+        return replies
+
+    serve.run(svc(), name="test-websocket", route_prefix="/test-websocket")
+    try:
+        assert asyncio.run(chat()) == [
+            {"text": "hello there", "room": "lobby", "words": ["hello", "there"]},
+            {"text": "bye", "room": "lobby", "words": ["bye"]},
+        ]
+    finally:
+        serve.delete("test-websocket")